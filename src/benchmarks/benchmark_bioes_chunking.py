@@ -0,0 +1,97 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from typing import Callable, List
+from utils.bioes_utils import BioesUtils
+from utils.project_utils import ProjectUtils
+
+import numpy as np
+import os
+import time
+
+
+def _get_padding_ratio(chunk_lengths: List[int], mini_batch_size: int) -> float:
+    """
+    Get the share of padding positions when consecutive chunks are batched and padded to the longest chunk of their batch.
+    :param chunk_lengths: Subword lengths of the chunks in corpus order.
+    :param mini_batch_size: Number of chunks per batch.
+    :return: Padding positions divided by all positions.
+    """
+    padded_length = sum(
+        max(chunk_lengths[start: start + mini_batch_size]) * len(chunk_lengths[start: start + mini_batch_size])
+        for start in range(0, len(chunk_lengths), mini_batch_size)
+    )
+    return 1 - sum(chunk_lengths) / padded_length if padded_length else 0.0
+
+
+def benchmark_bioes_chunking():
+    """
+    Chunk the BIOES texts of the whole corpus with every chunking mode and report the chunk count, the chunk lengths
+    in subwords and the padding ratio of mini batches of consecutive chunks. Checks that no chunk starts inside an entity
+    and that joining the chunks gives back the tokens of the document.
+    Subwords are counted with the tokenizer of SUBWORD_TOKENIZER_NAME if set, otherwise every token counts as one subword.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    max_subword_count = os.environ.get("MAX_SUBWORD_COUNT", None)
+    max_subword_count = int(max_subword_count) if max_subword_count else 256
+
+    subword_tokenizer_name = os.environ.get("SUBWORD_TOKENIZER_NAME", None)
+
+    mini_batch_size = os.environ.get("MINI_BATCH_SIZE", None)
+    mini_batch_size = int(mini_batch_size) if mini_batch_size else 8
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    print(f"data_dir: {data_dir}")
+    print(f"max_subword_count: {max_subword_count}")
+    print(f"subword_tokenizer_name: {subword_tokenizer_name}")
+    print(f"mini_batch_size: {mini_batch_size}")
+
+    get_subword_count: Callable[[str], int] = lambda token_text: 1
+    if subword_tokenizer_name:
+        from transformers import AutoTokenizer
+        subword_tokenizer = AutoTokenizer.from_pretrained(subword_tokenizer_name)
+        get_subword_count = lambda token_text: max(1, len(subword_tokenizer.tokenize(token_text)))
+
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    ner_df = data_handler.get_ner_dataframe()
+    rows = [row for _, row in ner_df.iterrows()]
+    token_subword_counts = {
+        token["text"]: get_subword_count(token["text"]) for row in rows for token in row["tokens"]
+    }
+
+    for chunking_mode in BioesUtils.chunking_modes:
+        start = time.perf_counter()
+        chunked_bioes_texts = [
+            GrasccoDataHandler.get_chunked_bioes_text(
+                row, chunking_mode, max_subword_count, lambda token_text: token_subword_counts[token_text]
+            )
+            for row in rows
+        ]
+        duration = time.perf_counter() - start
+
+        chunk_lengths: List[int] = list()
+        entity_cuts = 0
+        for row, chunked_bioes_text in zip(rows, chunked_bioes_texts):
+            chunks = [chunk.split("\n") for chunk in chunked_bioes_text.split("\n\n")] if chunked_bioes_text else list()
+            if [line for chunk in chunks for line in chunk] != (row["bioes_text"].split("\n") if len(row["tokens"]) else []):
+                raise ValueError(f"Chunks of '{row['document_title']}' do not add up to its BIOES text.")
+            entity_cuts += sum(chunk[0].rsplit(" ", 1)[1].startswith(("I-", "E-")) for chunk in chunks)
+            chunk_lengths.extend(
+                sum(token_subword_counts[line.rsplit(" ", 1)[0]] for line in chunk) for chunk in chunks
+            )
+
+        print(f"{chunking_mode:>16}: {len(chunk_lengths)} chunks in {duration:.3f}s, "
+              f"subwords per chunk mean {np.mean(chunk_lengths):.1f} max {max(chunk_lengths)}, "
+              f"{sum(length > max_subword_count for length in chunk_lengths)} chunks over {max_subword_count}, "
+              f"padding ratio {_get_padding_ratio(chunk_lengths, mini_batch_size):.3f}, "
+              f"entity cuts {entity_cuts}")
+
+
+if __name__ == "__main__":
+    benchmark_bioes_chunking()
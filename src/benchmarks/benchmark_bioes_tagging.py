@@ -0,0 +1,151 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from typing import List, Tuple
+from utils.bioes_utils import BioesUtils
+
+import os
+import random
+import time
+
+
+def _get_bioes_tags_with_token_scan(token_spans: List[Tuple[int, int]], 
+                                    entity_spans: List[Tuple[int, int, str]]) -> List[str]:
+    """
+    Reference tagger that scans every token for every entity.
+    :param token_spans: (begin, end) offsets of the tokens.
+    :param entity_spans: (begin, end, label) offsets and labels of the entities.
+    :return: List of BIOES tags, one per token.
+    """
+    tags: List[str] = ["O"] * len(token_spans)
+    for begin, end, label in entity_spans:
+        token_indices = [index for index, (b, e) in enumerate(token_spans) if b >= begin and e <= end]
+        if token_indices:
+            if len(token_indices) == 1:
+                tags[token_indices[0]] = f"S-{label}"
+            else:
+                tags[token_indices[0]] = f"B-{label}"
+                for index in token_indices[1:-1]:
+                    tags[index] = f"I-{label}"
+                tags[token_indices[-1]] = f"E-{label}"
+    return tags
+
+
+def _get_synthetic_document(rng: random.Random, 
+                            token_count: int, 
+                            entity_density: float) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int, str]]]:
+    """
+    Create token and entity offsets of a synthetic document, entities span one to four tokens 
+    and may overlap, start or end inside a token, or lie outside of the tokens.
+    :param rng: Random number generator.
+    :param token_count: Number of tokens of the document.
+    :param entity_density: Number of entities per token.
+    :return: Token spans and entity spans.
+    """
+    token_spans: List[Tuple[int, int]] = list()
+    offset = rng.randint(0, 3)
+    for _ in range(token_count):
+        length = rng.randint(1, 8)
+        token_spans.append((offset, offset + length))
+        offset += length + rng.randint(0, 2)
+    entity_spans: List[Tuple[int, int, str]] = list()
+    for _ in range(max(1, int(token_count * entity_density))):
+        first = rng.randrange(token_count)
+        last = min(token_count - 1, first + rng.randint(0, 3))
+        begin = token_spans[first][0] + rng.choice([0, 0, 0, 1, -1])
+        end = token_spans[last][1] + rng.choice([0, 0, 0, 1, -1])
+        entity_spans.append((begin, end, rng.choice(["DATE", "NAME_PATIENT", "ID", "AGE"])))
+    if rng.random() < 0.2:
+        entity_spans.append((offset + 5, offset + 10, "DATE"))
+    return token_spans, entity_spans
+
+
+def _get_offset_columns(documents: List[Tuple[List[Tuple[int, int]], List[Tuple[int, int, str]]]]) -> List[List[List]]:
+    """
+    Split the token and entity spans of the documents into the per document offset and label lists taken by BioesUtils.
+    :param documents: Token spans and entity spans of every document.
+    :return: Per document token begins, token ends, entity begins, entity ends and entity labels.
+    """
+    return [
+        [[b for b, e in token_spans] for token_spans, entity_spans in documents], 
+        [[e for b, e in token_spans] for token_spans, entity_spans in documents], 
+        [[b for b, e, l in entity_spans] for token_spans, entity_spans in documents], 
+        [[e for b, e, l in entity_spans] for token_spans, entity_spans in documents], 
+        [[l for b, e, l in entity_spans] for token_spans, entity_spans in documents]
+    ]
+
+
+def _get_bioes_tags_per_document(offset_columns: List[List[List]]) -> List[List[str]]:
+    return [BioesUtils.get_bioes_tags(*document_columns) for document_columns in zip(*offset_columns)]
+
+
+def benchmark_bioes_tagging():
+    """
+    Check that the sorted offset tagger of BioesUtils produces the same tags as a token scan per entity 
+    on randomized documents, and compare both on synthetic documents of growing length.
+    """
+
+    entity_density = os.environ.get("ENTITY_DENSITY", None)
+    entity_density = float(entity_density) if entity_density else 0.05
+
+    token_counts = os.environ.get("TOKEN_COUNTS", None)
+    token_counts = [int(token_count) for token_count in token_counts.split(",")] if token_counts else [1000, 10000, 20000, 50000]
+
+    print(f"entity_density: {entity_density}")
+    print(f"token_counts: {token_counts}")
+
+    rng = random.Random(2025)
+    documents = [_get_synthetic_document(rng, rng.randint(1, 300), rng.choice([0.0, 0.05, 0.5])) for _ in range(500)]
+    documents += [([], [(0, 1, "DATE")]), ([(5, 9), (2, 4), (10, 12)], [(2, 9, "ID"), (10, 12, "AGE")])]
+    reference_tags = [_get_bioes_tags_with_token_scan(token_spans, entity_spans) for token_spans, entity_spans in documents]
+    offset_columns = _get_offset_columns(documents)
+    if _get_bioes_tags_per_document(offset_columns) != reference_tags:
+        raise AssertionError("get_bioes_tags and the token scan tagger disagree.")
+    if BioesUtils.get_bioes_tags_for_documents(*offset_columns) != reference_tags:
+        raise AssertionError("get_bioes_tags_for_documents and the token scan tagger disagree.")
+    print(f"parity: {len(documents)} randomized documents tagged identically")
+
+    for token_count in token_counts:
+        token_spans, entity_spans = _get_synthetic_document(rng, token_count, entity_density)
+        offset_columns = _get_offset_columns([(token_spans, entity_spans)])
+
+        start = time.perf_counter()
+        reference = _get_bioes_tags_with_token_scan(token_spans, entity_spans)
+        token_scan_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tags = _get_bioes_tags_per_document(offset_columns)[0]
+        sorted_offset_duration = time.perf_counter() - start
+
+        if tags != reference:
+            raise AssertionError(f"Taggers disagree on the document with {token_count} tokens.")
+        print(
+            f"{token_count:>7} tokens, {len(entity_spans):>5} entities: "
+            f"token scan {token_scan_duration * 1000:9.1f}ms, "
+            f"sorted offsets {sorted_offset_duration * 1000:7.1f}ms, "
+            f"speedup {token_scan_duration / sorted_offset_duration:.0f}x"
+        )
+
+    for document_count, token_count in [(50, 10000), (2000, 300)]:
+        offset_columns = _get_offset_columns([_get_synthetic_document(rng, token_count, entity_density) for _ in range(document_count)])
+        single_durations: List[float] = list()
+        batch_durations: List[float] = list()
+        for _ in range(3):
+            start = time.perf_counter()
+            single_tags = _get_bioes_tags_per_document(offset_columns)
+            single_durations.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            batch_tags = BioesUtils.get_bioes_tags_for_documents(*offset_columns)
+            batch_durations.append(time.perf_counter() - start)
+        single_duration = min(single_durations)
+        batch_duration = min(batch_durations)
+        if batch_tags != single_tags:
+            raise AssertionError("Batched and per document tagging disagree.")
+        print(
+            f"{document_count:>5} documents of {token_count} tokens: "
+            f"per document {single_duration * 1000:.1f}ms, batched {batch_duration * 1000:.1f}ms"
+        )
+
+if __name__ == "__main__":
+    benchmark_bioes_tagging()
@@ -0,0 +1,123 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from typing import Any, Dict, List
+from utils.project_utils import ProjectUtils
+
+import os
+import time
+
+
+def _fix_queisser_missing_age_entity_label(ner_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reference fix of the missing age entity label in the NER data of Queisser.txt_phi.json file.
+    :param ner_data: The NER data to fix.
+    :return: The fixed NER data.
+    """
+    entities: List[Dict[str, Any]] = ner_data["entities"]
+    fixed_entities: List[Dict[str, Any]] = list()
+    if ner_data["document_title"] == "Queisser.txt":
+        for entity in entities:
+            if entity["begin"] == 1219 and entity["end"] == 1221 and entity["text"] == "49":
+                entity["label"] = "AGE"
+            fixed_entities.append(entity)
+    ner_data["entities"] = fixed_entities
+    return ner_data
+
+
+def _extract_ner_data_with_type_chain(data_handler: GrasccoDataHandler, json_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reference extractor that runs an if/elif chain of dictionary lookups on the type of every feature structure.
+    :param data_handler: The data handler providing the required JSON keys.
+    :param json_data: The JSON data dictionary object to process.
+    :return: The NER data dictionary object.
+    """
+    keys: Dict[str, str] = data_handler._json_data_required_key_dict
+    ner_data: Dict[str, Any] = dict()
+    document_title: str = ""
+    document_text: str = ""
+    sentences: List[Dict[str, Any]] = list()
+    tokens: List[Dict[str, Any]] = list()
+    entities: List[Dict[str, Any]] = list()
+
+    for item in json_data[keys["feature_structures"]]:
+        if item[keys["type"]] == keys["document_meta_data"]:
+            document_title = item[keys["document_title"]]
+        elif item[keys["type"]] == keys["sofa"]:
+            document_text = item[keys["sofa_string"]]
+        elif item[keys["type"]] == keys["sentence"]:
+            sentences.append({"begin": item[keys["begin"]], "end": item[keys["end"]]})
+        elif item[keys["type"]] == keys["token"]:
+            tokens.append({"begin": item[keys["begin"]], "end": item[keys["end"]]})
+        elif item[keys["type"]] == keys["phi"]:
+            label: str = ""
+            if keys["kind"] in item:
+                label = item[keys["kind"]]
+            entities.append({"begin": item[keys["begin"]], "end": item[keys["end"]], "label": label})
+
+    [s.update({"text": document_text[s["begin"]:s["end"]]}) for s in sentences]
+    [t.update({"text": document_text[t["begin"]:t["end"]]}) for t in tokens]
+    [e.update({"text": document_text[e["begin"]:e["end"]]}) for e in entities]
+
+    ner_data["document_title"] = document_title
+    ner_data["document_text"] = document_text
+    ner_data["sentences"] = sentences
+    ner_data["tokens"] = tokens
+    ner_data["entities"] = entities
+
+    if ner_data["document_title"] == "Queisser.txt":
+        ner_data = _fix_queisser_missing_age_entity_label(ner_data)
+
+    return ner_data
+
+
+def benchmark_cas_extraction():
+    """
+    Check that the type-indexed extractor of GrasccoDataHandler produces the same NER data as the 
+    if/elif chain extractor, and compare both on the GraSCCo corpus enlarged by repeating every document.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    benchmark_scale = os.environ.get("BENCHMARK_SCALE", None)
+    benchmark_scale = int(benchmark_scale) if benchmark_scale else 10
+
+    project_root: Path = ProjectUtils.get_project_root()
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    data_handler._load_json_files()
+    json_data_items = data_handler._json_data_items
+
+    print(f"data_dir: {data_dir}")
+    print(f"benchmark_scale: {benchmark_scale}")
+
+    for json_data in json_data_items:
+        if data_handler._extract_ner_data(json_data) != _extract_ner_data_with_type_chain(data_handler, json_data):
+            raise AssertionError("Type-indexed extractor and if/elif chain extractor disagree.")
+    print(f"parity: {len(json_data_items)} documents extracted identically")
+
+    enlarged_json_data_items = json_data_items * benchmark_scale
+    feature_structure_count = sum(
+        len(json_data[data_handler._json_data_required_key_dict["feature_structures"]]) 
+        for json_data in enlarged_json_data_items
+    )
+    print(f"enlarged corpus: {len(enlarged_json_data_items)} documents, {feature_structure_count} feature structures")
+
+    start = time.perf_counter()
+    for json_data in enlarged_json_data_items:
+        _extract_ner_data_with_type_chain(data_handler, json_data)
+    type_chain_duration = time.perf_counter() - start
+    print(f"if/elif chain: {type_chain_duration:.3f}s, {feature_structure_count / type_chain_duration:.0f} feature structures/s")
+
+    start = time.perf_counter()
+    for json_data in enlarged_json_data_items:
+        data_handler._extract_ner_data(json_data)
+    type_indexed_duration = time.perf_counter() - start
+    print(f" type-indexed: {type_indexed_duration:.3f}s, {feature_structure_count / type_indexed_duration:.0f} feature structures/s")
+    print(f"      speedup: {type_chain_duration / type_indexed_duration:.2f}x")
+
+
+if __name__ == "__main__":
+    benchmark_cas_extraction()
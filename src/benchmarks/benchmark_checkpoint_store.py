@@ -0,0 +1,102 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from training_scripts.ner.checkpoint_store import CheckpointStore
+from typing import Dict, List
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import torch
+
+
+def benchmark_checkpoint_store():
+    """
+    Compare writing the best-model checkpoints of several runs as separate model files with torch.save against
+    saving them asynchronously to a CheckpointStore: the seconds the training loop is blocked per save and the disk usage.
+    Every run starts from the same base weights and updates the tensors of its trainable layers before every save,
+    the frozen layers stay identical to the base weights. Every stored checkpoint is loaded and compared to the saved state.
+    """
+
+    runs = os.environ.get("RUNS", None)
+    runs = int(runs) if runs else 3
+
+    saves_per_run = os.environ.get("SAVES_PER_RUN", None)
+    saves_per_run = int(saves_per_run) if saves_per_run else 3
+
+    layers = os.environ.get("LAYERS", None)
+    layers = int(layers) if layers else 24
+
+    tensor_mb = os.environ.get("TENSOR_MB", None)
+    tensor_mb = float(tensor_mb) if tensor_mb else 4.0
+
+    frozen_fraction = os.environ.get("FROZEN_FRACTION", None)
+    frozen_fraction = float(frozen_fraction) if frozen_fraction else 0.5
+
+    print(f"runs: {runs}")
+    print(f"saves_per_run: {saves_per_run}")
+    print(f"layers: {layers}")
+    print(f"tensor_mb: {tensor_mb}")
+    print(f"frozen_fraction: {frozen_fraction}")
+
+    generator = torch.Generator().manual_seed(1)
+    tensor_numel = int(tensor_mb * 2 ** 20 / 4)
+    base_state_dict: Dict[str, torch.Tensor] = {
+        f"layer.{layer}.weight": torch.randn(tensor_numel, generator=generator) for layer in range(layers)
+    }
+    trainable_keys = list(base_state_dict.keys())[int(layers * frozen_fraction):]
+
+    output_dir = Path(tempfile.mkdtemp(prefix="checkpoint_store_"))
+    try:
+        store = CheckpointStore(output_dir / "store")
+        file_save_durations: List[float] = list()
+        store_save_durations: List[float] = list()
+        saved_states: Dict[str, Dict[str, torch.Tensor]] = dict()
+        file_size_bytes = 0
+
+        for run in range(runs):
+            state_dict = {key: value.clone() for key, value in base_state_dict.items()}
+            for save in range(saves_per_run):
+                for key in trainable_keys:
+                    state_dict[key].add_(torch.randn(tensor_numel, generator=generator), alpha=1e-3)
+                model_state = {"state_dict": state_dict, "model_card": {"run": run, "save": save}}
+
+                model_file = output_dir / "files" / f"run-{run}" / "best-model.pt"
+                model_file.parent.mkdir(parents=True, exist_ok=True)
+                start = time.perf_counter()
+                torch.save(model_state, model_file)
+                file_save_durations.append(time.perf_counter() - start)
+                file_size_bytes += model_file.stat().st_size
+
+                name = f"run-{run}/best-model-{save}"
+                start = time.perf_counter()
+                store.save_async(name, model_state)
+                store_save_durations.append(time.perf_counter() - start)
+                saved_states[name] = CheckpointStore.snapshot(model_state)
+        start = time.perf_counter()
+        store.close()
+        close_duration = time.perf_counter() - start
+
+        for name, model_state in saved_states.items():
+            stored_state = store.load(name)
+            if stored_state["model_card"] != model_state["model_card"] or any(
+                not torch.equal(stored_state["state_dict"][key], value) for key, value in model_state["state_dict"].items()
+            ):
+                raise ValueError(f"The stored checkpoint '{name}' differs from the saved state.")
+
+        store_size_bytes = store.get_size_bytes()
+        print(f"{'torch.save':>18}: {statistics.mean(file_save_durations) * 1e3:8.1f} ms/save blocked, {file_size_bytes / 2 ** 20:8.1f} MiB written")
+        print(
+            f"{'checkpoint store':>18}: {statistics.mean(store_save_durations) * 1e3:8.1f} ms/save blocked, {store.written_bytes / 2 ** 20:8.1f} MiB written,"
+            f" {store.deduplicated_bytes / 2 ** 20:.1f} MiB deduplicated, {close_duration:.3f}s to finish"
+        )
+        print(f"store size: {store_size_bytes / 2 ** 20:.1f} MiB for {len(saved_states)} checkpoints of {file_size_bytes / len(saved_states) / 2 ** 20:.1f} MiB")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark_checkpoint_store()
@@ -0,0 +1,114 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.eda_summary_accumulator import EdaSummaryAccumulator
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from typing import Any, Dict, List
+from utils.project_utils import ProjectUtils
+
+import copy
+import json
+import os
+import random
+import time
+
+
+def _merge_shards(ner_data_items: List[Dict[str, Any]],
+                  shard_count: int,
+                  rare_label_entity_count_threshold: int) -> EdaSummaryAccumulator:
+    """
+    Accumulate contiguous shards of the NER data items separately and merge them in a random grouping,
+    keeping the document order of the shards.
+    :param ner_data_items: The NER data items to summarize.
+    :param shard_count: Number of shards.
+    :param rare_label_entity_count_threshold: Threshold to consider a label as rare.
+    :return: The merged accumulator.
+    """
+    shard_size = max(1, -(-len(ner_data_items) // shard_count))
+    accumulators: List[EdaSummaryAccumulator] = list()
+    for shard_start in range(0, len(ner_data_items), shard_size):
+        accumulator = EdaSummaryAccumulator(rare_label_entity_count_threshold)
+        [accumulator.add(item) for item in ner_data_items[shard_start: shard_start + shard_size]]
+        accumulators.append(accumulator)
+    while len(accumulators) > 1:
+        index = random.randrange(len(accumulators) - 1)
+        accumulators[index: index + 2] = [accumulators[index].merge(accumulators[index + 1])]
+    return accumulators[0]
+
+
+def _to_json_compatible(eda_summary: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Round trip the EDA summary through JSON, so tuples compare equal to the lists of the stored summary.
+    :param eda_summary: The EDA summary dictionary.
+    :return: The EDA summary as read back from JSON.
+    """
+    return json.loads(json.dumps(eda_summary, ensure_ascii=False))
+
+
+def benchmark_eda_summary():
+    """
+    Time the single pass EDA summary of every JSON loading mode,
+    check it against the stored eda_summary.json,
+    check that merging shard accumulators in any grouping gives the same summary
+    and that the NER data items are not modified by the summary.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    benchmark_repeats = os.environ.get("BENCHMARK_REPEATS", None)
+    benchmark_repeats = int(benchmark_repeats) if benchmark_repeats else 3
+
+    max_workers = os.environ.get("MAX_WORKERS", None)
+    max_workers = int(max_workers) if max_workers else None
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    print(f"data_dir: {data_dir}")
+    print(f"benchmark_repeats: {benchmark_repeats}")
+    print(f"max_workers: {max_workers}")
+
+    eda_summary_path = (data_dir or project_root / "data") / "eda_summary.json"
+    with eda_summary_path.open("r", encoding="utf-8") as f:
+        reference_summary = json.load(f)
+
+    for json_loading_mode in GrasccoDataHandler.json_loading_modes:
+        durations: List[float] = list()
+        for _ in range(benchmark_repeats):
+            data_handler = GrasccoDataHandler(
+                project_root,
+                data_dir=data_dir,
+                json_loading_mode=json_loading_mode,
+                max_workers=max_workers
+            )
+            start = time.perf_counter()
+            data_handler._build_eda_summary()
+            durations.append(time.perf_counter() - start)
+        if _to_json_compatible(data_handler._eda_summary) != reference_summary:
+            raise AssertionError(f"'{json_loading_mode}' loading mode did not reproduce {eda_summary_path.name}.")
+        print(f"{json_loading_mode:>10}: EDA summary in {min(durations):.3f}s")
+
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    ner_data_items = data_handler.get_ner_data_items()
+    ner_data_items_before = copy.deepcopy(ner_data_items)
+    data_handler._build_eda_summary()
+    if ner_data_items != ner_data_items_before:
+        raise AssertionError("EDA summary modified the NER data items.")
+
+    random.seed(2025)
+    for shard_count in [1, 2, 7, len(ner_data_items)]:
+        start = time.perf_counter()
+        summary = _merge_shards(ner_data_items, shard_count, 10).get_summary()
+        duration = time.perf_counter() - start
+        if _to_json_compatible(summary) != reference_summary:
+            raise AssertionError(f"Merging {shard_count} shards did not reproduce {eda_summary_path.name}.")
+        print(f"{shard_count:>10} shards: merged EDA summary in {duration:.3f}s")
+
+    if ner_data_items != ner_data_items_before:
+        raise AssertionError("Merging shard accumulators modified the NER data items.")
+    print("EDA summary parity checks passed.")
+
+
+if __name__ == "__main__":
+    benchmark_eda_summary()
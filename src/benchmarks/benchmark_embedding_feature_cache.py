@@ -0,0 +1,65 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from training_scripts.ner.fine_tune_sequence_tagger_with_transformer_model import fine_tune
+from typing import Dict, List
+from utils.environment_utils import EnvironmentUtils
+
+import flair
+import os
+import shutil
+import tempfile
+import time
+
+
+def benchmark_embedding_feature_cache():
+    """
+    Compare fine-tuning the transformer encoder with training the tagger head on a frozen encoder from the
+    embedding feature cache: the seconds and the test micro-F1 of a fine-tuning run, a frozen encoder run with
+    an empty cache, which runs the encoder once over the corpus, a frozen encoder run with the filled cache
+    and a frozen encoder run with a CRF head on the same cache. The runs are configured like fine_tune by the
+    environment variables, e.g. a small TRANSFORMER_MODEL_NAME, and write to a temporary model checkpoints directory.
+    """
+
+    seed = os.environ.get("SEED", None)
+    seed = int(seed) if seed else 1
+
+    max_epochs = os.environ.get("MAX_EPOCHS", None)
+    max_epochs = int(max_epochs) if max_epochs else 3
+
+    print(f"seed: {seed}")
+    print(f"max_epochs: {max_epochs}")
+
+    runs: Dict[str, Dict[str, str]] = {
+        "fine-tuned encoder": {"FROZEN_ENCODER": "0"},
+        "frozen, cold cache": {"FROZEN_ENCODER": "1"},
+        "frozen, warm cache": {"FROZEN_ENCODER": "1"},
+        "frozen, crf head": {"FROZEN_ENCODER": "1", "USE_CRF": "1"}
+    }
+
+    output_dir = Path(tempfile.mkdtemp(prefix="embedding_feature_cache_"))
+    try:
+        summary: List[str] = list()
+        for run_name, run_overrides in runs.items():
+            overrides = {
+                "MODEL_CHECKPOINTS_ROOT_DIR": str(output_dir / run_name.replace(", ", "-").replace(" ", "-")),
+                "FEATURE_CACHE_DIR": str(output_dir / "embedding_feature_cache"),
+                "MAX_EPOCHS": str(max_epochs),
+                "SAVE_TRAINING_STATE": "0",
+                "LOG_TO_WANDB": "0",
+                **run_overrides
+            }
+            with EnvironmentUtils.override_environ(overrides):
+                flair.set_seed(seed)
+                start = time.perf_counter()
+                result = fine_tune()
+                duration = time.perf_counter() - start
+            summary.append(f"{run_name:>20}: {duration:8.1f}s, test micro-F1 {result['test_score']:.4f}")
+        print("\n".join(summary))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark_embedding_feature_cache()
@@ -0,0 +1,82 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from datasets import Dataset
+from typing import List
+from utils.project_utils import ProjectUtils
+
+import os
+import time
+
+
+def _get_buffer_addresses(dataset: Dataset) -> List[int]:
+    """
+    Collect the addresses of the Arrow buffers behind the columns of a Dataset.
+    :param dataset: The Dataset to inspect.
+    :return: The buffer addresses, in column and chunk order.
+    """
+    return [
+        buffer.address 
+        for column in dataset.data.table.columns 
+        for chunk in column.chunks 
+        for buffer in chunk.buffers() if buffer is not None
+    ]
+
+
+def benchmark_fold_manager():
+    """
+    Compare building the DatasetDict of every fold with get_train_dev_test_datasetdict against the
+    index-selected views of the fold manager, check that both give the same documents and fold stats,
+    and that the views share the Arrow table of the fold manager Dataset.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    n_fold = os.environ.get("N_FOLD", None)
+    n_fold = int(n_fold) if n_fold else 5
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    print(f"data_dir: {data_dir}")
+    print(f"n_fold: {n_fold}")
+
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    label_order = list(data_handler.get_eda_summary()["label_wise_entity_count"].keys())
+    data_handler.get_ner_dataframe()
+
+    start = time.perf_counter()
+    data_handler.get_train_dev_test_datasetdict(1, n_fold)
+    one_datasetdict_duration = time.perf_counter() - start
+    start = time.perf_counter()
+    fold_wise_datasetdict = {k: data_handler.get_train_dev_test_datasetdict(k, n_fold) for k in range(1, n_fold + 1)}
+    all_datasetdict_duration = time.perf_counter() - start
+    print(f"get_train_dev_test_datasetdict: 1 fold {one_datasetdict_duration:.3f}s, {n_fold} folds {all_datasetdict_duration:.3f}s")
+
+    start = time.perf_counter()
+    fold_manager = data_handler.get_fold_manager(n_fold)
+    fold_manager.get_fold_datasetdict(1)
+    one_fold_manager_duration = time.perf_counter() - start
+    start = time.perf_counter()
+    fold_wise_view_datasetdict = dict(fold_manager.iter_fold_datasetdicts())
+    all_fold_manager_duration = time.perf_counter() - start
+    print(f"            fold manager views: 1 fold {one_fold_manager_duration:.3f}s, {n_fold} folds {all_fold_manager_duration:.3f}s")
+
+    dataset_buffer_addresses = _get_buffer_addresses(fold_manager.dataset)
+    for k, datasetdict in fold_wise_datasetdict.items():
+        view_datasetdict = fold_wise_view_datasetdict[k]
+        for split_name in fold_manager.split_names:
+            for column_name in ["document_title", "bioes_text"]:
+                if list(datasetdict[split_name][column_name]) != list(view_datasetdict[split_name][column_name]):
+                    raise AssertionError(f"Fold {k} {split_name} '{column_name}' differs between the DatasetDict and the view.")
+            if _get_buffer_addresses(view_datasetdict[split_name]) != dataset_buffer_addresses:
+                raise AssertionError(f"Fold {k} {split_name} view does not share the Arrow table of the fold manager.")
+        if data_handler.get_fold_stats(datasetdict, label_order) != data_handler.get_fold_stats(view_datasetdict, label_order):
+            raise AssertionError(f"Fold {k} stats differ between the DatasetDict and the view.")
+    print(f"parity: {n_fold} folds select the same documents, views share one Arrow table")
+
+
+if __name__ == "__main__":
+    benchmark_fold_manager()
@@ -0,0 +1,91 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from typing import Any, Dict, List
+from utils.project_utils import ProjectUtils
+
+import json
+import os
+import pyarrow as pa
+import time
+
+
+def _enlarge_ner_arrow_table(table: pa.Table, benchmark_scale: int) -> pa.Table:
+    """
+    Repeat every document of the NER data Arrow table, the copies get the copy number appended to their title.
+    :param table: The NER data Arrow table.
+    :param benchmark_scale: Number of copies of every document, the first copy keeps the original titles.
+    :return: The enlarged NER data Arrow table.
+    """
+    document_titles: List[str] = table.column("document_title").to_pylist()
+    title_column_index = table.schema.get_field_index("document_title")
+    copies = [table]
+    for copy_number in range(2, benchmark_scale + 1):
+        copy_titles = [f"{Path(title).stem}_{copy_number}{Path(title).suffix}" for title in document_titles]
+        copies.append(table.set_column(title_column_index, table.schema.field(title_column_index), pa.array(copy_titles)))
+    return pa.concat_tables(copies)
+
+
+def _get_fold_stats_per_fold(data_handler: GrasccoDataHandler,
+                             label_order: List[str],
+                             n_fold: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Reference that builds the DatasetDict of every fold and computes its stats one fold after another.
+    :param data_handler: The data handler holding the NER data.
+    :param label_order: The order of labels to display in the stats.
+    :param n_fold: Number of folds.
+    :return: A dictionary with the fold number as keys and the fold stats as values.
+    """
+    fold_stats: Dict[int, Dict[str, Any]] = dict()
+    for fold in range(1, n_fold + 1):
+        fold_datasetdict = data_handler.get_train_dev_test_datasetdict(fold, n_fold)
+        fold_stats[fold] = data_handler.get_fold_stats(fold_datasetdict, label_order)
+    return fold_stats
+
+
+def benchmark_fold_stats():
+    """
+    Compare the per-fold DatasetDict stats with the all-folds count matrix stats of GrasccoDataHandler
+    on the GraSCCo corpus enlarged by repeating every document, and check that both give the same stats.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    benchmark_scale = os.environ.get("BENCHMARK_SCALE", None)
+    benchmark_scale = int(benchmark_scale) if benchmark_scale else 10
+
+    fold_counts = os.environ.get("FOLD_COUNTS", None)
+    fold_counts = [int(fold_count) for fold_count in fold_counts.split(",")] if fold_counts else [5, 50]
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    print(f"data_dir: {data_dir}")
+    print(f"benchmark_scale: {benchmark_scale}")
+    print(f"fold_counts: {fold_counts}")
+
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    label_order = list(data_handler.get_eda_summary()["label_wise_entity_count"].keys())
+    data_handler._ner_arrow_table = _enlarge_ner_arrow_table(data_handler.get_ner_arrow_table(), benchmark_scale)
+    data_handler._ner_dataframe = None
+    print(f"enlarged corpus: {data_handler._ner_arrow_table.num_rows} documents, {len(label_order)} labels")
+
+    for n_fold in fold_counts:
+        start = time.perf_counter()
+        reference_fold_stats = _get_fold_stats_per_fold(data_handler, label_order, n_fold)
+        per_fold_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fold_stats = data_handler.get_all_fold_stats(label_order, n_fold)
+        all_folds_duration = time.perf_counter() - start
+
+        if json.dumps(fold_stats, default=int) != json.dumps(reference_fold_stats, default=int):
+            raise AssertionError(f"All-folds stats and per-fold stats disagree for {n_fold} folds.")
+        print(f"{n_fold:>4} folds: per-fold {per_fold_duration:.3f}s, all-folds {all_folds_duration:.3f}s, "
+              f"speedup {per_fold_duration / all_folds_duration:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark_fold_stats()
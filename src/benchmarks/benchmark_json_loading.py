@@ -0,0 +1,85 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from typing import Dict, List
+from utils.project_utils import ProjectUtils
+
+import json
+import os
+import time
+
+
+def _load_json_files_with_stdlib(data_handler: GrasccoDataHandler) -> List[Dict]:
+    """
+    Reference loader that reads the JSON files one after another with the standard json module.
+    :param data_handler: The data handler whose JSON files directory should be read.
+    :return: The JSON data items in file name order.
+    """
+    json_data_path_dict: Dict[str, Dict] = dict()
+    for json_file in data_handler._json_data_files_dir.glob("*.json"):
+        with json_file.open("r", encoding="utf-8") as f:
+            json_data_path_dict[json_file.name] = json.load(f)
+    return [v for k, v in sorted(json_data_path_dict.items())]
+
+
+def benchmark_json_loading():
+    """
+    Compare the documents per second of the sequential, thread pool and process pool JSON loading modes 
+    of GrasccoDataHandler against the plain json module loader and check that all modes load the same items.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    benchmark_repeats = os.environ.get("BENCHMARK_REPEATS", None)
+    benchmark_repeats = int(benchmark_repeats) if benchmark_repeats else 3
+
+    max_workers = os.environ.get("MAX_WORKERS", None)
+    max_workers = int(max_workers) if max_workers else None
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    print(f"data_dir: {data_dir}")
+    print(f"benchmark_repeats: {benchmark_repeats}")
+    print(f"max_workers: {max_workers}")
+
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    durations: List[float] = list()
+    for _ in range(benchmark_repeats):
+        start = time.perf_counter()
+        reference_items = _load_json_files_with_stdlib(data_handler)
+        durations.append(time.perf_counter() - start)
+    mode_wise_docs_per_second: Dict[str, float] = dict()
+    mode_wise_docs_per_second["stdlib"] = len(reference_items) / min(durations)
+    print(f"{'stdlib':>10}: {len(reference_items)} documents in {min(durations):.3f}s, {mode_wise_docs_per_second['stdlib']:.1f} docs/s")
+
+    for json_loading_mode in GrasccoDataHandler.json_loading_modes:
+        durations: List[float] = list()
+        for _ in range(benchmark_repeats):
+            data_handler = GrasccoDataHandler(
+                project_root, 
+                data_dir=data_dir, 
+                json_loading_mode=json_loading_mode, 
+                max_workers=max_workers
+            )
+            start = time.perf_counter()
+            data_handler._load_json_files()
+            durations.append(time.perf_counter() - start)
+
+        items = data_handler._json_data_items
+        if items != reference_items:
+            raise AssertionError(f"'{json_loading_mode}' loading mode did not reproduce the stdlib loader items.")
+
+        best_duration = min(durations)
+        mode_wise_docs_per_second[json_loading_mode] = len(items) / best_duration
+        print(f"{json_loading_mode:>10}: {len(items)} documents in {best_duration:.3f}s, {mode_wise_docs_per_second[json_loading_mode]:.1f} docs/s")
+
+    for json_loading_mode, docs_per_second in mode_wise_docs_per_second.items():
+        speedup = docs_per_second / mode_wise_docs_per_second["stdlib"]
+        print(f"{json_loading_mode:>10}: {speedup:.2f}x vs stdlib")
+
+
+if __name__ == "__main__":
+    benchmark_json_loading()
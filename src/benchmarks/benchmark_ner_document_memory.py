@@ -0,0 +1,73 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from data_handlers.ner_document import NerDocument
+from typing import Any, List, Set
+from utils.project_utils import ProjectUtils
+
+import os
+
+
+def _get_deep_size(obj: Any, seen: Set[int]) -> int:
+    """
+    Get the memory size of an object in bytes, including all dicts, lists, tuples and strings it refers to.
+    Objects already in seen are counted only once.
+    :param obj: The object to measure.
+    :param seen: Ids of the objects already measured.
+    :return: Memory size in bytes.
+    """
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_get_deep_size(k, seen) + _get_deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_get_deep_size(item, seen) for item in obj)
+    return size
+
+
+def benchmark_ner_document_memory():
+    """
+    Compare the memory size of the NER data items as dict-of-lists objects and as NerDocument objects, 
+    and check that both representations provide the same counts and BIOES texts.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    project_root: Path = ProjectUtils.get_project_root()
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    ner_data_items = data_handler.get_ner_data_items()
+    ner_documents: List[NerDocument] = list(data_handler.iter_ner_documents())
+
+    print(f"data_dir: {data_dir}")
+
+    for ner_data, ner_document in zip(ner_data_items, ner_documents):
+        if (ner_document.sentence_count, ner_document.token_count, ner_document.entity_count) != (
+            len(ner_data["sentences"]), len(ner_data["tokens"]), len(ner_data["entities"])
+        ):
+            raise AssertionError(f"Counts of '{ner_data['document_title']}' differ.")
+        if ner_document.to_ner_data() != ner_data:
+            raise AssertionError(f"NER data of '{ner_data['document_title']}' differs.")
+        if data_handler._build_bioes_text_for_ner_data_item(ner_document) != data_handler._build_bioes_text_for_ner_data_item(ner_data):
+            raise AssertionError(f"BIOES text of '{ner_data['document_title']}' differs.")
+
+    document_text_size = sum(sys.getsizeof(ner_data["document_text"]) for ner_data in ner_data_items)
+    total_tokens = sum(ner_document.token_count for ner_document in ner_documents)
+    # the document texts are shared by both representations, so they are reported separately
+    seen: Set[int] = set(id(ner_data["document_text"]) for ner_data in ner_data_items)
+    dict_size = sum(_get_deep_size(ner_data, seen) for ner_data in ner_data_items)
+    compact_size = sum(ner_document.get_memory_size(include_document_text=False) for ner_document in ner_documents)
+
+    print(f"documents: {len(ner_documents)}, tokens: {total_tokens}")
+    print(f"document texts: {document_text_size / 2 ** 20:8.2f} MiB")
+    print(f"  dict-of-lists: {dict_size / 2 ** 20:8.2f} MiB, {dict_size / total_tokens:6.1f} bytes/token")
+    print(f"    NerDocument: {compact_size / 2 ** 20:8.2f} MiB, {compact_size / total_tokens:6.1f} bytes/token")
+    print(f"      reduction: {dict_size / compact_size:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark_ner_document_memory()
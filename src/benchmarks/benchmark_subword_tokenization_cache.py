@@ -0,0 +1,115 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from flair.data import Sentence
+from flair.embeddings import TransformerWordEmbeddings
+from training_scripts.ner.subword_tokenization_cache import CachedSubwordTokenizer, SubwordTokenizationCache
+from typing import Any, Dict, List
+from utils.flair_corpus_utils import FlairCorpusUtils
+from utils.project_utils import ProjectUtils
+
+import flair
+import os
+import shutil
+import tempfile
+import time
+import torch
+
+
+def _prepare_epoch(embeddings: TransformerWordEmbeddings,
+                   sentences: List[Sentence],
+                   mini_batch_size: int) -> List[Dict[str, Any]]:
+    """
+    Prepare the model inputs of all mini batches of one epoch, as the embeddings do before every forward pass.
+    :param embeddings: The transformer embeddings.
+    :param sentences: The sentences of the epoch.
+    :param mini_batch_size: Number of sentences per mini batch.
+    :return: The model input tensors of every mini batch.
+    """
+    return [
+        embeddings.prepare_tensors(sentences[start: start + mini_batch_size], device=torch.device("cpu"))
+        for start in range(0, len(sentences), mini_batch_size)
+    ]
+
+
+def benchmark_subword_tokenization_cache():
+    """
+    Time the data preparation of the transformer embeddings per epoch on CPU, without the subword tokenization cache,
+    with a cache filled during the first epoch and with a cache persisted by a previous run, e.g. another fold.
+    Checks that the cached tokenizer gives the same model inputs as the tokenizer.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    transformer_model_name = os.environ.get("TRANSFORMER_MODEL_NAME", "google-bert/bert-base-german-cased")
+
+    chunking_mode = os.environ.get("CHUNKING_MODE", None)
+    chunking_mode = chunking_mode if chunking_mode else "document"
+
+    mini_batch_size = os.environ.get("MINI_BATCH_SIZE", None)
+    mini_batch_size = int(mini_batch_size) if mini_batch_size else 1
+
+    epochs = os.environ.get("EPOCHS", None)
+    epochs = int(epochs) if epochs else 3
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    print(f"data_dir: {data_dir}")
+    print(f"transformer_model_name: {transformer_model_name}")
+    print(f"chunking_mode: {chunking_mode}")
+    print(f"mini_batch_size: {mini_batch_size}")
+    print(f"epochs: {epochs}")
+
+    embeddings = TransformerWordEmbeddings(model=transformer_model_name, use_context=True, fine_tune=True)
+    tokenizer = embeddings.tokenizer
+    get_subword_count = lambda token_text: max(1, len(tokenizer.tokenize(token_text)))
+
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    sentences = FlairCorpusUtils.get_sentences(
+        (row for _, row in data_handler.get_ner_dataframe().iterrows()),
+        chunking_mode=chunking_mode,
+        get_subword_count=get_subword_count
+    )
+    print(f"sentences: {len(sentences)}")
+
+    cache_root_dir = Path(tempfile.mkdtemp(prefix="subword_tokenization_cache_"))
+    try:
+        runs = [
+            ("no cache", lambda: tokenizer),
+            ("cold cache", lambda: CachedSubwordTokenizer(tokenizer, SubwordTokenizationCache(cache_root_dir, tokenizer))),
+            ("persisted cache", lambda: CachedSubwordTokenizer(tokenizer, SubwordTokenizationCache(cache_root_dir, tokenizer)))
+        ]
+        reference_epochs = None
+        for run_name, get_tokenizer in runs:
+            embeddings.tokenizer = get_tokenizer()
+            flair.set_seed(2025)
+            epoch_durations: List[float] = list()
+            run_epochs = list()
+            for _ in range(epochs):
+                start = time.perf_counter()
+                run_epochs.append(_prepare_epoch(embeddings, sentences, mini_batch_size))
+                epoch_durations.append(time.perf_counter() - start)
+            if isinstance(embeddings.tokenizer, CachedSubwordTokenizer):
+                embeddings.tokenizer.cache.save()
+
+            if reference_epochs is None:
+                reference_epochs = run_epochs
+            else:
+                is_equal = all(
+                    reference_tensors.keys() == tensors.keys()
+                    and all(torch.equal(reference_tensors[key], tensors[key]) for key in tensors)
+                    for reference_epoch, run_epoch in zip(reference_epochs, run_epochs)
+                    for reference_tensors, tensors in zip(reference_epoch, run_epoch)
+                )
+                if not is_equal:
+                    raise ValueError(f"The model inputs of run '{run_name}' differ from the model inputs without cache.")
+            print(f"{run_name:>16}: " + ", ".join(f"epoch {epoch} {duration:.3f}s" for epoch, duration in enumerate(epoch_durations, 1)))
+    finally:
+        shutil.rmtree(cache_root_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark_subword_tokenization_cache()
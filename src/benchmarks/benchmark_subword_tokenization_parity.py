@@ -0,0 +1,86 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from training_scripts.ner.subword_tokenization_cache import CachedSubwordTokenizer, SubwordTokenizationCache
+from transformers import AutoTokenizer
+from typing import List
+from utils.project_utils import ProjectUtils
+
+import os
+import shutil
+import tempfile
+import torch
+
+
+def benchmark_subword_tokenization_parity():
+    """
+    Check for every tokenizer of the fine-tuning jobs that the cached tokenizer gives the same model inputs
+    as the tokenizer itself, i.e. that the subwords of a pretokenized sentence are the concatenation of the subwords
+    of its words. Every document is tokenized as one pretokenized sentence, with the truncation, overflowing windows,
+    stride and padding Flair uses for long sentences, and with a cache that is filled by the first call and persisted.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    tokenizer_names = os.environ.get("TOKENIZER_NAMES", None)
+    tokenizer_names = tokenizer_names.split(",") if tokenizer_names else [
+        "google-bert/bert-base-german-cased",
+        "deepset/gelectra-large",
+        "xlm-roberta-large"
+    ]
+
+    mini_batch_size = os.environ.get("MINI_BATCH_SIZE", None)
+    mini_batch_size = int(mini_batch_size) if mini_batch_size else 4
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    print(f"data_dir: {data_dir}")
+    print(f"tokenizer_names: {tokenizer_names}")
+    print(f"mini_batch_size: {mini_batch_size}")
+
+    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    documents_words: List[List[str]] = [
+        [token["text"] for token in ner_data["tokens"]] for ner_data in data_handler.get_ner_data_items()
+    ]
+    print(f"documents: {len(documents_words)}")
+
+    cache_root_dir = Path(tempfile.mkdtemp(prefix="subword_tokenization_cache_"))
+    try:
+        for tokenizer_name in tokenizer_names:
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            for run_name in ["cold cache", "persisted cache"]:
+                mismatched_batch_count = 0
+                cached_tokenizer = CachedSubwordTokenizer(tokenizer, SubwordTokenizationCache(cache_root_dir, tokenizer))
+                for start in range(0, len(documents_words), mini_batch_size):
+                    batch = documents_words[start: start + mini_batch_size]
+                    kwargs = dict(
+                        stride=tokenizer.model_max_length // 2,
+                        return_overflowing_tokens=True,
+                        truncation=True,
+                        padding=True,
+                        return_tensors="pt",
+                        is_split_into_words=True
+                    )
+                    reference_encoding = tokenizer(batch, **kwargs)
+                    cached_encoding = cached_tokenizer(batch, **kwargs)
+                    is_equal = all(
+                        key in cached_encoding and torch.equal(reference_encoding[key], cached_encoding[key])
+                        for key in reference_encoding.keys()
+                    ) and all(
+                        reference_encoding.word_ids(index) == cached_encoding.word_ids(index)
+                        for index in range(len(reference_encoding["input_ids"]))
+                    )
+                    mismatched_batch_count += not is_equal
+                cached_tokenizer.cache.save()
+                print(f"{tokenizer_name:>40} {run_name:>16}: mismatched batches {mismatched_batch_count}")
+                if mismatched_batch_count:
+                    raise ValueError(f"The model inputs of the cached tokenizer of '{tokenizer_name}' differ from the model inputs of the tokenizer.")
+    finally:
+        shutil.rmtree(cache_root_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark_subword_tokenization_parity()
@@ -0,0 +1,197 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from data_handlers.synthetic_corpus_generator import SyntheticCorpusGenerator
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+from utils.benchmark_utils import BenchmarkUtils
+from utils.project_utils import ProjectUtils
+
+import json
+import os
+import platform
+import shutil
+import tempfile
+
+
+def _get_stages(data_handler: GrasccoDataHandler, n_fold: int) -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    Get the stages of the NER data pipeline in execution order, every stage can be run repeatedly
+    and leaves the data handler in the state the next stage expects.
+    :param data_handler: The data handler of the benchmarked corpus.
+    :param n_fold: Number of folds of the fold stages.
+    :return: A list of tuples (stage name, stage function).
+    """
+    state: Dict[str, Any] = dict()
+
+    def load_json_files():
+        data_handler._load_json_files()
+
+    def extract_ner_data():
+        data_handler._ner_data_items = [data_handler._extract_ner_data(json_data) for json_data in data_handler._json_data_items]
+
+    def build_eda_summary():
+        data_handler._json_data_items = list()
+        data_handler._build_eda_summary()
+
+    def build_bioes_texts():
+        state["bioes_texts"] = data_handler._build_bioes_texts_for_ner_data_items(data_handler._ner_data_items)
+
+    def build_and_save_ner_dataframe():
+        data_handler._build_and_save_ner_dataframe(bioes_texts=state["bioes_texts"])
+
+    def read_ner_arrow_table():
+        data_handler._ner_arrow_table = None
+        data_handler._ner_dataframe = None
+        data_handler._fold_managers = dict()
+        data_handler.get_ner_arrow_table()
+
+    def get_train_dev_test_datasetdict():
+        data_handler._ner_dataframe = None
+        data_handler._fold_wise_document_titles = dict()
+        [data_handler.get_train_dev_test_datasetdict(k, n_fold) for k in range(1, n_fold + 1)]
+
+    def get_fold_manager_datasetdicts():
+        data_handler._fold_wise_document_titles = dict()
+        data_handler._fold_managers = dict()
+        list(data_handler.get_fold_manager(n_fold).iter_fold_datasetdicts())
+
+    return [
+        ("load_json_files", load_json_files),
+        ("extract_ner_data", extract_ner_data),
+        ("build_eda_summary", build_eda_summary),
+        ("build_bioes_texts", build_bioes_texts),
+        ("build_and_save_ner_dataframe", build_and_save_ner_dataframe),
+        ("read_ner_arrow_table", read_ner_arrow_table),
+        ("get_train_dev_test_datasetdict", get_train_dev_test_datasetdict),
+        ("get_fold_manager_datasetdicts", get_fold_manager_datasetdicts)
+    ]
+
+
+def benchmark_suite():
+    """
+    Time every stage of the NER data pipeline of GrasccoDataHandler separately and measure its memory,
+    on the GraSCCo corpus and on corpora scaled 10x, 100x and 1000x. With BENCHMARK_CORPUS 'grascco' the scaled corpora 
+    repeat every GraSCCo document, with 'synthetic' they are generated by SyntheticCorpusGenerator 
+    with the label distribution of the EDA summary.
+    The results are saved as JSON, if a baseline results file is given, every stage is compared against it
+    and the script exits with status 1 if a stage got slower or used more memory than the regression threshold allows.
+    """
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+
+    benchmark_corpus = os.environ.get("BENCHMARK_CORPUS", "grascco")
+    if benchmark_corpus not in ["grascco", "synthetic"]:
+        raise ValueError(f"Unknown BENCHMARK_CORPUS '{benchmark_corpus}', expected 'grascco' or 'synthetic'.")
+
+    benchmark_scales = os.environ.get("BENCHMARK_SCALES", None)
+    benchmark_scales = [int(scale) for scale in benchmark_scales.split(",")] if benchmark_scales else [1, 10, 100, 1000]
+
+    benchmark_repeats = os.environ.get("BENCHMARK_REPEATS", None)
+    benchmark_repeats = int(benchmark_repeats) if benchmark_repeats else 1
+
+    trace_memory = os.environ.get("TRACE_MEMORY", None)
+    trace_memory = trace_memory.lower() in ["1", "true", "yes"] if trace_memory else True
+
+    n_fold = os.environ.get("N_FOLD", None)
+    n_fold = int(n_fold) if n_fold else 5
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    benchmark_output_file = os.environ.get("BENCHMARK_OUTPUT_FILE", None)
+    benchmark_output_file = (
+        Path(benchmark_output_file) if benchmark_output_file
+        else project_root / "metrics" / "benchmarks" / f"benchmark_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+
+    benchmark_baseline_file = os.environ.get("BENCHMARK_BASELINE_FILE", None)
+    benchmark_baseline_file = Path(benchmark_baseline_file) if benchmark_baseline_file else None
+
+    regression_threshold = os.environ.get("REGRESSION_THRESHOLD", None)
+    regression_threshold = float(regression_threshold) if regression_threshold else 0.1
+
+    print(f"data_dir: {data_dir}")
+    print(f"benchmark_corpus: {benchmark_corpus}")
+    print(f"benchmark_scales: {benchmark_scales}")
+    print(f"benchmark_repeats: {benchmark_repeats}")
+    print(f"trace_memory: {trace_memory}")
+    print(f"n_fold: {n_fold}")
+    print(f"benchmark_output_file: {benchmark_output_file}")
+    print(f"benchmark_baseline_file: {benchmark_baseline_file}")
+    print(f"regression_threshold: {regression_threshold}")
+
+    source_data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    json_data_files_dir = source_data_handler._json_data_files_dir
+    synthetic_corpus_generator = None
+    if benchmark_corpus == "synthetic":
+        with (source_data_handler.data_dir / "eda_summary.json").open("r", encoding="utf-8") as f:
+            eda_summary = json.load(f)
+        synthetic_corpus_generator = SyntheticCorpusGenerator.from_eda_summary(eda_summary)
+    benchmark_results: Dict[str, Any] = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "benchmark_repeats": benchmark_repeats,
+        "n_fold": n_fold,
+        "results": list()
+    }
+
+    for scale in benchmark_scales:
+        benchmark_data_dir = Path(tempfile.mkdtemp(prefix=f"grascco_benchmark_{scale}x_"))
+        try:
+            # the data handler finds the JSON files under the same relative path as in the data directory
+            scaled_json_data_files_dir = benchmark_data_dir / json_data_files_dir.relative_to(json_data_files_dir.parent.parent.parent)
+            if synthetic_corpus_generator is not None:
+                document_count = eda_summary["total_files"] * scale
+                synthetic_corpus_generator.write_corpus(scaled_json_data_files_dir, document_count)
+            else:
+                document_count = BenchmarkUtils.write_scaled_corpus(json_data_files_dir, scaled_json_data_files_dir, scale)
+            print(f"\ncorpus: {benchmark_corpus} {scale}x, {document_count} documents")
+
+            data_handler = GrasccoDataHandler(project_root, data_dir=benchmark_data_dir)
+            for stage_name, stage_function in _get_stages(data_handler, n_fold):
+                _, stage_metrics = BenchmarkUtils.measure_stage(stage_function, benchmark_repeats, trace_memory)
+                stage_result = {
+                    "corpus": benchmark_corpus,
+                    "scale": scale,
+                    "documents": document_count,
+                    "stage": stage_name,
+                    **stage_metrics,
+                    "documents_per_second": document_count / stage_metrics["seconds"] if stage_metrics["seconds"] else None
+                }
+                benchmark_results["results"].append(stage_result)
+                peak_python_memory = (
+                    f"{stage_result['peak_python_memory_bytes'] / 2 ** 20:.1f} MiB"
+                    if stage_result["peak_python_memory_bytes"] is not None else "n/a"
+                )
+                print(f"{stage_name:>32}: {stage_result['seconds']:.3f}s, "
+                      f"peak python memory {peak_python_memory}, "
+                      f"max rss {stage_result['max_rss_bytes'] / 2 ** 20:.1f} MiB")
+        finally:
+            shutil.rmtree(benchmark_data_dir, ignore_errors=True)
+
+    BenchmarkUtils.save_benchmark_results(benchmark_results, benchmark_output_file)
+    print(f"\nbenchmark results saved to {benchmark_output_file}")
+
+    if benchmark_baseline_file:
+        comparisons = BenchmarkUtils.compare_benchmark_results(
+            benchmark_results,
+            BenchmarkUtils.load_benchmark_results(benchmark_baseline_file),
+            regression_threshold
+        )
+        regressions = [comparison for comparison in comparisons if comparison["regression"]]
+        for comparison in comparisons:
+            flag = "REGRESSION" if comparison["regression"] else "ok"
+            print(f"{comparison['corpus']} {comparison['scale']}x {comparison['stage']:>32} {comparison['metric']:>24}: "
+                  f"{comparison['baseline']:.4g} -> {comparison['current']:.4g} ({comparison['ratio']:.2f}x) {flag}")
+        print(f"{len(regressions)} regressions in {len(comparisons)} comparisons against {benchmark_baseline_file}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark_suite()
@@ -0,0 +1,123 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from training_scripts.ner.fine_tune_sequence_tagger_with_transformer_model import fine_tune
+from typing import Dict, Tuple
+from utils.environment_utils import EnvironmentUtils
+
+import flair
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+
+
+def _run_fine_tune(overrides: Dict[str, str], seed: int, result_path: Path) -> None:
+    """
+    Fine-tune with a fixed seed and write the test score and the dev score history to a JSON file.
+    :param overrides: The environment variable overrides of the run.
+    :param seed: The random seed.
+    :param result_path: Path of the result JSON file.
+    """
+    with EnvironmentUtils.override_environ(overrides):
+        flair.set_seed(seed)
+        result = fine_tune()
+    with result_path.open("w", encoding="utf-8") as writer:
+        json.dump({"test_score": result["test_score"], "dev_score_history": result["dev_score_history"]}, writer)
+
+
+def _get_saved_position(model_checkpoints_root_dir: Path) -> Tuple[int, int]:
+    """
+    Get the position of the last training state saved by a run, from its training log.
+    :param model_checkpoints_root_dir: The model checkpoints root directory of the run.
+    :return: The epoch and the number of trained batches of the epoch, (0, 0) before the first save.
+    """
+    positions = [(0, 0)]
+    for training_log_path in model_checkpoints_root_dir.glob("**/training.log"):
+        training_log = training_log_path.read_text(encoding="utf-8", errors="replace")
+        positions += [(int(epoch), int(batch)) for epoch, batch in re.findall(r"saved training state of epoch (\d+) after batch (\d+)", training_log)]
+    return positions[-1]
+
+
+def benchmark_training_resume():
+    """
+    Check that an interrupted fine-tuning run on the CPU resumes with the results of an uninterrupted run:
+    fine-tune once without interruption, then fine-tune again, kill the process in the middle of epoch KILL_EPOCH
+    once it saved the training state after at least KILL_AFTER_BATCHES batches, and start it again to resume.
+    The runs are configured like fine_tune by the environment variables, e.g. a small TRANSFORMER_MODEL_NAME,
+    and the script exits with status 1 if the test score or the dev score history of the resumed run differ.
+    """
+
+    seed = os.environ.get("SEED", None)
+    seed = int(seed) if seed else 1
+
+    max_epochs = os.environ.get("MAX_EPOCHS", None)
+    max_epochs = int(max_epochs) if max_epochs else 3
+
+    kill_epoch = os.environ.get("KILL_EPOCH", None)
+    kill_epoch = int(kill_epoch) if kill_epoch else 2
+
+    kill_after_batches = os.environ.get("KILL_AFTER_BATCHES", None)
+    kill_after_batches = int(kill_after_batches) if kill_after_batches else 3
+
+    print(f"seed: {seed}")
+    print(f"max_epochs: {max_epochs}")
+    print(f"kill_epoch: {kill_epoch}")
+    print(f"kill_after_batches: {kill_after_batches}")
+
+    output_dir = Path(tempfile.mkdtemp(prefix="training_resume_"))
+    context = multiprocessing.get_context("spawn")
+    try:
+        results: Dict[str, Dict] = dict()
+        durations: Dict[str, float] = dict()
+        for run_name in ["uninterrupted", "interrupted"]:
+            overrides = {
+                "MODEL_CHECKPOINTS_ROOT_DIR": str(output_dir / run_name),
+                "MAX_EPOCHS": str(max_epochs),
+                "SAVE_TRAINING_STATE": "1",
+                "SAVE_TRAINING_STATE_EVERY_N_EPOCHS": "1",
+                "SAVE_TRAINING_STATE_EVERY_N_BATCHES": "1",
+                "RESUME_TRAINING": "1",
+                "LOG_TO_WANDB": "0"
+            }
+            result_path = output_dir / f"{run_name}.json"
+
+            start = time.perf_counter()
+            process = context.Process(target=_run_fine_tune, args=(overrides, seed, result_path))
+            process.start()
+            if run_name == "interrupted":
+                while process.is_alive() and _get_saved_position(output_dir / run_name) < (kill_epoch, kill_after_batches):
+                    time.sleep(0.05)
+                if not process.is_alive():
+                    raise ValueError(f"The run finished before it saved the training state of epoch {kill_epoch} after batch {kill_after_batches}.")
+                process.kill()
+                process.join()
+                epoch, batch = _get_saved_position(output_dir / run_name)
+                print(f"killed the run after {time.perf_counter() - start:.1f}s, training state saved in epoch {epoch} after batch {batch}")
+                if batch == 0:
+                    raise ValueError("The run was not killed in the middle of an epoch, increase MAX_EPOCHS or decrease MINI_BATCH_SIZE.")
+
+                process = context.Process(target=_run_fine_tune, args=(overrides, seed, result_path))
+                process.start()
+            process.join()
+            durations[run_name] = time.perf_counter() - start
+            if process.exitcode != 0:
+                raise ValueError(f"The {run_name} run failed with exit code {process.exitcode}.")
+            with result_path.open("r", encoding="utf-8") as reader:
+                results[run_name] = json.load(reader)
+            print(f"{run_name:>14}: {durations[run_name]:.1f}s, test score {results[run_name]['test_score']}, dev score history {results[run_name]['dev_score_history']}")
+
+        if results["interrupted"] != results["uninterrupted"]:
+            print("the resumed run differs from the uninterrupted run")
+            sys.exit(1)
+        print("the resumed run matches the uninterrupted run")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark_training_resume()
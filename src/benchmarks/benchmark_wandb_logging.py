@@ -0,0 +1,104 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from flair.trainers.plugins import MetricRecord
+from training_scripts.ner.wandb_logger_plugin import LocalMetricLogger, WandbLoggerPlugin
+from typing import List
+
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+
+def _run_training_loop(plugin: WandbLoggerPlugin,
+                       steps: int,
+                       metric_names: List[str]) -> List[float]:
+    """
+    Simulate the metric logging of a training loop: every step records the tracked metrics and an evaluation.
+    :param plugin: The WandbLoggerPlugin.
+    :param steps: Number of steps.
+    :param metric_names: Names of the tracked metrics recorded per step.
+    :return: Seconds spent in the plugin per step.
+    """
+    plugin.after_setup()
+    step_durations: List[float] = list()
+    for step in range(1, steps + 1):
+        start = time.perf_counter()
+        for metric_name in metric_names:
+            plugin.metric_recorded(MetricRecord.scalar(tuple(metric_name.split("/")), 1.0 / step, step))
+        plugin.after_evaluation(epoch=step, current_model_is_best=step % 2 == 0)
+        step_durations.append(time.perf_counter() - start)
+    return step_durations
+
+
+def benchmark_wandb_logging():
+    """
+    Measure the training loop overhead per step of the WandbLoggerPlugin against a local stand-in logger with a
+    simulated network latency, logging synchronously and buffered, and check that the buffered mode logs all metrics
+    and appends all of them to the fallback log when the backend is unreachable.
+    """
+
+    steps = os.environ.get("STEPS", None)
+    steps = int(steps) if steps else 50
+
+    latency = os.environ.get("LATENCY", None)
+    latency = float(latency) if latency else 0.02
+
+    flush_interval = os.environ.get("FLUSH_INTERVAL", None)
+    flush_interval = float(flush_interval) if flush_interval else 0.5
+
+    print(f"steps: {steps}")
+    print(f"latency: {latency}")
+    print(f"flush_interval: {flush_interval}")
+
+    metric_names = ["train/loss", "dev/loss", "dev/micro avg/f1-score", "test/micro avg/f1-score"]
+    expected_metric_count = steps * (len(metric_names) + 1)
+
+    output_dir = Path(tempfile.mkdtemp(prefix="wandb_logging_"))
+    try:
+        runs = [
+            ("synchronous", False, False),
+            ("buffered", True, False),
+            ("buffered unreachable", True, True)
+        ]
+        for run_name, buffered, unreachable in runs:
+            logger = LocalMetricLogger(latency=latency, unreachable=unreachable)
+            fallback_log_path = output_dir / f"{run_name.replace(' ', '_')}_fallback.jsonl"
+            plugin = WandbLoggerPlugin(
+                entity="local",
+                project="benchmark",
+                tracked=set(metric_names),
+                buffered=buffered,
+                flush_interval=flush_interval,
+                fallback_log_path=fallback_log_path,
+                logger=logger
+            )
+            step_durations = _run_training_loop(plugin, steps, metric_names)
+            start = time.perf_counter()
+            plugin.after_training()
+            finish_duration = time.perf_counter() - start
+
+            if unreachable:
+                with fallback_log_path.open("r", encoding="utf-8") as reader:
+                    logged_metric_count = sum(len(json.loads(line)["data"]) for line in reader)
+            else:
+                logged_metric_count = sum(len(data) - ("epoch" in data) for _, data in logger.records)
+            if logged_metric_count != expected_metric_count:
+                raise ValueError(f"Run '{run_name}' logged {logged_metric_count} of {expected_metric_count} metrics.")
+
+            print(
+                f"{run_name:>20}: {statistics.mean(step_durations) * 1e6:10.1f} µs/step"
+                f" (max {max(step_durations) * 1e6:.1f} µs), {logger.log_call_count} log calls,"
+                f" {finish_duration:.3f}s to finish, {logged_metric_count} metrics"
+                + (" in the fallback log" if unreachable else "")
+            )
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark_wandb_logging()
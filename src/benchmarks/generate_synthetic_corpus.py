@@ -0,0 +1,75 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from data_handlers.synthetic_corpus_generator import SyntheticCorpusGenerator
+from utils.project_utils import ProjectUtils
+
+import json
+import os
+import time
+
+
+def generate_synthetic_corpus():
+    """
+    Generate a synthetic corpus of *_phi.json CAS exports with the label distribution of data/eda_summary.json.
+    The files are written to the same relative path under OUTPUT_DATA_DIR as the GraSCCo JSON files under data/,
+    so OUTPUT_DATA_DIR can be passed as data directory to GrasccoDataHandler or as DATA_DIR to the training script.
+    """
+
+    project_root: Path = ProjectUtils.get_project_root()
+
+    output_data_dir = os.environ.get("OUTPUT_DATA_DIR", None)
+    output_data_dir = Path(output_data_dir) if output_data_dir else project_root / "data" / "synthetic"
+
+    eda_summary_file = os.environ.get("EDA_SUMMARY_FILE", None)
+    eda_summary_file = Path(eda_summary_file) if eda_summary_file else project_root / "data" / "eda_summary.json"
+
+    document_count = os.environ.get("DOCUMENT_COUNT", None)
+    document_count = int(document_count) if document_count else 1000
+
+    seed = os.environ.get("SEED", None)
+    seed = int(seed) if seed else 2025
+
+    mean_token_count = os.environ.get("MEAN_TOKEN_COUNT", None)
+    mean_token_count = float(mean_token_count) if mean_token_count else None
+
+    mean_sentence_token_count = os.environ.get("MEAN_SENTENCE_TOKEN_COUNT", None)
+    mean_sentence_token_count = float(mean_sentence_token_count) if mean_sentence_token_count else None
+
+    entity_density = os.environ.get("ENTITY_DENSITY", None)
+    entity_density = float(entity_density) if entity_density else None
+
+    max_workers = os.environ.get("MAX_WORKERS", None)
+    max_workers = int(max_workers) if max_workers else None
+
+    print(f"output_data_dir: {output_data_dir}")
+    print(f"eda_summary_file: {eda_summary_file}")
+    print(f"document_count: {document_count}")
+    print(f"seed: {seed}")
+    print(f"mean_token_count: {mean_token_count}")
+    print(f"mean_sentence_token_count: {mean_sentence_token_count}")
+    print(f"entity_density: {entity_density}")
+    print(f"max_workers: {max_workers}")
+
+    with eda_summary_file.open("r", encoding="utf-8") as f:
+        eda_summary = json.load(f)
+    generator = SyntheticCorpusGenerator.from_eda_summary(
+        eda_summary,
+        seed=seed,
+        mean_token_count=mean_token_count,
+        mean_sentence_token_count=mean_sentence_token_count,
+        entity_density=entity_density
+    )
+
+    json_data_files_dir = GrasccoDataHandler(project_root, data_dir=output_data_dir)._json_data_files_dir
+    start = time.perf_counter()
+    token_count = generator.write_corpus(json_data_files_dir, document_count, max_workers=max_workers)
+    duration = time.perf_counter() - start
+    print(f"{document_count} documents with {token_count} tokens written to {json_data_files_dir} "
+          f"in {duration:.1f}s, {token_count / duration * 60 / 1e6:.1f}M tokens/min")
+
+
+if __name__ == "__main__":
+    generate_synthetic_corpus()
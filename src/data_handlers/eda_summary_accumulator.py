@@ -0,0 +1,142 @@
+from data_handlers.ner_document import NerDocument
+from typing import Any, Dict, List, Set, Tuple, Union
+
+
+class EdaSummaryAccumulator:
+    """
+    Mergeable accumulator for the exploratory data analysis (EDA) summary of NER data items.
+    Partial accumulators can be built per document or per shard, e.g. in parallel workers, 
+    and merged in document order into the same summary as accumulating all documents in one pass.
+    """
+    def __init__(self, rare_label_entity_count_threshold: int = 10):
+        """
+        Initialize an empty EdaSummaryAccumulator.
+        :param rare_label_entity_count_threshold: Threshold to consider a label as rare.
+        """
+        self.rare_label_entity_count_threshold: int = rare_label_entity_count_threshold
+        self.total_files: int = 0
+        self.total_sentences: int = 0
+        self.total_tokens: int = 0
+        self.total_entities: int = 0
+        self.file_wise_sentence_token_entity_count: Dict[str, Tuple[int, int, int]] = dict()
+        self.label_wise_entity_count: Dict[str, int] = dict()
+        self.file_wise_label_wise_entity_count: Dict[str, Dict[str, int]] = dict()
+        # entities of a label are only kept as long as the label count stays within the threshold, 
+        # a label above the threshold in a part is above it in every merge of that part as well
+        self.rare_label_candidate_entity_items: Dict[str, List[Dict[str, Any]]] = dict()
+        self.non_rare_labels: Set[str] = set()
+
+    def add(self, ner_data: Union[Dict[str, Any], NerDocument]) -> "EdaSummaryAccumulator":
+        """
+        Accumulate a single NER data item, the item is not modified.
+        For a NerDocument, entity dictionaries are only built for the entities kept as rare label candidates.
+        :param ner_data: The NER data dictionary object or NerDocument.
+        :return: The accumulator itself.
+        """
+        if isinstance(ner_data, NerDocument):
+            document_title = ner_data.document_title
+            sentence_count = ner_data.sentence_count
+            token_count = ner_data.token_count
+            entity_count = ner_data.entity_count
+            entity_labels = ner_data.entity_labels
+            get_entity = ner_data.get_entity
+        else:
+            document_title = ner_data.get("document_title", "")
+            sentence_count = len(ner_data.get("sentences", []))
+            token_count = len(ner_data.get("tokens", []))
+            entities = ner_data.get("entities", [])
+            entity_count = len(entities)
+            entity_labels = [entity.get("label", "") for entity in entities]
+            get_entity = entities.__getitem__
+        self.total_files += 1
+        self.total_sentences += sentence_count
+        self.total_tokens += token_count
+        self.total_entities += entity_count
+        self.file_wise_sentence_token_entity_count[document_title] = (sentence_count, token_count, entity_count)
+        for entity_index, label in enumerate(entity_labels):
+            if label:
+                self.label_wise_entity_count[label] = self.label_wise_entity_count.get(label, 0) + 1
+                if document_title not in self.file_wise_label_wise_entity_count:
+                    self.file_wise_label_wise_entity_count[document_title] = dict()
+                if label not in self.file_wise_label_wise_entity_count[document_title]:
+                    self.file_wise_label_wise_entity_count[document_title][label] = 0
+                self.file_wise_label_wise_entity_count[document_title][label] += 1
+                if label in self.non_rare_labels:
+                    continue
+                if self.label_wise_entity_count[label] > self.rare_label_entity_count_threshold:
+                    self._mark_non_rare(label)
+                    continue
+                if label not in self.rare_label_candidate_entity_items:
+                    self.rare_label_candidate_entity_items[label] = list()
+                self.rare_label_candidate_entity_items[label].append(dict(get_entity(entity_index), document_title=document_title))
+        return self
+
+    def merge(self, other: "EdaSummaryAccumulator") -> "EdaSummaryAccumulator":
+        """
+        Merge the accumulator of the documents following the documents of this accumulator into this accumulator.
+        Merging is associative, so parts can be merged in any grouping as long as their document order is kept.
+        :param other: The accumulator to merge, it is not modified.
+        :return: The accumulator itself.
+        """
+        if other.rare_label_entity_count_threshold != self.rare_label_entity_count_threshold:
+            raise ValueError("Cannot merge EDA summary accumulators with different rare label entity count thresholds.")
+        self.total_files += other.total_files
+        self.total_sentences += other.total_sentences
+        self.total_tokens += other.total_tokens
+        self.total_entities += other.total_entities
+        self.file_wise_sentence_token_entity_count.update(other.file_wise_sentence_token_entity_count)
+        for label, count in other.label_wise_entity_count.items():
+            self.label_wise_entity_count[label] = self.label_wise_entity_count.get(label, 0) + count
+        for document_title, label_wise_entity_count in other.file_wise_label_wise_entity_count.items():
+            if document_title not in self.file_wise_label_wise_entity_count:
+                self.file_wise_label_wise_entity_count[document_title] = dict()
+            for label, count in label_wise_entity_count.items():
+                self.file_wise_label_wise_entity_count[document_title][label] = (
+                    self.file_wise_label_wise_entity_count[document_title].get(label, 0) + count
+                )
+        for label in other.non_rare_labels:
+            self._mark_non_rare(label)
+        for label, entity_items in other.rare_label_candidate_entity_items.items():
+            if label in self.non_rare_labels:
+                continue
+            if self.label_wise_entity_count[label] > self.rare_label_entity_count_threshold:
+                self._mark_non_rare(label)
+                continue
+            if label not in self.rare_label_candidate_entity_items:
+                self.rare_label_candidate_entity_items[label] = list()
+            self.rare_label_candidate_entity_items[label].extend(dict(entity_item) for entity_item in entity_items)
+        return self
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        Get the EDA summary of all accumulated documents.
+        :return: The EDA summary dictionary.
+        """
+        rare_label_wise_entity_items: Dict[str, List[Dict[str, Any]]] = dict()
+        if self.rare_label_entity_count_threshold > 0:
+            rare_label_wise_entity_items = {
+                label: [dict(entity_item) for entity_item in entity_items] 
+                for label, entity_items in self.rare_label_candidate_entity_items.items()
+            }
+        return {
+            "total_files": self.total_files,
+            "total_sentences": self.total_sentences,
+            "total_tokens": self.total_tokens,
+            "total_labels": len(self.label_wise_entity_count),
+            "total_entities": self.total_entities,
+            "file_wise_sentence_token_entity_count": dict(self.file_wise_sentence_token_entity_count),
+            "label_wise_entity_count": dict(sorted(self.label_wise_entity_count.items())),
+            "file_wise_label_wise_entity_count": dict(sorted(
+                (document_title, dict(sorted(label_wise_entity_count.items()))) 
+                for document_title, label_wise_entity_count in self.file_wise_label_wise_entity_count.items()
+            )),
+            "rare_label_wise_entity_items": dict(sorted(rare_label_wise_entity_items.items()))
+        }
+
+    def _mark_non_rare(self, label: str) -> None:
+        """
+        Mark a label as non-rare and drop the entities kept for it as rare label candidates.
+        :param label: The label to mark.
+        """
+        self.non_rare_labels.add(label)
+        self.rare_label_candidate_entity_items.pop(label, None)
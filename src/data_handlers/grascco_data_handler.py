@@ -1,32 +1,81 @@
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from data_handlers.eda_summary_accumulator import EdaSummaryAccumulator
+from data_handlers.ner_document import NerDocument
+from data_handlers.ner_fold_manager import NerFoldManager
 from datasets import Dataset, DatasetDict
+from functools import partial
 from pandas import DataFrame
 from pathlib import Path
 from sklearn.model_selection import KFold
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Union
+from utils.bioes_utils import BioesUtils
+from utils.profiling_utils import ProfilingUtils
 
+import hashlib
 import json
 import numpy as np
-import pandas as pd
+import os
+import pyarrow as pa
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@ProfilingUtils.profile_stage("load_json_file", lambda result, json_file: 1)
+def _read_json_file(json_file: Path) -> Dict[str, Any]:
+    """
+    Read and decode a single JSON file, using orjson when it is installed and the standard json module otherwise.
+    Defined at module level so that it can be pickled and dispatched to a process pool.
+    :param json_file: Path to the JSON file to read.
+    :return: The decoded JSON data dictionary object.
+    """
+    if orjson is not None:
+        return orjson.loads(json_file.read_bytes())
+    with json_file.open("r", encoding="utf-8") as f:
+        return json.load(f)
 
 
 class GrasccoDataHandler:
     """
     Data handler for the GraSCCo dataset.
     """
-    def __init__(self, project_root: Path, data_dir: Path = None):
+    json_loading_modes: Tuple[str, ...] = ("sequential", "thread", "process")
+    _ner_arrow_manifest_key: str = "grascco_ner_data_manifest"
+
+    def __init__(self, 
+                 project_root: Path, 
+                 data_dir: Path = None, 
+                 json_loading_mode: str = "sequential", 
+                 max_workers: int = None, 
+                 incremental_rebuild: bool = False):
         """
         Initialize the GrasccoDataHandler with the path to the data directory.
         The path to all the GraSCCo PHI annotation .json files exports created 
         with the INCEpTION annotation platform.
         :param project_root: Path to the root of the project.
         :param data_dir: Optional path to the data directory. If None, defaults to 'data' directory in the project root.
+        :param json_loading_mode: How to load the JSON files, one of 'sequential', 'thread' or 'process'.
+        :param max_workers: Optional number of workers for the 'thread' and 'process' loading modes. If None, defaults to the executor's default.
+        :param incremental_rebuild: Whether a stale NER data cache is patched by re-extracting only the added or changed JSON files, 
+                                    instead of being rebuilt from all JSON files.
         """
+        if json_loading_mode not in self.json_loading_modes:
+            raise ValueError(
+                f"Unknown json_loading_mode '{json_loading_mode}', expected one of {self.json_loading_modes}."
+            )
+
         self.project_root = project_root
         if data_dir:
             self.data_dir: Path = data_dir
         else:
             self.data_dir: Path = self.project_root / "data"
+        self.json_loading_mode: str = json_loading_mode
+        self.max_workers: int = max_workers
+        self.incremental_rebuild: bool = incremental_rebuild
         
         self._json_data_files_dir: Path = self.data_dir / "raw" / "11502329" / "grascco_phi_annotation_json"
         self._json_data_items: List[Dict[str, Any]] = list()
@@ -48,18 +97,51 @@ class GrasccoDataHandler:
         self._ner_data_items: Dict[str, Any] = dict()
         self._eda_summary: Dict[str, Any] = dict()
         self._ner_dataframe: DataFrame = None
-        self._load_json_files()
+        self._ner_arrow_table: pa.Table = None
+        self._fold_wise_document_titles: Dict[int, List[Tuple[int, List[str], List[str], List[str]]]] = dict()
+        self._fold_managers: Dict[int, NerFoldManager] = dict()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Drop the cached raw JSON data, NER data items, EDA summary, dataframe and folds when the handler is pickled, 
+        e.g. for dispatching its bound methods to process pool workers.
+        :return: The picklable state of the handler.
+        """
+        state = self.__dict__.copy()
+        state["_json_data_items"] = list()
+        state["_ner_data_items"] = dict()
+        state["_eda_summary"] = dict()
+        state["_ner_dataframe"] = None
+        state["_ner_arrow_table"] = None
+        state["_fold_wise_document_titles"] = dict()
+        state["_fold_managers"] = dict()
+        return state
+
+    def _get_json_files(self) -> List[Path]:
+        """
+        Get the paths of all JSON files in the data directory, sorted by file name.
+        :return: A list of JSON file paths.
+        """
+        return sorted(self._json_data_files_dir.glob("*.json"), key=lambda json_file: json_file.name)
 
     def _load_json_files(self):
         """
-        Load all JSON files from the data directory.
+        Load all JSON files from the data directory and keep the raw JSON data items in memory.
+        The NER data pipeline does not need this anymore, see iter_ner_data_items().
+        In 'thread' and 'process' loading modes the files are decoded concurrently, 
+        the resulting items keep the same file name order as in 'sequential' mode.
         """
-        json_data_path_dict: Dict[str, Dict[str, Any]] = dict()
-        for json_file in self._json_data_files_dir.glob("*.json"):
-            with json_file.open("r", encoding="utf-8") as f:
-                data: Dict[str, Any] = json.load(f)
-                json_data_path_dict[json_file.name] = data
-        self._json_data_items = [v for k, v in sorted(json_data_path_dict.items())]
+        json_files: List[Path] = self._get_json_files()
+        if self.json_loading_mode == "sequential":
+            self._json_data_items = [_read_json_file(json_file) for json_file in json_files]
+            return
+
+        executor_class = ThreadPoolExecutor if self.json_loading_mode == "thread" else ProcessPoolExecutor
+        with executor_class(max_workers=self.max_workers) as executor:
+            chunksize = 1
+            if self.json_loading_mode == "process":
+                chunksize = max(1, len(json_files) // ((self.max_workers or os.cpu_count() or 1) * 4))
+            self._json_data_items = list(executor.map(_read_json_file, json_files, chunksize=chunksize))
 
     def _extract_ner_data(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -67,84 +149,149 @@ class GrasccoDataHandler:
         :param json_data: The JSON data dictionary object to process.
         :return: The NER data dictionary object.
         """
-        ner_data: Dict[str, Any] = dict()
-        
+        return self._extract_ner_document(json_data).to_ner_data()
+
+    @ProfilingUtils.profile_stage("extract_ner_data", lambda result, self, json_data: 1)
+    def _extract_ner_document(self, json_data: Dict[str, Any]) -> NerDocument:
+        """
+        Extract NER relevant data from a single dict object extracted from corresponding JSON file 
+        directly into a compact NerDocument, without building per sentence, token and entity dictionaries.
+        :param json_data: The JSON data dictionary object to process.
+        :return: The NerDocument.
+        """
         document_title: str = ""
         document_text: str = ""
-        sentences: List[Dict[str, Any]] = list()
-        tokens: List[Dict[str, Any]] = list()
-        entities: List[Dict[str, Any]] = list()
 
         features_structures = json_data[self._json_data_required_key_dict["feature_structures"]]
+
+        type_key: str = self._json_data_required_key_dict["type"]
+        begin_key: str = self._json_data_required_key_dict["begin"]
+        end_key: str = self._json_data_required_key_dict["end"]
+        kind_key: str = self._json_data_required_key_dict["kind"]
+        phi_type: str = self._json_data_required_key_dict["phi"]
+        document_meta_data_type: str = self._json_data_required_key_dict["document_meta_data"]
+        sofa_type: str = self._json_data_required_key_dict["sofa"]
+
+        # sentences and tokens make up most of the feature structures, 
+        # so their offsets are collected in lists looked up by type with a single dict access 
+        # and all feature structures of other types are skipped after at most three comparisons
+        sentence_spans: List[Tuple[int, int]] = list()
+        token_spans: List[Tuple[int, int]] = list()
+        entity_spans: List[Tuple[int, int, str]] = list()
+        type_wise_spans: Dict[str, List[Tuple[int, int]]] = {
+            self._json_data_required_key_dict["sentence"]: sentence_spans,
+            self._json_data_required_key_dict["token"]: token_spans
+        }
         
         for item in features_structures:
-            if item[self._json_data_required_key_dict["type"]] == self._json_data_required_key_dict["document_meta_data"]:
+            item_type: str = item[type_key]
+            spans = type_wise_spans.get(item_type)
+            if spans is not None:
+                spans.append((item[begin_key], item[end_key]))
+            elif item_type == phi_type:
+                entity_spans.append((item[begin_key], item[end_key], item.get(kind_key, "")))
+            elif item_type == document_meta_data_type:
                 document_title = item[self._json_data_required_key_dict["document_title"]]
-            elif item[self._json_data_required_key_dict["type"]] == self._json_data_required_key_dict["sofa"]:
+            elif item_type == sofa_type:
                 document_text = item[self._json_data_required_key_dict["sofa_string"]]
-            elif item[self._json_data_required_key_dict["type"]] == self._json_data_required_key_dict["sentence"]:
-                sentence: Dict[str, Any] = {
-                    "begin": item[self._json_data_required_key_dict["begin"]],
-                    "end": item[self._json_data_required_key_dict["end"]]
-                }
-                sentences.append(sentence)
-            elif item[self._json_data_required_key_dict["type"]] == self._json_data_required_key_dict["token"]:
-                token: Dict[str, Any] = {
-                    "begin": item[self._json_data_required_key_dict["begin"]],
-                    "end": item[self._json_data_required_key_dict["end"]]
-                }
-                tokens.append(token)
-            elif item[self._json_data_required_key_dict["type"]] == self._json_data_required_key_dict["phi"]:
-                label: str = ""
-                if self._json_data_required_key_dict["kind"] in item:
-                    label = item[self._json_data_required_key_dict["kind"]]
-                entity: Dict[str, Any] = {
-                    "begin": item[self._json_data_required_key_dict["begin"]],
-                    "end": item[self._json_data_required_key_dict["end"]],
-                    "label": label
-                }
-                entities.append(entity)
-
-        [s.update({"text": document_text[s["begin"]:s["end"]]}) for s in sentences]
-        [t.update({"text": document_text[t["begin"]:t["end"]]}) for t in tokens]
-        [e.update({"text": document_text[e["begin"]:e["end"]]}) for e in entities]
-
-        ner_data["document_title"] = document_title
-        ner_data["document_text"] = document_text
-        ner_data["sentences"] = sentences
-        ner_data["tokens"] = tokens
-        ner_data["entities"] = entities
-
-        if ner_data["document_title"] == "Queisser.txt":
-            ner_data = self._fix_queisser_missing_age_entity_label(ner_data)
-
-        return ner_data
+
+        if document_title == "Queisser.txt":
+            entity_spans = self._fix_queisser_missing_age_entity_span_label(document_text, entity_spans)
+
+        return NerDocument(
+            document_title=document_title,
+            document_text=document_text,
+            sentence_begins=[b for b, _ in sentence_spans],
+            sentence_ends=[e for _, e in sentence_spans],
+            token_begins=[b for b, _ in token_spans],
+            token_ends=[e for _, e in token_spans],
+            entity_begins=[b for b, _, _ in entity_spans],
+            entity_ends=[e for _, e, _ in entity_spans],
+            entity_labels=[l for _, _, l in entity_spans]
+        )
+
+    @staticmethod
+    def _fix_queisser_missing_age_entity_span_label(document_text: str, 
+                                                    entity_spans: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+        """
+        Fix missing age entity label in the entity spans of Queisser.txt_phi.json file.
+        :param document_text: The text of the document.
+        :param entity_spans: The (begin, end, label) spans of the entities to fix.
+        :return: The fixed entity spans.
+        """
+        return [
+            (b, e, "AGE") if b == 1219 and e == 1221 and document_text[b:e] == "49" else (b, e, l) 
+            for b, e, l in entity_spans
+        ]
     
-    def _fix_queisser_missing_age_entity_label(self, ner_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Fix missing age entity label in the NER data of Queisser.txt_phi.json file.
-        :param ner_data: The NER data to fix.
-        :return: The fixed NER data.
-        """
-        entities: List[Dict[str, Any]] = ner_data["entities"]
-        fixed_entities: List[Dict[str, Any]] = list()
-        if ner_data["document_title"] == "Queisser.txt":
-            for entity in entities:
-                if entity["begin"] == 1219 and entity["end"] == 1221 and entity["text"] == "49":
-                    entity["label"] = "AGE"
-                fixed_entities.append(entity)
-        ner_data["entities"] = fixed_entities
-        return ner_data
+    def _read_and_extract_ner_data(self, json_file: Path) -> Dict[str, Any]:
+        """
+        Read a single JSON file and extract its NER relevant data, the raw JSON data is released afterwards.
+        :param json_file: Path to the JSON file to process.
+        :return: The NER data dictionary object.
+        """
+        return self._extract_ner_data(_read_json_file(json_file))
+
+    def _read_and_extract_ner_document(self, json_file: Path) -> NerDocument:
+        """
+        Read a single JSON file and extract its NER relevant data as NerDocument, the raw JSON data is released afterwards.
+        :param json_file: Path to the JSON file to process.
+        :return: The NerDocument.
+        """
+        return self._extract_ner_document(_read_json_file(json_file))
+
+    def iter_ner_data_items(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield the NER data dictionaries in file name order, opening, extracting and releasing one JSON file at a time.
+        In 'thread' and 'process' loading modes a bounded window of files is extracted concurrently, 
+        so that the peak memory does not grow with the number of documents.
+        :return: An iterator over NER data dictionaries.
+        """
+        yield from self._iter_mapped_json_files(self._read_and_extract_ner_data)
+
+    def _iter_mapped_json_files(self, function: Callable[[Path], Any]) -> Iterator[Any]:
+        """
+        Lazily apply a function to every JSON file path and yield the results in file name order.
+        In 'thread' and 'process' loading modes a bounded window of files is processed concurrently, 
+        in 'process' mode the function has to be picklable.
+        :param function: The function to apply to each JSON file path.
+        :return: An iterator over the function results.
+        """
+        json_files: List[Path] = self._get_json_files()
+        if self.json_loading_mode == "sequential":
+            for json_file in json_files:
+                yield function(json_file)
+            return
+
+        executor_class = ThreadPoolExecutor if self.json_loading_mode == "thread" else ProcessPoolExecutor
+        window_size = (self.max_workers or os.cpu_count() or 1) * 4
+        with executor_class(max_workers=self.max_workers) as executor:
+            for window_start in range(0, len(json_files), window_size):
+                window = json_files[window_start: window_start + window_size]
+                yield from executor.map(function, window)
+
+    def iter_ner_documents(self) -> Iterator[NerDocument]:
+        """
+        Lazily yield the NER data items as compact, array-backed NerDocument objects in file name order, 
+        extracted directly from the JSON files like iter_ner_data_items().
+        :return: An iterator over NerDocument objects.
+        """
+        yield from self._iter_mapped_json_files(self._read_and_extract_ner_document)
+
+    def _get_ner_data_items_source(self) -> Iterable[Union[Dict[str, Any], NerDocument]]:
+        """
+        Get the already built NER data items if available, otherwise a lazy iterator over them as NerDocument objects.
+        :return: An iterable over NER data dictionaries or NerDocument objects.
+        """
+        if self._ner_data_items:
+            return self._ner_data_items
+        return self.iter_ner_documents()
 
     def _build_ner_data_items(self) -> None:
         """
-        Collect NER relevant data from the dict objects loaded for all JSON data files.
+        Collect NER relevant data from all JSON data files.
         """
-        ner_data_list: List[Dict[str, Any]] = list()
-        for json_data in self._json_data_items:
-            ner_data = self._extract_ner_data(json_data)
-            ner_data_list.append(ner_data)
-        self._ner_data_items = ner_data_list
+        self._ner_data_items = list(self.iter_ner_data_items())
 
     def get_ner_data_items(self) -> List[Dict[str, Any]]:
         """
@@ -155,99 +302,159 @@ class GrasccoDataHandler:
             self._build_ner_data_items()
         return self._ner_data_items
     
-    def _build_bioes_text_for_ner_data_item(self, ner_data: Dict[str, Any]) -> str:
+    def _build_bioes_text_for_ner_data_item(self, ner_data: Union[Dict[str, Any], NerDocument]) -> str:
         """
         Prepare the BIOES formatted text from the NER data dictionary object.
-        :param ner_data: The NER data dictionary object to process.
+        :param ner_data: The NER data dictionary object or NerDocument to process.
         :return: The BIOES formatted text.
         """
-        tokens: List[Dict[str, Any]] = ner_data.get("tokens", list())
-        entities: List[Dict[str, Any]] = ner_data.get("entities", list())
-
-        [t.update({"bioes_tag": "O"}) for t in tokens]
-
-        for entity in entities:
-            begin = entity.get("begin", 0)
-            end = entity.get("end", 0)
-            label = entity.get("label", "")
-            tokens_within_entity_boundary: List[Dict[str, Any]] = list()
-            for token in tokens:
-                if token["begin"] >= begin and token["end"] <= end:
-                    tokens_within_entity_boundary.append(token)
-            if tokens_within_entity_boundary:
-                if len(tokens_within_entity_boundary) == 1:
-                    tokens_within_entity_boundary[0]["bioes_tag"] = f"S-{label}"
-                else:
-                    tokens_within_entity_boundary[0]["bioes_tag"] = f"B-{label}"
-                    for i in range(1, len(tokens_within_entity_boundary) - 1):
-                        tokens_within_entity_boundary[i]["bioes_tag"] = f"I-{label}"
-                    tokens_within_entity_boundary[-1]["bioes_tag"] = f"E-{label}"
-        
-        return "\n".join(f"{token["text"]} {token["bioes_tag"]}" for token in tokens)
-    
-    def _build_eda_summary(self, rare_label_entity_count_threshold=10) -> None:
+        return self._build_bioes_texts_for_ner_data_items([ner_data])[0]
+
+    @ProfilingUtils.profile_stage("build_bioes_texts", lambda result, *args, **kwargs: len(result))
+    def _build_bioes_texts_for_ner_data_items(self, ner_data_items: List[Union[Dict[str, Any], NerDocument]]) -> List[str]:
         """
-        Build an exploratory data analysis (EDA) summary of the NER data.
+        Prepare the BIOES formatted texts for many NER data dictionary objects or NerDocument objects, 
+        tagging all of them in one batch. The tags are also stored under the 'bioes_tag' key of each token dictionary, 
+        NerDocument offsets are passed to the tagger as they are.
+        :param ner_data_items: The NER data dictionary objects or NerDocument objects to process.
+        :return: The BIOES formatted texts, one per NER data item.
+        """
+        documents_token_begins: List[Sequence[int]] = list()
+        documents_token_ends: List[Sequence[int]] = list()
+        documents_entity_begins: List[Sequence[int]] = list()
+        documents_entity_ends: List[Sequence[int]] = list()
+        documents_entity_labels: List[Sequence[str]] = list()
+        for ner_data in ner_data_items:
+            if isinstance(ner_data, NerDocument):
+                documents_token_begins.append(ner_data.token_begins)
+                documents_token_ends.append(ner_data.token_ends)
+                documents_entity_begins.append(ner_data.entity_begins)
+                documents_entity_ends.append(ner_data.entity_ends)
+                documents_entity_labels.append(ner_data.entity_labels)
+                continue
+            tokens: List[Dict[str, Any]] = ner_data.get("tokens", list())
+            entities: List[Dict[str, Any]] = ner_data.get("entities", list())
+            documents_token_begins.append([token["begin"] for token in tokens])
+            documents_token_ends.append([token["end"] for token in tokens])
+            documents_entity_begins.append([entity.get("begin", 0) for entity in entities])
+            documents_entity_ends.append([entity.get("end", 0) for entity in entities])
+            documents_entity_labels.append([entity.get("label", "") for entity in entities])
+
+        documents_tags = BioesUtils.get_bioes_tags_for_documents(
+            documents_token_begins,
+            documents_token_ends,
+            documents_entity_begins,
+            documents_entity_ends,
+            documents_entity_labels
+        )
+
+        bioes_texts: List[str] = list()
+        for ner_data, tags in zip(ner_data_items, documents_tags):
+            if isinstance(ner_data, NerDocument):
+                bioes_texts.append("\n".join(f"{text} {tag}" for text, tag in zip(ner_data.get_token_texts(), tags)))
+                continue
+            tokens = ner_data.get("tokens", list())
+            [token.update({"bioes_tag": tag}) for token, tag in zip(tokens, tags)]
+            bioes_texts.append("\n".join(f"{token["text"]} {token["bioes_tag"]}" for token in tokens))
+        return bioes_texts
+
+    @staticmethod
+    def get_chunk_token_ranges(ner_data: Dict[str, Any],
+                               bioes_tags: List[str],
+                               chunking_mode: str = "document",
+                               max_subword_count: int = 256,
+                               get_subword_count: Callable[[str], int] = None) -> List[Tuple[int, int]]:
+        """
+        Get the token ranges of the chunks of a document, see BioesUtils.get_chunk_token_ranges for the chunking modes.
+        :param ner_data: NER data dictionary object or NER dataframe row with 'tokens' and 'sentences'.
+        :param bioes_tags: The BIOES tags of the tokens.
+        :param chunking_mode: One of 'document', 'sentence' and 'subword_budget'.
+        :param max_subword_count: Maximum number of subwords per chunk in 'subword_budget' mode.
+        :param get_subword_count: Function returning the number of subwords of a token text,
+                                  required in 'subword_budget' mode.
+        :return: List of (start, stop) token index ranges of the chunks.
+        """
+        if chunking_mode == "subword_budget" and get_subword_count is None:
+            raise ValueError("get_subword_count is required in 'subword_budget' chunking mode.")
+        tokens = ner_data["tokens"]
+        sentence_start_token_indices = BioesUtils.get_sentence_start_token_indices(
+            [token["begin"] for token in tokens],
+            [sentence["begin"] for sentence in ner_data["sentences"]]
+        ) if chunking_mode != "document" else list()
+        return BioesUtils.get_chunk_token_ranges(
+            bioes_tags,
+            sentence_start_token_indices,
+            chunking_mode=chunking_mode,
+            subword_counts=[get_subword_count(token["text"]) for token in tokens] if chunking_mode == "subword_budget" else None,
+            max_subword_count=max_subword_count
+        )
+
+    @staticmethod
+    def get_chunked_bioes_text(ner_data: Dict[str, Any],
+                               chunking_mode: str = "document",
+                               max_subword_count: int = 256,
+                               get_subword_count: Callable[[str], int] = None) -> str:
+        """
+        Split the BIOES formatted text of a document into chunks separated by empty lines,
+        so every chunk becomes a separate sentence of a Flair ColumnCorpus. No chunk cuts through an entity,
+        see BioesUtils.get_chunk_token_ranges for the chunking modes.
+        :param ner_data: NER data dictionary object or NER dataframe row with 'tokens', 'sentences' and 'bioes_text'.
+        :param chunking_mode: One of 'document', 'sentence' and 'subword_budget'.
+        :param max_subword_count: Maximum number of subwords per chunk in 'subword_budget' mode.
+        :param get_subword_count: Function returning the number of subwords of a token text,
+                                  required in 'subword_budget' mode.
+        :return: The chunked BIOES formatted text.
+        """
+        bioes_text: str = ner_data["bioes_text"]
+        if chunking_mode == "document":
+            return bioes_text
+        bioes_lines = bioes_text.split("\n") if len(ner_data["tokens"]) else list()
+        chunk_token_ranges = GrasccoDataHandler.get_chunk_token_ranges(
+            ner_data,
+            [line.rsplit(" ", 1)[1] for line in bioes_lines],
+            chunking_mode=chunking_mode,
+            max_subword_count=max_subword_count,
+            get_subword_count=get_subword_count
+        )
+        return "\n\n".join("\n".join(bioes_lines[start: stop]) for start, stop in chunk_token_ranges)
+
+    def _read_and_extract_eda_summary_accumulator(self, 
+                                                  json_file: Path, 
+                                                  rare_label_entity_count_threshold: int) -> EdaSummaryAccumulator:
+        """
+        Read a single JSON file and accumulate the EDA summary of its NER data.
+        :param json_file: Path to the JSON file to process.
         :param rare_label_entity_count_threshold: Threshold to consider a label as rare.
+        :return: The EDA summary accumulator of the document.
         """
-        ner_data_items = self.get_ner_data_items()
+        return EdaSummaryAccumulator(rare_label_entity_count_threshold).add(self._read_and_extract_ner_document(json_file))
 
-        total_sentences: int = 0
-        total_tokens: int = 0
-        total_entities: int = 0
-        file_wise_sentence_token_entity_count: Dict[str, Tuple[int, int, int]] = dict()
-        label_wise_entity_count: Dict[str, int] = dict()
-        file_wise_label_wise_entity_count: Dict[str, Dict[str, int]] = dict()
-        
-        for item in ner_data_items:
-            document_title = item.get("document_title", "")
-            sentence_count = len(item.get("sentences", []))
-            total_sentences += sentence_count
-            token_count = len(item.get("tokens", []))
-            total_tokens += token_count
-            entities = item.get("entities", [])
-            entity_count = len(entities)
-            total_entities += entity_count
-            file_wise_sentence_token_entity_count[document_title] = (sentence_count, token_count, entity_count)
-            for entity in entities:
-                label = entity.get("label", "")
-                if label:
-                    label_wise_entity_count[label] = label_wise_entity_count.get(label, 0) + 1
-                    if document_title not in file_wise_label_wise_entity_count:
-                        file_wise_label_wise_entity_count[document_title] = dict()
-                    if label not in file_wise_label_wise_entity_count[document_title]:
-                        file_wise_label_wise_entity_count[document_title][label] = 0
-                    file_wise_label_wise_entity_count[document_title][label] += 1
-        
-        for k, v in file_wise_label_wise_entity_count.items():
-            file_wise_label_wise_entity_count[k] = dict(sorted(v.items()))
-                
-        self._eda_summary["total_files"] = len(ner_data_items)
-        self._eda_summary["total_sentences"] = total_sentences
-        self._eda_summary["total_tokens"] = total_tokens
-        self._eda_summary["total_labels"] = len(label_wise_entity_count)
-        self._eda_summary["total_entities"] = total_entities
-        self._eda_summary["file_wise_sentence_token_entity_count"] = file_wise_sentence_token_entity_count
-        self._eda_summary["label_wise_entity_count"] = dict(sorted(label_wise_entity_count.items()))
-        self._eda_summary["file_wise_label_wise_entity_count"] = dict(sorted(file_wise_label_wise_entity_count.items()))
-
-        rare_labels: List[str] = list()
-        if rare_label_entity_count_threshold > 0:
-            rare_labels = [label for label, count in label_wise_entity_count.items() if count <= rare_label_entity_count_threshold]
-        
-        rare_label_wise_entity_items: Dict[str, List[Dict[str, Any]]] = dict()
-        for item in self._ner_data_items:
-            document_title = item.get("document_title", "")
-            entities = item.get("entities", [])
-            for entity in entities:
-                label = entity.get("label", "")
-                if label:
-                    if label in rare_labels:
-                        entity.update({"document_title": document_title})
-                        if label not in rare_label_wise_entity_items:
-                            rare_label_wise_entity_items[label] = list()
-                        rare_label_wise_entity_items[label].append(entity)
-        self._eda_summary["rare_label_wise_entity_items"] = dict(sorted(rare_label_wise_entity_items.items()))
+    @ProfilingUtils.profile_stage("build_eda_summary", lambda result, self, *args, **kwargs: self._eda_summary["total_files"])
+    def _build_eda_summary(self, 
+                           rare_label_entity_count_threshold=10, 
+                           ner_data_items: Iterable[Union[Dict[str, Any], NerDocument]] = None) -> None:
+        """
+        Build an exploratory data analysis (EDA) summary of the NER data.
+        Consumes the NER data items in a single pass, so it works on the lazy iterator as well, and does not modify them.
+        If the NER data items are not built yet and the loading mode is 'thread' or 'process', 
+        the EDA summary of every document is accumulated by the workers and the partial summaries are merged in file name order.
+        :param rare_label_entity_count_threshold: Threshold to consider a label as rare.
+        :param ner_data_items: Optional NER data items to summarize. If None, all NER data items are summarized.
+        """
+        accumulator = EdaSummaryAccumulator(rare_label_entity_count_threshold)
+        if ner_data_items is None and not self._ner_data_items and self.json_loading_mode != "sequential":
+            read_and_extract_eda_summary_accumulator = partial(
+                self._read_and_extract_eda_summary_accumulator, 
+                rare_label_entity_count_threshold=rare_label_entity_count_threshold
+            )
+            for document_accumulator in self._iter_mapped_json_files(read_and_extract_eda_summary_accumulator):
+                accumulator.merge(document_accumulator)
+        else:
+            if ner_data_items is None:
+                ner_data_items = self._get_ner_data_items_source()
+            for item in ner_data_items:
+                accumulator.add(item)
+        self._eda_summary = accumulator.get_summary()
 
     def get_eda_summary(self) -> Dict[str, Any]:
         """
@@ -258,97 +465,279 @@ class GrasccoDataHandler:
             self._build_eda_summary()
         return self._eda_summary
     
-    def _build_and_save_ner_dataframe(self) -> None:
+    def _get_ner_arrow_schema(self, labels: List[str]) -> pa.Schema:
+        """
+        Get the Arrow schema of the NER data cache, with native nested columns for sentences, tokens and entities.
+        :param labels: All entity labels of the corpus, each becomes a field of the label wise entity count struct.
+        :return: The Arrow schema.
         """
-        Build a pandas DataFrame from the NER data items and exploratory data analysis (EDA) summary.
+        span_fields: List[pa.Field] = [
+            pa.field("begin", pa.int32()), 
+            pa.field("end", pa.int32()), 
+            pa.field("text", pa.string())
+        ]
+        entity_fields: List[pa.Field] = span_fields[:2] + [pa.field("label", pa.string())] + span_fields[2:] + [
+            pa.field("document_title", pa.string())
+        ]
+        return pa.schema([
+            pa.field("ID", pa.int64()), 
+            pa.field("document_title", pa.string()), 
+            pa.field("document_text", pa.string()), 
+            pa.field("sentences", pa.list_(pa.struct(span_fields))), 
+            pa.field("tokens", pa.list_(pa.struct(span_fields))), 
+            pa.field("entities", pa.list_(pa.struct(entity_fields))), 
+            pa.field("sentence_count", pa.int64()), 
+            pa.field("token_count", pa.int64()), 
+            pa.field("entity_count", pa.int64()), 
+            pa.field("label_wise_entity_count", pa.struct([pa.field(label, pa.int64()) for label in labels])), 
+            pa.field("bioes_text", pa.string())
+        ])
+
+    @ProfilingUtils.profile_stage("build_and_save_ner_dataframe")
+    def _build_and_save_ner_dataframe(self, 
+                                      ner_data_items: Iterable[Union[Dict[str, Any], NerDocument]] = None, 
+                                      bioes_texts: List[str] = None, 
+                                      source_file_manifest: List[Dict[str, Any]] = None) -> None:
+        """
+        Build the NER data Arrow table and the exploratory data analysis (EDA) summary from the NER data items 
+        and save the table as memory-mappable Arrow IPC file, together with the manifest of the JSON files it was built from.
+        The EDA summary is accumulated in the same pass over the NER data items that collects the rows, 
+        so the NER data items are extracted only once. If they are not built yet, they are streamed from the JSON files 
+        as NerDocument objects.
+        :param ner_data_items: Optional NER data items to build the table from. If None, all NER data items are used.
+        :param bioes_texts: Optional already built BIOES texts aligned with the NER data items, None entries are built.
+        :param source_file_manifest: Optional manifest of the JSON files. If None, it is built from the current JSON files.
         :return: None
         """
-        ner_data_items = self.get_ner_data_items()
-        eda_summary = self.get_eda_summary()
-        tuples = list()
+        if ner_data_items is None:
+            ner_data_items = self._get_ner_data_items_source()
+        if source_file_manifest is None:
+            source_file_manifest = self._get_source_file_manifest()
+
+        accumulator = EdaSummaryAccumulator()
+        rows: List[Dict[str, Any]] = list()
         for idx, item in enumerate(ner_data_items):
-            document_title = item.get("document_title", "")
-            document_text = item.get("document_text", "")
-            sentences = json.dumps(item.get("sentences", []), ensure_ascii=False)
-            tokens = json.dumps(item.get("tokens", []), ensure_ascii=False)
-            entities = json.dumps(item.get("entities", []), ensure_ascii=False)
-            sentence_count = eda_summary.get("file_wise_sentence_token_entity_count", {}).get(document_title, (0, 0, 0))[0]
-            token_count = eda_summary.get("file_wise_sentence_token_entity_count", {}).get(document_title, (0, 0, 0))[1]
-            entity_count = eda_summary.get("file_wise_sentence_token_entity_count", {}).get(document_title, (0, 0, 0))[2]
-            label_wise_entity_count = json.dumps(eda_summary.get("file_wise_label_wise_entity_count", {}).get(document_title, {}), ensure_ascii=False)
-            bioes_text = self._build_bioes_text_for_ner_data_item(item)
-
-            tuples.append((
-                idx, 
-                document_title, 
-                document_text, 
-                sentences, 
-                tokens, 
-                entities, 
-                sentence_count, 
-                token_count, 
-                entity_count,
-                label_wise_entity_count, 
-                bioes_text
-            ))
-            
-        self._ner_dataframe = pd.DataFrame(
-            tuples,
-            columns=[
-                "ID", 
-                "document_title", 
-                "document_text", 
-                "sentences", 
-                "tokens", 
-                "entities", 
-                "sentence_count", 
-                "token_count", 
-                "entity_count", 
-                "label_wise_entity_count", 
-                "bioes_text"
+            accumulator.add(item)
+            bioes_text = bioes_texts[idx] if bioes_texts and bioes_texts[idx] is not None else self._build_bioes_text_for_ner_data_item(item)
+            # NerDocument items are expanded into the nested row columns only here
+            if isinstance(item, NerDocument):
+                item = item.to_ner_data()
+            rows.append({
+                "ID": idx, 
+                "document_title": item.get("document_title", ""), 
+                "document_text": item.get("document_text", ""), 
+                "sentences": item.get("sentences", []), 
+                "tokens": item.get("tokens", []), 
+                "entities": item.get("entities", []), 
+                "bioes_text": bioes_text
+            })
+        self._eda_summary = accumulator.get_summary()
+
+        eda_summary = self._eda_summary
+        rare_labels: Set[str] = set(eda_summary.get("rare_label_wise_entity_items", {}).keys())
+        for row in rows:
+            document_title = row["document_title"]
+            # entities of rare labels carry their document title in the dataframe, as in the EDA summary
+            row["entities"] = [
+                dict(entity, document_title=document_title) if entity.get("label", "") in rare_labels else entity 
+                for entity in row["entities"]
             ]
-        )
-        self._ner_dataframe.to_csv(self._get_grascco_ner_data_csv_file_path())
+            sentence_count, token_count, entity_count = eda_summary.get("file_wise_sentence_token_entity_count", {}).get(document_title, (0, 0, 0))
+            row["sentence_count"] = sentence_count
+            row["token_count"] = token_count
+            row["entity_count"] = entity_count
+            row["label_wise_entity_count"] = eda_summary.get("file_wise_label_wise_entity_count", {}).get(document_title, {})
+
+        schema = self._get_ner_arrow_schema(list(eda_summary.get("label_wise_entity_count", {}).keys()))
+        schema = schema.with_metadata({
+            self._ner_arrow_manifest_key: json.dumps({"source_files": source_file_manifest})
+        })
+        table = pa.Table.from_pylist(rows, schema=schema)
+
+        arrow_file_path = self._get_grascco_ner_data_arrow_file_path()
+        # every writer has its own temporary file, so that processes and threads sharing the data directory 
+        # replace each other's complete Arrow IPC file instead of moving away each other's temporary file
+        temp_arrow_file_path = arrow_file_path.with_name(f"{arrow_file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with pa.OSFile(str(temp_arrow_file_path), "wb") as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_arrow_file_path, arrow_file_path)
     
-    def _get_grascco_ner_data_csv_file_path(self) -> Path:
+    def _get_grascco_ner_data_arrow_file_path(self) -> Path:
+        """
+        Get the file path for the NER data Arrow IPC file.
+        :return: The Path object representing the Arrow IPC file path.
+        """
+        return self.data_dir / "grascco_ner_data.arrow"
+
+    @ProfilingUtils.profile_stage("get_source_file_manifest", lambda result, *args, **kwargs: len(result))
+    def _get_source_file_manifest(self, previous_source_file_manifest: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Get the name, modification time, size and SHA-256 content hash of every JSON file, in file name order.
+        Files whose modification time and size match the previous manifest keep their previous hash without being read.
+        :param previous_source_file_manifest: Optional previous manifest to take unchanged hashes from.
+        :return: List of manifest entries, one per JSON file.
+        """
+        previous_entries: Dict[str, Dict[str, Any]] = {entry["name"]: entry for entry in previous_source_file_manifest or list()}
+        source_file_manifest: List[Dict[str, Any]] = list()
+        for json_file in self._get_json_files():
+            stat = json_file.stat()
+            entry: Dict[str, Any] = {"name": json_file.name, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            previous_entry = previous_entries.get(json_file.name)
+            if previous_entry and previous_entry["mtime_ns"] == entry["mtime_ns"] and previous_entry["size"] == entry["size"]:
+                entry["sha256"] = previous_entry["sha256"]
+            else:
+                entry["sha256"] = hashlib.sha256(json_file.read_bytes()).hexdigest()
+            source_file_manifest.append(entry)
+        return source_file_manifest
+
+    def _get_ner_arrow_table_source_file_manifest(self, table: pa.Table) -> List[Dict[str, Any]]:
+        """
+        Get the manifest of the JSON files the NER data Arrow table was built from.
+        :param table: The NER data Arrow table.
+        :return: List of manifest entries in row order, or None if the table has no manifest.
+        """
+        metadata = table.schema.metadata or dict()
+        manifest_json = metadata.get(self._ner_arrow_manifest_key.encode("utf-8"))
+        if manifest_json is None:
+            return None
+        return json.loads(manifest_json).get("source_files")
+
+    @ProfilingUtils.profile_stage("read_ner_arrow_table", lambda result, *args, **kwargs: result.num_rows)
+    def _read_ner_arrow_table(self) -> pa.Table:
+        """
+        Read the NER data Arrow IPC file memory-mapped, the column buffers are not copied into memory.
+        :return: The NER data Arrow table, including the schema metadata.
+        """
+        with pa.memory_map(str(self._get_grascco_ner_data_arrow_file_path()), "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    @staticmethod
+    def _is_source_file_manifest_changed(previous_source_file_manifest: List[Dict[str, Any]], 
+                                         source_file_manifest: List[Dict[str, Any]]) -> bool:
+        """
+        Check whether JSON files were added, removed or changed in content between two manifests.
+        :param previous_source_file_manifest: The manifest of the JSON files a cache was built from.
+        :param source_file_manifest: The manifest of the current JSON files.
+        :return: True if the JSON files differ by name or content.
+        """
+        return [(entry["name"], entry["sha256"]) for entry in previous_source_file_manifest] != [
+            (entry["name"], entry["sha256"]) for entry in source_file_manifest
+        ]
+
+    def _iter_updated_ner_data_items(self, 
+                                     table: pa.Table, 
+                                     previous_source_file_manifest: List[Dict[str, Any]], 
+                                     source_file_manifest: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield the NER data items of the current JSON files in file name order. 
+        Items of unchanged files are restored from their rows of the previous NER data Arrow table, 
+        items of added or changed files are extracted from their JSON files.
+        :param table: The previous NER data Arrow table.
+        :param previous_source_file_manifest: The manifest of the JSON files the previous table was built from.
+        :param source_file_manifest: The manifest of the current JSON files.
+        :return: An iterator over NER data dictionaries.
+        """
+        previous_row_indices: Dict[Tuple[str, str], int] = {
+            (entry["name"], entry["sha256"]): row_index for row_index, entry in enumerate(previous_source_file_manifest)
+        }
+        ner_data_columns: List[str] = ["document_title", "document_text", "sentences", "tokens", "entities"]
+        for entry in source_file_manifest:
+            row_index = previous_row_indices.get((entry["name"], entry["sha256"]))
+            if row_index is None:
+                yield self._read_and_extract_ner_data(self._json_data_files_dir / entry["name"])
+                continue
+            ner_data: Dict[str, Any] = table.select(ner_data_columns).slice(row_index, 1).to_pylist()[0]
+            # the document title of rare label entities is added when building the table, see _build_and_save_ner_dataframe
+            [entity.pop("document_title") for entity in ner_data["entities"]]
+            yield ner_data
+
+    @ProfilingUtils.profile_stage("update_and_save_ner_dataframe")
+    def _update_and_save_ner_dataframe(self, 
+                                       table: pa.Table, 
+                                       previous_source_file_manifest: List[Dict[str, Any]], 
+                                       source_file_manifest: List[Dict[str, Any]]) -> None:
+        """
+        Patch the NER data Arrow table and the EDA summary for the added, changed and removed JSON files 
+        and save the table, only the added or changed JSON files are read and extracted.
+        The rows of unchanged files keep their BIOES texts, the result is identical to a full rebuild.
+        :param table: The previous NER data Arrow table.
+        :param previous_source_file_manifest: The manifest of the JSON files the previous table was built from.
+        :param source_file_manifest: The manifest of the current JSON files.
+        :return: None
+        """
+        previous_row_indices: Dict[Tuple[str, str], int] = {
+            (entry["name"], entry["sha256"]): row_index for row_index, entry in enumerate(previous_source_file_manifest)
+        }
+        previous_bioes_texts: List[str] = table.column("bioes_text").to_pylist()
+        bioes_texts: List[str] = list()
+        for entry in source_file_manifest:
+            row_index = previous_row_indices.get((entry["name"], entry["sha256"]))
+            bioes_texts.append(previous_bioes_texts[row_index] if row_index is not None else None)
+
+        self._build_and_save_ner_dataframe(
+            ner_data_items=self._iter_updated_ner_data_items(
+                table, previous_source_file_manifest, source_file_manifest
+            ), 
+            bioes_texts=bioes_texts, 
+            source_file_manifest=source_file_manifest
+        )
+
+    def get_ner_arrow_table(self) -> pa.Table:
         """
-        Get the file path for the NER data CSV file.
-        :return: The Path object representing the CSV file path.
+        Retrieve the memory-mapped Arrow table built from NER data items.
+        The cached Arrow IPC file is rebuilt if it does not exist or if the JSON files were added, removed or changed 
+        since it was built, in incremental rebuild mode only the added or changed JSON files are extracted again.
+        :return: The NER data Arrow table.
         """
-        return self.data_dir / "grascco_ner_data.csv"
+        if self._ner_arrow_table is not None:
+            return self._ner_arrow_table
+        table = None
+        previous_source_file_manifest = None
+        if self._get_grascco_ner_data_arrow_file_path().exists():
+            table = self._read_ner_arrow_table()
+            previous_source_file_manifest = self._get_ner_arrow_table_source_file_manifest(table)
+        if previous_source_file_manifest is None:
+            self._build_and_save_ner_dataframe()
+            table = self._read_ner_arrow_table()
+        else:
+            source_file_manifest = self._get_source_file_manifest(previous_source_file_manifest)
+            if self._is_source_file_manifest_changed(previous_source_file_manifest, source_file_manifest):
+                if self.incremental_rebuild:
+                    self._update_and_save_ner_dataframe(table, previous_source_file_manifest, source_file_manifest)
+                else:
+                    self._build_and_save_ner_dataframe(source_file_manifest=source_file_manifest)
+                table = self._read_ner_arrow_table()
+        self._ner_arrow_table = table
+        return self._ner_arrow_table
     
     def get_ner_dataframe(self) -> DataFrame:
         """
         Retrieve the pandas DataFrame built from NER data items.
+        Sentences, tokens and entities are lists of dicts, the label wise entity count is a dict over all labels 
+        of the corpus, with None for the labels that do not occur in the document.
         :return: The pandas DataFrame.
         """
-        grascco_ner_data_csv_file_path = self._get_grascco_ner_data_csv_file_path()
-        if grascco_ner_data_csv_file_path.exists():
-            self._ner_dataframe = pd.read_csv(grascco_ner_data_csv_file_path, index_col=0)
-        else:
-            self._build_and_save_ner_dataframe()
+        if self._ner_dataframe is None:
+            ner_arrow_table = self.get_ner_arrow_table()
+            with ProfilingUtils.stage("arrow_table_to_pandas", ner_arrow_table.num_rows):
+                self._ner_dataframe = ner_arrow_table.to_pandas()
         return self._ner_dataframe
     
-    def get_train_dev_test_datasetdict(self, k: int = 1) -> DatasetDict:
-        
+    def get_train_dev_test_fold_document_titles(self, n_fold: int = 5) -> List[Tuple[int, List[str], List[str], List[str]]]:
         """
-        Retrieve the train, dev, and test dataframes for the specified fold.
-        :param k: The fold number to retrieve (1-based index).
-        :return: A DatasetDict containing the train, dev, and test datasets.
+        Retrieve the document titles of the train, dev, and test splits of every fold.
+        The split assignments are computed once per number of folds and cached.
+        :param n_fold: Number of folds.
+        :return: A list of tuples (fold number, train titles, dev titles, test titles), one per fold.
         """
+        if n_fold in self._fold_wise_document_titles:
+            return self._fold_wise_document_titles[n_fold]
 
         random_state: int = 2025
-        ner_df = self.get_ner_dataframe()
-
-        label_wise_files: Dict[str, Set[str]] = dict()
-        rare_label_wise_entity_items = self.get_eda_summary().get("rare_label_wise_entity_items", {})
-        for label, items in rare_label_wise_entity_items.items():
-            files = set([item["document_title"] for item in items])
-            label_wise_files[label] = files
-
-        # for label, files in label_wise_files.items():
-        #     print(f"Label: {label}, Files: {files}, Count: {len(files)}")
+        document_titles: List[str] = self.get_ner_arrow_table().column("document_title").to_pylist()
 
+        # files of the rare labels, from the rare_label_wise_entity_items of the EDA summary:
         # Label: CONTACT_EMAIL, Files: {'Weil.txt'}, Count: 1
         # Label: CONTACT_FAX, Files: {'Weil.txt', 'Schielaug.txt', 'Joubert.txt', 'Meulengracht.txt', 'Schuh.txt', 'Dupuytren.txt'}, Count: 6
         # Label: LOCATION_COUNTRY, Files: {'Waldenström.txt', 'Recklinghausen.txt'}, Count: 2
@@ -378,37 +767,63 @@ class GrasccoDataHandler:
             'Dupuytren.txt'
         ]
 
-        # remove fixed items from ner_df
-        remaining_ner_df = ner_df[~ner_df['document_title'].isin(fixed_train_items + fixed_test_items + fixed_dev_items)]
-        remaining_ner_df.reset_index(drop=True, inplace=True)
+        # remove fixed items from document titles
+        fixed_items = set(fixed_train_items + fixed_test_items + fixed_dev_items)
+        remaining_document_titles = [title for title in document_titles if title not in fixed_items]
 
         fold_tuples = list()
-        splits = list(KFold(n_splits=5, shuffle=True, random_state=random_state).split(remaining_ner_df.index.to_numpy()))
-        train_dev_test_k_folds = self.get_train_dev_test_folds()
+        with ProfilingUtils.stage("kfold", len(remaining_document_titles)):
+            splits = list(KFold(n_splits=n_fold, shuffle=True, random_state=random_state).split(np.arange(len(remaining_document_titles))))
+        train_dev_test_k_folds = self.get_train_dev_test_folds(n_fold)
         for index, fold in enumerate(train_dev_test_k_folds):
-            train_indices = list()
-            fold_train_indices = fold[1]
-            for fold_train_index in fold_train_indices:
-                train_indices += list(splits[fold_train_index][1])
-            dev_indices = list()
-            fold_dev_indices = fold[2]
-            for fold_dev_index in fold_dev_indices:
-                dev_indices += list(splits[fold_dev_index][1])
-            test_indices = list()
-            fold_test_indices = fold[3]
-            for fold_test_index in fold_test_indices:
-                test_indices += list(splits[fold_test_index][1])
+            split_titles = list()
+            for fold_split_indices in fold[1:]:
+                indices = np.sort(np.concatenate([splits[fold_split_index][1] for fold_split_index in fold_split_indices]))
+                split_titles.append([remaining_document_titles[title_index] for title_index in indices])
             fold_tuples.append((
                 index + 1,
-                remaining_ner_df[remaining_ner_df.index.isin(train_indices)].document_title.tolist() + fixed_train_items,
-                remaining_ner_df[remaining_ner_df.index.isin(dev_indices)].document_title.tolist() + fixed_dev_items,
-                remaining_ner_df[remaining_ner_df.index.isin(test_indices)].document_title.tolist() + fixed_test_items
+                split_titles[0] + fixed_train_items,
+                split_titles[1] + fixed_dev_items,
+                split_titles[2] + fixed_test_items
             ))
+        self._fold_wise_document_titles[n_fold] = fold_tuples
+        return fold_tuples
+
+    def get_fold_manager(self, n_fold: int = 5) -> NerFoldManager:
+        """
+        Retrieve the fold manager exposing the train, dev, and test splits of every fold as index-selected views 
+        of one Dataset over the memory-mapped NER data Arrow table, the fold manager is cached per number of folds.
+        Unlike get_train_dev_test_datasetdict, the splits share the Arrow table instead of copying pandas slices 
+        and have the columns of the Arrow table, without a pandas index column.
+        :param n_fold: Number of folds.
+        :return: The NerFoldManager.
+        """
+        if n_fold not in self._fold_managers:
+            self._fold_managers[n_fold] = NerFoldManager(
+                Dataset(self.get_ner_arrow_table()), 
+                self.get_train_dev_test_fold_document_titles(n_fold)
+            )
+        return self._fold_managers[n_fold]
+
+    @ProfilingUtils.profile_stage("get_train_dev_test_datasetdict")
+    def get_train_dev_test_datasetdict(self, k: int = 1, n_fold: int = 5) -> DatasetDict:
         
-        kth_tuple = fold_tuples[k-1]
-        train_ds = Dataset.from_pandas(ner_df[ner_df.document_title.isin(kth_tuple[1])])
-        dev_ds = Dataset.from_pandas(ner_df[ner_df.document_title.isin(kth_tuple[2])])
-        test_ds = Dataset.from_pandas(ner_df[ner_df.document_title.isin(kth_tuple[3])])
+        """
+        Retrieve the train, dev, and test dataframes for the specified fold.
+        :param k: The fold number to retrieve (1-based index).
+        :param n_fold: Number of folds.
+        :return: A DatasetDict containing the train, dev, and test datasets.
+        """
+
+        ner_df = self.get_ner_dataframe()
+        kth_tuple = self.get_train_dev_test_fold_document_titles(n_fold)[k-1]
+        train_df = ner_df[ner_df.document_title.isin(kth_tuple[1])]
+        dev_df = ner_df[ner_df.document_title.isin(kth_tuple[2])]
+        test_df = ner_df[ner_df.document_title.isin(kth_tuple[3])]
+        with ProfilingUtils.stage("from_pandas", len(train_df) + len(dev_df) + len(test_df)):
+            train_ds = Dataset.from_pandas(train_df)
+            dev_ds = Dataset.from_pandas(dev_df)
+            test_ds = Dataset.from_pandas(test_df)
 
         return DatasetDict({
             "train": train_ds, 
@@ -474,6 +889,71 @@ class GrasccoDataHandler:
 
         return stats
     
+    def get_all_fold_stats(self, 
+                           label_order: List[str], 
+                           n_fold: int = 5) -> Dict[int, Dict[str, Any]]:
+        """
+        Compute the stats of get_fold_stats for all folds at once.
+        The sentence, token, entity and per-label entity counts of every document are read into a 
+        document x count matrix, and the counts of all splits of all folds are summed by a single 
+        product with the split x document membership matrix.
+        :param label_order: The order of labels to display in the stats.
+        :param n_fold: Number of folds.
+        :return: A dictionary with the fold number as keys and the stats of get_fold_stats as values.
+        """
+        table = self.get_ner_arrow_table()
+        document_titles: List[str] = table.column("document_title").to_pylist()
+        document_title_indices: Dict[str, int] = {title: index for index, title in enumerate(document_titles)}
+        count_matrix = self._get_document_count_matrix(table, label_order)
+
+        split_names = ["train", "dev", "test"]
+        fold_tuples = self.get_train_dev_test_fold_document_titles(n_fold)
+        membership_matrix = np.zeros((len(fold_tuples) * len(split_names), len(document_titles)), dtype=np.int64)
+        fold_split_titles: List[List[str]] = list()
+        for fold_index, fold_tuple in enumerate(fold_tuples):
+            for split_index, titles in enumerate(fold_tuple[1:]):
+                titles = sorted(set(title for title in titles if title in document_title_indices))
+                membership_matrix[fold_index * len(split_names) + split_index, [document_title_indices[title] for title in titles]] = 1
+                fold_split_titles.append(titles)
+        split_count_matrix = membership_matrix @ count_matrix
+
+        count_names = ["total_sentences", "total_tokens", "total_entities"] + label_order
+        fold_stats: Dict[int, Dict[str, Any]] = dict()
+        for fold_index, fold_tuple in enumerate(fold_tuples):
+            rows = range(fold_index * len(split_names), (fold_index + 1) * len(split_names))
+            stats: Dict[str, Any] = dict()
+            stats["total_files"] = {split_name: len(fold_split_titles[row]) for split_name, row in zip(split_names, rows)}
+            for column, count_name in enumerate(count_names[:3]):
+                stats[count_name] = {split_name: int(split_count_matrix[row, column]) for split_name, row in zip(split_names, rows)}
+            for split_name, row in zip(split_names, rows):
+                stats[f"{split_name}_files"] = fold_split_titles[row]
+            for column, label in enumerate(label_order, start=3):
+                stats[label] = {split_name: int(split_count_matrix[row, column]) for split_name, row in zip(split_names, rows)}
+            fold_stats[fold_tuple[0]] = stats
+        return fold_stats
+
+    @staticmethod
+    def _get_document_count_matrix(table: pa.Table, label_order: List[str]) -> np.ndarray:
+        """
+        Read the sentence, token and entity counts followed by the per-label entity counts of every document 
+        of the NER data Arrow table into a matrix.
+        :param table: The NER data Arrow table.
+        :param label_order: The labels of the per-label entity count columns.
+        :return: A document x (3 + number of labels) matrix of counts.
+        """
+        columns = [
+            table.column(column_name).to_numpy().astype(np.int64) 
+            for column_name in ["sentence_count", "token_count", "entity_count"]
+        ]
+        label_wise_entity_count = table.column("label_wise_entity_count").combine_chunks()
+        label_names = set(field.name for field in label_wise_entity_count.type)
+        for label in label_order:
+            if label in label_names:
+                columns.append(label_wise_entity_count.field(label).fill_null(0).to_numpy(zero_copy_only=False).astype(np.int64))
+            else:
+                columns.append(np.zeros(table.num_rows, dtype=np.int64))
+        return np.column_stack(columns) if table.num_rows else np.zeros((0, len(columns)), dtype=np.int64)
+
     @staticmethod
     def get_train_dev_test_folds(n_fold: int = 5, 
                                  train_percent: float = 0.6, 
@@ -504,5 +984,7 @@ class GrasccoDataHandler:
                                 column_name: str = "label_wise_entity_count"):
         total = Counter()
         for item in input_df[column_name]:
-            total.update(json.loads(item))
+            if isinstance(item, str):
+                item = json.loads(item)
+            total.update({label: int(count) for label, count in item.items() if count})
         return total
\ No newline at end of file
@@ -0,0 +1,197 @@
+from typing import Any, Dict, List, Tuple
+from utils.bioes_utils import BioesUtils
+
+import numpy as np
+import sys
+
+
+class NerDocument:
+    """
+    Compact, array-backed representation of a NER data item.
+    Sentence, token and entity offsets are stored in int32 arrays, 
+    their texts are produced lazily by slicing the document text.
+    """
+    __slots__ = (
+        "document_title", 
+        "document_text", 
+        "sentence_begins", 
+        "sentence_ends", 
+        "token_begins", 
+        "token_ends", 
+        "entity_begins", 
+        "entity_ends", 
+        "entity_labels"
+    )
+
+    def __init__(self, 
+                 document_title: str, 
+                 document_text: str, 
+                 sentence_begins: np.ndarray, 
+                 sentence_ends: np.ndarray, 
+                 token_begins: np.ndarray, 
+                 token_ends: np.ndarray, 
+                 entity_begins: np.ndarray, 
+                 entity_ends: np.ndarray, 
+                 entity_labels: Tuple[str, ...]):
+        """
+        Initialize the NerDocument with the document text and the offsets of its sentences, tokens and entities.
+        :param document_title: Title of the document.
+        :param document_text: Text of the document.
+        :param sentence_begins: Begin character offsets of the sentences.
+        :param sentence_ends: End character offsets of the sentences.
+        :param token_begins: Begin character offsets of the tokens.
+        :param token_ends: End character offsets of the tokens.
+        :param entity_begins: Begin character offsets of the entities.
+        :param entity_ends: End character offsets of the entities.
+        :param entity_labels: Labels of the entities.
+        """
+        self.document_title: str = document_title
+        self.document_text: str = document_text
+        self.sentence_begins: np.ndarray = np.asarray(sentence_begins, dtype=np.int32)
+        self.sentence_ends: np.ndarray = np.asarray(sentence_ends, dtype=np.int32)
+        self.token_begins: np.ndarray = np.asarray(token_begins, dtype=np.int32)
+        self.token_ends: np.ndarray = np.asarray(token_ends, dtype=np.int32)
+        self.entity_begins: np.ndarray = np.asarray(entity_begins, dtype=np.int32)
+        self.entity_ends: np.ndarray = np.asarray(entity_ends, dtype=np.int32)
+        self.entity_labels: Tuple[str, ...] = tuple(sys.intern(label) if isinstance(label, str) else label for label in entity_labels)
+
+    @classmethod
+    def from_ner_data(cls, ner_data: Dict[str, Any]) -> "NerDocument":
+        """
+        Create a NerDocument from a NER data dictionary object as built by GrasccoDataHandler.
+        :param ner_data: The NER data dictionary object.
+        :return: The NerDocument.
+        """
+        sentences: List[Dict[str, Any]] = ner_data.get("sentences", list())
+        tokens: List[Dict[str, Any]] = ner_data.get("tokens", list())
+        entities: List[Dict[str, Any]] = ner_data.get("entities", list())
+        return cls(
+            document_title=ner_data.get("document_title", ""),
+            document_text=ner_data.get("document_text", ""),
+            sentence_begins=[sentence["begin"] for sentence in sentences],
+            sentence_ends=[sentence["end"] for sentence in sentences],
+            token_begins=[token["begin"] for token in tokens],
+            token_ends=[token["end"] for token in tokens],
+            entity_begins=[entity.get("begin", 0) for entity in entities],
+            entity_ends=[entity.get("end", 0) for entity in entities],
+            entity_labels=[entity.get("label", "") for entity in entities]
+        )
+
+    def to_ner_data(self) -> Dict[str, Any]:
+        """
+        Convert the NerDocument back to a NER data dictionary object.
+        :return: The NER data dictionary object.
+        """
+        return {
+            "document_title": self.document_title,
+            "document_text": self.document_text,
+            "sentences": self.get_sentences(),
+            "tokens": self.get_tokens(),
+            "entities": self.get_entities()
+        }
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_begins)
+
+    @property
+    def token_count(self) -> int:
+        return len(self.token_begins)
+
+    @property
+    def entity_count(self) -> int:
+        return len(self.entity_begins)
+
+    def get_sentences(self) -> List[Dict[str, Any]]:
+        """
+        Get the sentences as dictionaries with begin, end and text.
+        :return: List of sentence dictionaries.
+        """
+        return self._get_spans(self.sentence_begins, self.sentence_ends)
+
+    def get_tokens(self) -> List[Dict[str, Any]]:
+        """
+        Get the tokens as dictionaries with begin, end and text.
+        :return: List of token dictionaries.
+        """
+        return self._get_spans(self.token_begins, self.token_ends)
+
+    def get_entities(self) -> List[Dict[str, Any]]:
+        """
+        Get the entities as dictionaries with begin, end, label and text.
+        :return: List of entity dictionaries.
+        """
+        return [
+            {"begin": b, "end": e, "label": l, "text": self.document_text[b:e]} 
+            for b, e, l in zip(self.entity_begins.tolist(), self.entity_ends.tolist(), self.entity_labels)
+        ]
+
+    def get_entity(self, index: int) -> Dict[str, Any]:
+        """
+        Get a single entity as dictionary with begin, end, label and text.
+        :param index: Index of the entity.
+        :return: The entity dictionary.
+        """
+        b, e = int(self.entity_begins[index]), int(self.entity_ends[index])
+        return {"begin": b, "end": e, "label": self.entity_labels[index], "text": self.document_text[b:e]}
+
+    def get_token_texts(self) -> List[str]:
+        """
+        Get the token texts, sliced from the document text.
+        :return: List of token texts.
+        """
+        return [self.document_text[b:e] for b, e in zip(self.token_begins.tolist(), self.token_ends.tolist())]
+
+    def get_label_wise_entity_count(self) -> Dict[str, int]:
+        """
+        Count the entities per non-empty label, sorted by label.
+        :return: Dictionary with labels as keys and entity counts as values.
+        """
+        label_wise_entity_count: Dict[str, int] = dict()
+        for label in self.entity_labels:
+            if label:
+                label_wise_entity_count[label] = label_wise_entity_count.get(label, 0) + 1
+        return dict(sorted(label_wise_entity_count.items()))
+
+    def get_bioes_tags(self) -> List[str]:
+        """
+        Get the BIOES tag of every token.
+        :return: List of BIOES tags, one per token.
+        """
+        return BioesUtils.get_bioes_tags(
+            self.token_begins, 
+            self.token_ends, 
+            self.entity_begins, 
+            self.entity_ends, 
+            self.entity_labels
+        )
+
+    def get_bioes_text(self) -> str:
+        """
+        Get the BIOES formatted text with one token and its tag per line.
+        :return: The BIOES formatted text.
+        """
+        return "\n".join(f"{text} {tag}" for text, tag in zip(self.get_token_texts(), self.get_bioes_tags()))
+
+    def get_memory_size(self, include_document_text: bool = True) -> int:
+        """
+        Get the memory size of the NerDocument in bytes, including its arrays and labels.
+        :param include_document_text: Whether to include the size of the document text.
+        :return: Memory size in bytes.
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.document_title) + sys.getsizeof(self.entity_labels)
+        if include_document_text:
+            size += sys.getsizeof(self.document_text)
+        for array in (
+            self.sentence_begins, 
+            self.sentence_ends, 
+            self.token_begins, 
+            self.token_ends, 
+            self.entity_begins, 
+            self.entity_ends
+        ):
+            size += sys.getsizeof(array)
+        return size
+
+    def _get_spans(self, begins: np.ndarray, ends: np.ndarray) -> List[Dict[str, Any]]:
+        return [{"begin": b, "end": e, "text": self.document_text[b:e]} for b, e in zip(begins.tolist(), ends.tolist())]
@@ -0,0 +1,67 @@
+from datasets import Dataset, DatasetDict
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+
+class NerFoldManager:
+    """
+    Train, dev and test splits of all folds as index-selected views of a single NER data Dataset.
+    The split row indices of every fold are computed once, selecting a split only adds an indices mapping
+    on top of the shared Arrow table and does not copy any data.
+    """
+    split_names: Tuple[str, ...] = ("train", "dev", "test")
+
+    def __init__(self,
+                 dataset: Dataset,
+                 fold_tuples: List[Tuple[int, List[str], List[str], List[str]]]):
+        """
+        Initialize the NerFoldManager with the NER data Dataset and the document titles of the splits of every fold.
+        :param dataset: The Dataset holding all NER data items, one row per document.
+        :param fold_tuples: A list of tuples (fold number, train titles, dev titles, test titles), one per fold.
+        """
+        self.dataset: Dataset = dataset
+        self.n_fold: int = len(fold_tuples)
+
+        document_titles: List[str] = dataset.data.column("document_title").to_pylist()
+        document_title_indices: Dict[str, int] = {title: index for index, title in enumerate(document_titles)}
+        self._fold_wise_split_indices: Dict[int, Dict[str, np.ndarray]] = dict()
+        for fold_tuple in fold_tuples:
+            self._fold_wise_split_indices[fold_tuple[0]] = {
+                split_name: np.array(sorted(
+                    set(document_title_indices[title] for title in titles if title in document_title_indices)
+                ), dtype=np.int64)
+                for split_name, titles in zip(self.split_names, fold_tuple[1:])
+            }
+        self._fold_wise_datasetdict: Dict[int, DatasetDict] = dict()
+
+    def get_fold_split_indices(self, k: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Retrieve the row indices of the train, dev, and test splits of the specified fold.
+        :param k: The fold number to retrieve (1-based index).
+        :return: A dictionary with the split names as keys and the sorted row indices as values.
+        """
+        if k not in self._fold_wise_split_indices:
+            raise ValueError(f"Unknown fold {k}, expected a fold number from 1 to {self.n_fold}.")
+        return self._fold_wise_split_indices[k]
+
+    def get_fold_datasetdict(self, k: int = 1) -> DatasetDict:
+        """
+        Retrieve the train, dev, and test splits of the specified fold as views of the shared Dataset.
+        :param k: The fold number to retrieve (1-based index).
+        :return: A DatasetDict containing the train, dev, and test datasets.
+        """
+        if k not in self._fold_wise_datasetdict:
+            split_indices = self.get_fold_split_indices(k)
+            self._fold_wise_datasetdict[k] = DatasetDict({
+                split_name: self.dataset.select(split_indices[split_name]) for split_name in self.split_names
+            })
+        return self._fold_wise_datasetdict[k]
+
+    def iter_fold_datasetdicts(self) -> Iterator[Tuple[int, DatasetDict]]:
+        """
+        Iterate over the train, dev, and test splits of all folds.
+        :return: An iterator over tuples (fold number, DatasetDict).
+        """
+        for k in self._fold_wise_split_indices:
+            yield k, self.get_fold_datasetdict(k)
@@ -0,0 +1,319 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class SyntheticCorpusGenerator:
+    """
+    Generator of synthetic GraSCCo-like corpora as INCEpTION UIMA CAS JSON exports (*_phi.json files)
+    with Sofa, DocumentMetaData, Sentence, Token and webanno.custom.PHI feature structures.
+    Every document is generated from its own random generator seeded with the corpus seed and the document index,
+    so a document does not depend on the number of generated documents or on the number of worker processes.
+    """
+    type_names: Dict[str, str] = {
+        "feature_definition": "de.tudarmstadt.ukp.clarin.webanno.api.type.FeatureDefinition",
+        "layer_definition": "de.tudarmstadt.ukp.clarin.webanno.api.type.LayerDefinition",
+        "document_meta_data": "de.tudarmstadt.ukp.dkpro.core.api.metadata.type.DocumentMetaData",
+        "tagset_description": "de.tudarmstadt.ukp.dkpro.core.api.metadata.type.TagsetDescription",
+        "sofa": "uima.cas.Sofa",
+        "sentence": "de.tudarmstadt.ukp.dkpro.core.api.segmentation.type.Sentence",
+        "token": "de.tudarmstadt.ukp.dkpro.core.api.segmentation.type.Token",
+        "phi": "webanno.custom.PHI"
+    }
+    filler_words: Tuple[str, ...] = (
+        "Patient", "Patientin", "wurde", "am", "mit", "bei", "nach", "unter", "der", "die", "das", "und", "zur",
+        "stationären", "Aufnahme", "Behandlung", "Therapie", "Befund", "Diagnose", "Verlauf", "Entlassung",
+        "Untersuchung", "Anamnese", "unauffällig", "regelrecht", "bekannt", "Beschwerden", "Schmerzen", "Medikation",
+        "Kontrolle", "empfohlen", "erfolgte", "zeigte", "sich", "keine", "eine", "einer", "Hinweise", "auf", "Zustand",
+        "Labor", "Sonographie", "Röntgen", "Thorax", "Abdomen", "akute", "chronische", "Infektion", "Hypertonie",
+        "Diabetes", "mellitus", "Typ", "2", "mg", "täglich", "1-0-1", "Wiedervorstellung", "bei", "Bedarf", "Klinik"
+    )
+    surnames: Tuple[str, ...] = (
+        "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann",
+        "Koch", "Richter", "Klein", "Wolf", "Schröder", "Neumann", "Schwarz", "Zimmermann", "Braun", "Krüger"
+    )
+    given_names: Tuple[str, ...] = (
+        "Anna", "Beate", "Clara", "Doris", "Emil", "Felix", "Greta", "Hans", "Ida", "Jonas", "Karl", "Lena"
+    )
+    cities: Tuple[str, ...] = (
+        "Berlin", "Hamburg", "München", "Köln", "Frankfurt", "Stuttgart", "Leipzig", "Dresden", "Jena", "Kiel"
+    )
+
+    def __init__(self,
+                 label_wise_entity_count: Dict[str, int],
+                 seed: int = 2025,
+                 mean_token_count: float = 667.0,
+                 mean_sentence_token_count: float = 14.6,
+                 entity_density: float = 0.034):
+        """
+        Initialize the SyntheticCorpusGenerator.
+        :param label_wise_entity_count: Entity count per label, the labels of the generated entities follow this distribution.
+        :param seed: Seed of the corpus, the same seed always generates the same documents.
+        :param mean_token_count: Mean number of tokens per document.
+        :param mean_sentence_token_count: Mean number of tokens per sentence.
+        :param entity_density: Expected number of entities per token.
+        """
+        if not label_wise_entity_count or sum(label_wise_entity_count.values()) <= 0:
+            raise ValueError("label_wise_entity_count must contain at least one label with a positive entity count.")
+        if mean_token_count < 1 or mean_sentence_token_count < 1:
+            raise ValueError("mean_token_count and mean_sentence_token_count must be at least 1.")
+        if not 0 <= entity_density < 1:
+            raise ValueError("entity_density must be in [0, 1).")
+
+        self.labels: List[str] = sorted(label for label, count in label_wise_entity_count.items() if count > 0)
+        label_counts = np.array([label_wise_entity_count[label] for label in self.labels], dtype=np.float64)
+        self.label_probabilities: np.ndarray = label_counts / label_counts.sum()
+        self.seed: int = seed
+        self.mean_token_count: float = mean_token_count
+        self.mean_sentence_token_count: float = mean_sentence_token_count
+        self.entity_density: float = entity_density
+
+    @classmethod
+    def from_eda_summary(cls,
+                         eda_summary: Dict[str, Any],
+                         seed: int = 2025,
+                         mean_token_count: float = None,
+                         mean_sentence_token_count: float = None,
+                         entity_density: float = None) -> "SyntheticCorpusGenerator":
+        """
+        Create a SyntheticCorpusGenerator with the label distribution of an EDA summary, e.g. data/eda_summary.json.
+        Document length, sentence length and entity density default to the means of the summarized corpus.
+        :param eda_summary: The EDA summary dictionary of GrasccoDataHandler.
+        :param seed: Seed of the corpus.
+        :param mean_token_count: Optional mean number of tokens per document.
+        :param mean_sentence_token_count: Optional mean number of tokens per sentence.
+        :param entity_density: Optional expected number of entities per token.
+        :return: The SyntheticCorpusGenerator.
+        """
+        total_files = max(1, eda_summary.get("total_files", 0))
+        total_sentences = max(1, eda_summary.get("total_sentences", 0))
+        total_tokens = max(1, eda_summary.get("total_tokens", 0))
+        return cls(
+            eda_summary["label_wise_entity_count"],
+            seed=seed,
+            mean_token_count=mean_token_count or total_tokens / total_files,
+            mean_sentence_token_count=mean_sentence_token_count or total_tokens / total_sentences,
+            entity_density=entity_density if entity_density is not None else eda_summary.get("total_entities", 0) / total_tokens
+        )
+
+    def _get_entity_tokens(self, label: str, rng: np.random.Generator) -> List[str]:
+        """
+        Generate the tokens of an entity of the given label.
+        :param label: The entity label.
+        :param rng: The random generator of the document.
+        :return: The entity tokens.
+        """
+        integers: Callable[[int, int], int] = lambda low, high: int(rng.integers(low, high))
+        if label == "DATE":
+            return [f"{integers(1, 29)}.{integers(1, 13)}.{integers(1950, 2030)}"]
+        if label == "AGE":
+            return [str(integers(1, 100))]
+        if label == "NAME_TITLE":
+            return [["Dr.", "Prof.", "Dr. med.", "Prof. Dr."][integers(0, 4)]]
+        if label in ("NAME_PATIENT", "NAME_RELATIVE"):
+            return [self.given_names[integers(0, len(self.given_names))], self.surnames[integers(0, len(self.surnames))]]
+        if label.startswith("NAME_"):
+            return [self.surnames[integers(0, len(self.surnames))]]
+        if label == "LOCATION_CITY":
+            return [self.cities[integers(0, len(self.cities))]]
+        if label == "LOCATION_ZIP":
+            return [f"{integers(1000, 100000):05d}"]
+        if label == "LOCATION_STREET":
+            return [f"{self.surnames[integers(0, len(self.surnames))]}straße", str(integers(1, 200))]
+        if label == "LOCATION_HOSPITAL":
+            return ["Klinikum", self.cities[integers(0, len(self.cities))]]
+        if label in ("CONTACT_PHONE", "CONTACT_FAX"):
+            return [f"0{integers(30, 1000)}", str(integers(100000, 10000000))]
+        if label == "CONTACT_EMAIL":
+            return [f"{self.surnames[integers(0, len(self.surnames))].lower()}@klinik.example"]
+        if label == "ID":
+            return [f"{integers(10000000, 100000000)}"]
+        return [f"{label.split('_')[-1].capitalize()}{integers(1, 100)}"]
+
+    def _get_document_title(self, document_index: int) -> str:
+        """
+        Get the title of a generated document.
+        :param document_index: Index of the document in the corpus.
+        :return: The document title.
+        """
+        return f"Synthetic_{self.seed}_{document_index:07d}.txt"
+
+    def generate_document(self, document_index: int) -> Dict[str, Any]:
+        """
+        Generate a single document as UIMA CAS JSON data.
+        :param document_index: Index of the document in the corpus.
+        :return: The CAS JSON data dictionary, as in the *_phi.json files.
+        """
+        rng = np.random.default_rng([self.seed, document_index])
+        token_count = max(1, int(rng.poisson(self.mean_token_count)))
+        filler_words = self.filler_words
+
+        # sentences are lists of token lists, an entity is one multi-token item, a filler word a single-token item
+        sentence_items: List[List[Tuple[List[str], str]]] = list()
+        generated_token_count = 0
+        while generated_token_count < token_count:
+            sentence_token_count = min(token_count - generated_token_count, max(2, int(rng.poisson(self.mean_sentence_token_count))))
+            entity_count = int(rng.binomial(sentence_token_count - 1, self.entity_density))
+            entity_labels = rng.choice(self.labels, size=entity_count, p=self.label_probabilities) if entity_count else []
+            word_indices = rng.integers(0, len(filler_words), size=sentence_token_count)
+            items: List[Tuple[List[str], str]] = [([filler_words[word_index]], "") for word_index in word_indices[:-1]]
+            for label, position in zip(entity_labels, np.sort(rng.integers(0, len(items) + 1, size=entity_count))[::-1]):
+                items.insert(int(position), (self._get_entity_tokens(str(label), rng), str(label)))
+            items.append((["."], ""))
+            sentence_items.append(items)
+            generated_token_count += sum(len(item_tokens) for item_tokens, _ in items)
+
+        # tokens are separated by a space, sentences by a line break
+        texts: List[str] = list()
+        sentences: List[Tuple[int, int]] = list()
+        tokens: List[Tuple[int, int]] = list()
+        entities: List[Tuple[int, int, str]] = list()
+        offset = 0
+        for items in sentence_items:
+            sentence_begin = offset
+            for item_tokens, label in items:
+                entity_begin = offset
+                for token_text in (token_text for item_token in item_tokens for token_text in item_token.split(" ")):
+                    texts.append(token_text)
+                    texts.append(" ")
+                    tokens.append((offset, offset + len(token_text)))
+                    offset += len(token_text) + 1
+                if label:
+                    entities.append((entity_begin, offset - 1, label))
+            texts[-1] = "\n"
+            sentences.append((sentence_begin, offset - 1))
+        document_text = "".join(texts[:-1])
+
+        return self._get_cas_json_data(self._get_document_title(document_index), document_text, sentences, tokens, entities)
+
+    def _get_cas_json_data(self,
+                           document_title: str,
+                           document_text: str,
+                           sentences: List[Tuple[int, int]],
+                           tokens: List[Tuple[int, int]],
+                           entities: List[Tuple[int, int, str]]) -> Dict[str, Any]:
+        """
+        Assemble the UIMA CAS JSON data of a document.
+        :param document_title: Title of the document.
+        :param document_text: Text of the document.
+        :param sentences: Begin and end offsets of the sentences.
+        :param tokens: Begin and end offsets of the tokens.
+        :param entities: Begin and end offsets and labels of the entities.
+        :return: The CAS JSON data dictionary.
+        """
+        type_names = self.type_names
+        feature_structures: List[Dict[str, Any]] = [
+            {"%ID": 1, "%TYPE": type_names["feature_definition"], "@layer": 2, "name": "kind", "uiName": "kind"},
+            {"%ID": 2, "%TYPE": type_names["layer_definition"], "name": type_names["phi"], "uiName": "PHI"},
+            {
+                "%ID": 3, "%TYPE": type_names["document_meta_data"], "@sofa": 4, "begin": 0, "end": len(document_text),
+                "language": "x-unspecified", "documentTitle": document_title, "documentId": "CURATION_USER",
+                "documentUri": "synthetic/CURATION_USER", "collectionId": "synthetic/CURATION_USER",
+                "documentBaseUri": "synthetic", "isLastSegment": False
+            },
+            {
+                "%ID": 5, "%TYPE": type_names["tagset_description"], "@sofa": 4, "begin": 0, "end": 0,
+                "layer": type_names["phi"], "name": "phiKind", "input": False
+            }
+        ]
+        next_id = 6
+        for begin, end in sentences:
+            feature_structures.append({"%ID": next_id, "%TYPE": type_names["sentence"], "@sofa": 4, "begin": begin, "end": end})
+            next_id += 1
+        for order, (begin, end) in enumerate(tokens):
+            feature_structures.append({"%ID": next_id, "%TYPE": type_names["token"], "@sofa": 4, "begin": begin, "end": end, "order": order})
+            next_id += 1
+        for begin, end, label in entities:
+            feature_structures.append({"%ID": next_id, "%TYPE": type_names["phi"], "@sofa": 4, "begin": begin, "end": end, "kind": label})
+            next_id += 1
+        feature_structures.append({
+            "%ID": 4, "%TYPE": type_names["sofa"], "sofaNum": 1, "sofaID": "_InitialView", "mimeType": "text",
+            "sofaString": document_text
+        })
+
+        return {
+            "%TYPES": self._get_cas_types(),
+            "%FEATURE_STRUCTURES": feature_structures,
+            "%VIEWS": {"_InitialView": {"%SOFA": 4, "%MEMBERS": [1, 2, 3] + list(range(5, next_id))}}
+        }
+
+    def _get_cas_types(self) -> Dict[str, Any]:
+        """
+        Get the type system of the generated feature structures.
+        :return: The %TYPES dictionary of the CAS JSON data.
+        """
+        def get_type(name: str, super_type: str, feature_ranges: Dict[str, str]) -> Dict[str, Any]:
+            return {
+                "%NAME": name,
+                "%SUPER_TYPE": super_type,
+                **{feature: {"%NAME": feature, "%RANGE": feature_range} for feature, feature_range in feature_ranges.items()}
+            }
+
+        type_names = self.type_names
+        return {
+            type_names["feature_definition"]: get_type(type_names["feature_definition"], "uima.cas.TOP", {
+                "layer": type_names["layer_definition"], "name": "uima.cas.String", "uiName": "uima.cas.String"
+            }),
+            type_names["layer_definition"]: get_type(type_names["layer_definition"], "uima.cas.TOP", {
+                "name": "uima.cas.String", "uiName": "uima.cas.String"
+            }),
+            type_names["document_meta_data"]: get_type(type_names["document_meta_data"], "uima.tcas.DocumentAnnotation", {
+                "documentTitle": "uima.cas.String", "documentId": "uima.cas.String", "documentUri": "uima.cas.String",
+                "collectionId": "uima.cas.String", "documentBaseUri": "uima.cas.String", "isLastSegment": "uima.cas.Boolean"
+            }),
+            type_names["tagset_description"]: get_type(type_names["tagset_description"], "uima.tcas.Annotation", {
+                "layer": "uima.cas.String", "name": "uima.cas.String", "input": "uima.cas.Boolean"
+            }),
+            type_names["sentence"]: get_type(type_names["sentence"], "uima.tcas.Annotation", {"id": "uima.cas.String"}),
+            type_names["token"]: get_type(type_names["token"], "uima.tcas.Annotation", {"order": "uima.cas.Integer"}),
+            type_names["phi"]: get_type(type_names["phi"], "uima.tcas.Annotation", {"kind": "uima.cas.String"})
+        }
+
+    def _write_documents(self, json_data_files_dir: Path, document_indices: range) -> int:
+        """
+        Generate documents and write them as *_phi.json files.
+        :param json_data_files_dir: Directory to write the JSON files to.
+        :param document_indices: Indices of the documents to generate.
+        :return: Number of tokens of the written documents.
+        """
+        token_type = self.type_names["token"]
+        token_count = 0
+        for document_index in document_indices:
+            json_data = self.generate_document(document_index)
+            token_count += sum(1 for feature_structure in json_data["%FEATURE_STRUCTURES"] if feature_structure["%TYPE"] == token_type)
+            json_file = json_data_files_dir / f"{self._get_document_title(document_index)}_phi.json"
+            if orjson is not None:
+                json_file.write_bytes(orjson.dumps(json_data))
+            else:
+                json_file.write_text(json.dumps(json_data, ensure_ascii=False), encoding="utf-8")
+        return token_count
+
+    def write_corpus(self,
+                     json_data_files_dir: Path,
+                     document_count: int,
+                     max_workers: int = None,
+                     chunk_size: int = 1000) -> int:
+        """
+        Generate a corpus and write every document as *_phi.json file, the files are named after the document titles.
+        :param json_data_files_dir: Directory to write the JSON files to, created if needed.
+        :param document_count: Number of documents to generate.
+        :param max_workers: Number of worker processes, 1 generates all documents in the calling process.
+        :param chunk_size: Number of documents generated per worker task.
+        :return: Number of tokens of the written corpus.
+        """
+        json_data_files_dir.mkdir(parents=True, exist_ok=True)
+        document_index_chunks = [
+            range(chunk_start, min(chunk_start + chunk_size, document_count)) for chunk_start in range(0, document_count, chunk_size)
+        ]
+        if max_workers == 1 or len(document_index_chunks) <= 1:
+            return sum(self._write_documents(json_data_files_dir, document_indices) for document_indices in document_index_chunks)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return sum(executor.map(self._write_documents, [json_data_files_dir] * len(document_index_chunks), document_index_chunks))
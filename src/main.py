@@ -44,10 +44,7 @@ if __name__ == "__main__":
         "NAME_RELATIVE",
         "NAME_USERNAME"
     ]
-    fold_stats = dict()
-    for fold in range(1, 6):
-        fold_datasetdict = data_handler.get_train_dev_test_datasetdict(fold)
-        fold_stats[fold] = data_handler.get_fold_stats(fold_datasetdict, label_order)
+    fold_stats = data_handler.get_all_fold_stats(label_order)
     print(json.dumps(fold_stats, indent=4, ensure_ascii=False))
 
     printable_fold_stats = dict()
@@ -0,0 +1,494 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from flair.file_utils import load_torch_state
+from flair.trainers.plugins import BasePlugin, TrainerPlugin
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+import fcntl
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import torch
+
+log = logging.getLogger("flair")
+
+
+class CheckpointStore:
+    """
+    Content-addressed store of checkpoints shared by all runs, e.g. on the shared model checkpoints volume.
+    A checkpoint is split into chunks of the raw bytes of its tensors, of at most chunk_size bytes each,
+    and the pickled rest of the state, e.g. the tag dictionary, tokenizer and model card of a Flair model.
+    Every chunk is stored once under the SHA-256 of its bytes in objects/, so the tensors that are identical
+    across checkpoints and runs, e.g. frozen or not updated layers and the unchanged parts of shared base weights,
+    take disk space only once. A checkpoint itself is a small JSON manifest in manifests/<name>.json
+    listing the chunks of its tensors. Objects and manifests are replaced atomically, so concurrent runs
+    never read a partially written file and a crashed write never corrupts a stored checkpoint.
+    Checkpoints can be saved asynchronously by a background thread after the tensors were copied,
+    so the training loop only waits for the copy, not for hashing and writing.
+    When a checkpoint replaces a stored checkpoint of the same name, e.g. the best model of a run at every new best epoch,
+    the objects of the replaced checkpoint that no other checkpoint references are removed. A save in progress
+    records the objects it references in pending/ before it looks them up, and the lookups and removals hold
+    the store.lock file lock, so the objects of concurrent saves of other runs and threads are never removed.
+    """
+
+    def __init__(self, store_root_dir: Path, chunk_size: int = 64 * 2 ** 20):
+        """
+        :param store_root_dir: Root directory of the store.
+        :param chunk_size: Maximum number of bytes of a tensor chunk.
+        """
+        self.store_root_dir = Path(store_root_dir)
+        self.objects_dir = self.store_root_dir / "objects"
+        self.manifests_dir = self.store_root_dir / "manifests"
+        self.pending_dir = self.store_root_dir / "pending"
+        self.chunk_size = chunk_size
+        self.written_bytes: int = 0
+        self.deduplicated_bytes: int = 0
+        self.removed_bytes: int = 0
+        self._executor: ThreadPoolExecutor = None
+        self._pending_saves: List[Future] = list()
+        self._stats_lock = threading.Lock()
+
+    def _get_object_path(self, object_hash: str) -> Path:
+        return self.objects_dir / object_hash[:2] / object_hash
+
+    def _get_manifest_path(self, name: str) -> Path:
+        if not name or Path(name).is_absolute() or ".." in Path(name).parts:
+            raise ValueError(f"Invalid checkpoint name '{name}', expected a relative path without '..'.")
+        return self.manifests_dir / f"{name}.json"
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        """
+        Hold the exclusive file lock of the store, shared by all processes and threads using the store.
+        """
+        self.store_root_dir.mkdir(parents=True, exist_ok=True)
+        with (self.store_root_dir / "store.lock").open("a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _get_pending_path(self) -> Path:
+        return self.pending_dir / f"{os.getpid()}.{threading.get_ident()}.txt"
+
+    @staticmethod
+    def _write_atomically(path: Path, data: bytes) -> None:
+        """
+        Write a file through a temporary file of this process and thread, replaced in one step.
+        :param path: Path of the file.
+        :param data: The bytes to write.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp_path.open("wb") as writer:
+            writer.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_object(self, data: memoryview | bytes) -> str:
+        """
+        Write an object, unless an object with the same content is stored already.
+        The object is recorded as pending reference of the save of this process and thread first,
+        so it is not removed until the manifest of the save references it.
+        :param data: The bytes of the object.
+        :return: The hash of the object.
+        """
+        object_hash = hashlib.sha256(data).hexdigest()
+        object_path = self._get_object_path(object_hash)
+        with self._lock():
+            pending_path = self._get_pending_path()
+            pending_path.parent.mkdir(parents=True, exist_ok=True)
+            with pending_path.open("a", encoding="utf-8") as writer:
+                writer.write(object_hash + "\n")
+            object_exists = object_path.exists()
+        if object_exists:
+            with self._stats_lock:
+                self.deduplicated_bytes += len(data)
+        else:
+            self._write_atomically(object_path, data)
+            with self._stats_lock:
+                self.written_bytes += len(data)
+        return object_hash
+
+    @staticmethod
+    def _get_manifest_hashes(manifest: Dict[str, Any]) -> Set[str]:
+        """
+        :param manifest: The manifest of a checkpoint.
+        :return: The hashes of all objects the checkpoint references.
+        """
+        return {manifest["skeleton"]} | {
+            chunk_hash for tensor_manifest in manifest["tensors"] for chunk_hash in tensor_manifest["chunks"]
+        }
+
+    @staticmethod
+    def _read_manifest(manifest_path: Path) -> Dict[str, Any]:
+        with manifest_path.open("r", encoding="utf-8") as reader:
+            return json.load(reader)
+
+    def _get_referenced_hashes(self) -> Set[str]:
+        """
+        Get the hashes of the objects referenced by a pending save or a stored checkpoint, call it holding the lock.
+        The pending references are read first, a save removes them only after its manifest is written.
+        :return: The referenced hashes.
+        """
+        referenced_hashes: Set[str] = set()
+        for pending_path in self.pending_dir.glob("*.txt"):
+            with pending_path.open("r", encoding="utf-8") as reader:
+                referenced_hashes.update(line.strip() for line in reader if line.strip())
+        for manifest_path in self.manifests_dir.rglob("*.json"):
+            referenced_hashes.update(self._get_manifest_hashes(self._read_manifest(manifest_path)))
+        return referenced_hashes
+
+    def _remove_unreferenced_objects(self, object_hashes: Set[str]) -> int:
+        """
+        Remove the objects among the given ones that no pending save and no stored checkpoint references.
+        :param object_hashes: The hashes of the objects to remove if unreferenced.
+        :return: Number of removed bytes.
+        """
+        removed_bytes = 0
+        with self._lock():
+            unreferenced_hashes = object_hashes - self._get_referenced_hashes()
+            for object_hash in unreferenced_hashes:
+                object_path = self._get_object_path(object_hash)
+                if object_path.exists():
+                    removed_bytes += object_path.stat().st_size
+                    object_path.unlink()
+        with self._stats_lock:
+            self.removed_bytes += removed_bytes
+        return removed_bytes
+
+    def _read_object(self, object_hash: str) -> bytes:
+        with self._get_object_path(object_hash).open("rb") as reader:
+            return reader.read()
+
+    @staticmethod
+    def _map_tensors(state: Any, function) -> Any:
+        """
+        Apply a function to every tensor of a state of nested dictionaries, lists and tuples.
+        :param state: The state.
+        :param function: The function replacing a tensor.
+        :return: A copy of the nested containers with the replaced tensors.
+        """
+        if isinstance(state, torch.Tensor):
+            return function(state)
+        if isinstance(state, dict):
+            return type(state)((key, CheckpointStore._map_tensors(value, function)) for key, value in state.items())
+        if isinstance(state, (list, tuple)):
+            return type(state)(CheckpointStore._map_tensors(value, function) for value in state)
+        return state
+
+    @staticmethod
+    def snapshot(state: Any) -> Any:
+        """
+        Copy the tensors of a state to the CPU, so the copy is not changed by later training steps.
+        :param state: The state of nested dictionaries, lists and tuples of tensors and other objects.
+        :return: The copied state.
+        """
+        return CheckpointStore._map_tensors(state, lambda tensor: tensor.detach().to("cpu", copy=True))
+
+    def save(self, name: str, state: Any) -> None:
+        """
+        Store a checkpoint, replacing a stored checkpoint of the same name,
+        the objects only the replaced checkpoint referenced are removed.
+        :param name: The name of the checkpoint, a relative path like '<run>/best-model'.
+        :param state: The state of nested dictionaries, lists and tuples of tensors and other objects,
+                      e.g. the state of a Flair model as written by its save method.
+        """
+        manifest_path = self._get_manifest_path(name)
+        try:
+            replaced_hashes: Set[str] = self._get_manifest_hashes(self._read_manifest(manifest_path))
+        except FileNotFoundError:
+            replaced_hashes = set()
+        try:
+            manifest = self._save_objects(state)
+            self._write_atomically(manifest_path, json.dumps(manifest).encode("utf-8"))
+        finally:
+            self._get_pending_path().unlink(missing_ok=True)
+        if replaced_hashes:
+            self._remove_unreferenced_objects(replaced_hashes - self._get_manifest_hashes(manifest))
+
+    def _save_objects(self, state: Any) -> Dict[str, Any]:
+        """
+        Store the objects of a checkpoint.
+        :param state: The state, see save.
+        :return: The manifest of the checkpoint.
+        """
+        tensors: List[Dict[str, Any]] = list()
+
+        def store_tensor(tensor: torch.Tensor) -> Dict[str, int]:
+            data = memoryview(tensor.detach().cpu().contiguous().view(-1).view(torch.uint8).numpy())
+            tensors.append({
+                "dtype": str(tensor.dtype).replace("torch.", ""),
+                "shape": list(tensor.shape),
+                "chunks": [self._write_object(data[start: start + self.chunk_size]) for start in range(0, len(data), self.chunk_size)]
+            })
+            return {"checkpoint_store_tensor": len(tensors) - 1}
+
+        skeleton = self._map_tensors(state, store_tensor)
+        skeleton_bytes = io.BytesIO()
+        torch.save(skeleton, skeleton_bytes, pickle_protocol=4)
+        return {
+            "skeleton": self._write_object(skeleton_bytes.getbuffer()),
+            "tensors": tensors,
+            "size_bytes": skeleton_bytes.getbuffer().nbytes + sum(
+                torch.Size(tensor_manifest["shape"]).numel() * getattr(torch, tensor_manifest["dtype"]).itemsize
+                for tensor_manifest in tensors
+            )
+        }
+
+    def save_async(self, name: str, state: Any) -> Future:
+        """
+        Copy the tensors of a state and store the copy as checkpoint by the background thread,
+        the checkpoints are stored in the order they were saved.
+        :param name: The name of the checkpoint, see save.
+        :param state: The state, see save.
+        :return: Future of the stored checkpoint.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-store")
+        future = self._executor.submit(self.save, name, self.snapshot(state))
+        # the finished saves are dropped, the failed ones are kept until wait raises their exception
+        self._pending_saves = [
+            pending_save for pending_save in self._pending_saves if not pending_save.done() or pending_save.exception()
+        ] + [future]
+        return future
+
+    def wait(self) -> None:
+        """
+        Wait until the asynchronously saved checkpoints are stored, raising the exception of a failed save.
+        """
+        pending_saves, self._pending_saves = self._pending_saves, list()
+        for pending_save in pending_saves:
+            pending_save.result()
+
+    def close(self) -> None:
+        """
+        Wait for the asynchronously saved checkpoints and stop the background thread.
+        """
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def exists(self, name: str) -> bool:
+        return self._get_manifest_path(name).exists()
+
+    def load(self, name: str) -> Any:
+        """
+        Load a stored checkpoint.
+        :param name: The name of the checkpoint.
+        :return: The state, e.g. to pass to the load method of a Flair model.
+        """
+        manifest = self._read_manifest(self._get_manifest_path(name))
+        tensors: List[torch.Tensor] = list()
+        for tensor_manifest in manifest["tensors"]:
+            data = bytearray(b"".join(self._read_object(chunk_hash) for chunk_hash in tensor_manifest["chunks"]))
+            dtype = getattr(torch, tensor_manifest["dtype"])
+            tensor = torch.frombuffer(data, dtype=torch.uint8) if data else torch.empty(0, dtype=torch.uint8)
+            tensors.append(tensor.view(dtype).reshape(tensor_manifest["shape"]))
+        skeleton = torch.load(io.BytesIO(self._read_object(manifest["skeleton"])), map_location="cpu", weights_only=False)
+
+        def load_tensor(state: Any) -> Any:
+            if isinstance(state, dict) and set(state.keys()) == {"checkpoint_store_tensor"}:
+                return tensors[state["checkpoint_store_tensor"]]
+            if isinstance(state, dict):
+                return type(state)((key, load_tensor(value)) for key, value in state.items())
+            if isinstance(state, (list, tuple)):
+                return type(state)(load_tensor(value) for value in state)
+            return state
+
+        return load_tensor(skeleton)
+
+    def export(self, name: str, model_file: Path) -> None:
+        """
+        Write a stored checkpoint of a Flair model as regular model file, e.g. for a script loading the model from a path.
+        :param name: The name of the checkpoint.
+        :param model_file: Path of the model file.
+        """
+        model_file = Path(model_file)
+        model_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = model_file.with_name(f"{model_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        torch.save(self.load(name), str(tmp_path), pickle_protocol=4)
+        os.replace(tmp_path, model_file)
+
+    @staticmethod
+    def get_reference_path(model_file: Path) -> Path:
+        """
+        Get the path of the reference file of a model file, see write_reference.
+        :param model_file: Path of the model file.
+        :return: Path of the reference file, '<model file name>.ref.json' next to the model file.
+        """
+        return Path(model_file).with_name(f"{Path(model_file).name}.ref.json")
+
+    def write_reference(self, name: str, model_file: Path) -> None:
+        """
+        Write a small reference file naming the store and a stored checkpoint in place of the model file,
+        so the checkpoint takes no disk space outside of the store until resolve exports it.
+        :param name: The name of the checkpoint.
+        :param model_file: Path of the model file the reference stands for.
+        """
+        reference = {"store_root_dir": str(self.store_root_dir.resolve()), "name": name}
+        self._write_atomically(self.get_reference_path(model_file), json.dumps(reference).encode("utf-8"))
+
+    @staticmethod
+    def resolve(model_file: Path) -> Path:
+        """
+        Get a model file to load from its path, exporting the referenced checkpoint on demand
+        if only the reference file of the model file was written, see write_reference.
+        :param model_file: Path of the model file.
+        :return: Path of the model file, which does not exist if neither the model file nor its reference does.
+        """
+        model_file = Path(model_file)
+        reference_path = CheckpointStore.get_reference_path(model_file)
+        if not model_file.exists() and reference_path.exists():
+            with reference_path.open("r", encoding="utf-8") as reader:
+                reference = json.load(reader)
+            CheckpointStore(Path(reference["store_root_dir"])).export(reference["name"], model_file)
+            log.info(f"exported {reference['name']} of the checkpoint store {reference['store_root_dir']} as {model_file}")
+        return model_file
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a stored checkpoint, its objects are removed by collect_garbage.
+        :param name: The name of the checkpoint.
+        """
+        self._get_manifest_path(name).unlink(missing_ok=True)
+
+    def collect_garbage(self) -> int:
+        """
+        Remove the objects that no pending save and no stored checkpoint references, e.g. after remove.
+        Only call it while no run saves checkpoints, the pending references of crashed saves are dropped as well.
+        :return: Number of removed bytes.
+        """
+        with self._lock():
+            for pending_path in self.pending_dir.glob("*.txt"):
+                pending_path.unlink()
+        return self._remove_unreferenced_objects({object_path.name for object_path in self.objects_dir.glob("*/*")})
+
+    def get_size_bytes(self) -> int:
+        """
+        :return: Number of bytes of all stored objects.
+        """
+        return sum(object_path.stat().st_size for object_path in self.objects_dir.glob("*/*"))
+
+
+class CheckpointStorePlugin(TrainerPlugin):
+    """
+    A TrainerPlugin that saves the checkpoints of the trainer, e.g. best-model.pt, asynchronously to a CheckpointStore
+    as '<checkpoint_name>/<file stem>' instead of writing them to the training base path.
+    After the training loop it waits for the pending saves and loads the best model from the store,
+    so the final test evaluates the best model as with a best-model.pt file. A best-model.pt file written
+    during the training nevertheless, e.g. by the asynchronous evaluation worker of the EvaluationCadencePlugin,
+    is moved to the store. A best-model.pt file left unchanged since the setup, e.g. of an earlier run or attempt
+    in the same directory, is removed, so neither the store nor the final test picks it up. The training base path
+    then holds the best-model.pt.ref.json reference of the stored best model, which CheckpointStore.resolve exports
+    for the scripts loading the model from its path, or the exported best-model.pt file if export_best_model is set.
+    """
+
+    def __init__(self, store: CheckpointStore, checkpoint_name: str, export_best_model: bool = False):
+        """
+        :param store: The checkpoint store.
+        :param checkpoint_name: Name prefix of the checkpoints of the run, e.g. the model directory relative to the checkpoints root.
+        :param export_best_model: Whether to export the stored best model as best-model.pt file after the training,
+                                  instead of writing its reference file.
+        """
+        super().__init__()
+        self.store = store
+        self.checkpoint_name = checkpoint_name.strip("/")
+        self.export_best_model = export_best_model
+        self._base_path: Path = None
+        self._stale_best_model_stat: Tuple[int, int, int] = None
+        self._original_save_model = None
+        self._original_load_model = None
+
+    def _get_name(self, model_file: Path) -> str:
+        return f"{self.checkpoint_name}/{Path(model_file).stem}"
+
+    @staticmethod
+    def _get_file_stat(model_file: Path) -> Tuple[int, int, int]:
+        """
+        :param model_file: Path of the model file.
+        :return: The modification time, size and inode of the model file, None if it does not exist.
+        """
+        try:
+            stat = Path(model_file).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _save_model(self, model_file: Path, checkpoint: bool = False) -> None:
+        """
+        Replaces the save model method of the trainer.
+        :param model_file: The model file the trainer would write.
+        :param checkpoint: Unused, as by Flair.
+        """
+        model = self.trainer.model
+        model_state = model._get_state_dict()
+        if model.model_card is not None:
+            model_state["model_card"] = model.model_card
+        self.store.save_async(self._get_name(model_file), model_state)
+        log.info(f"saving {Path(model_file).name} to the checkpoint store as {self._get_name(model_file)}")
+
+    def _load_model(self, model_file: Path) -> None:
+        """
+        Replaces the load model method of the trainer, loading the stored checkpoint if there is one.
+        :param model_file: The model file the trainer would read.
+        """
+        self.store.wait()
+        if self.store.exists(self._get_name(model_file)):
+            self.trainer.model.load_state_dict(self.store.load(self._get_name(model_file))["state_dict"])
+        else:
+            self._original_load_model(model_file)
+
+    @BasePlugin.hook("after_setup")
+    def after_setup(self, base_path=None, **kw):
+        """
+        Replaces the save and load model methods of the trainer and notes a best-model.pt file written before the training.
+        :param base_path: The training base path.
+        """
+        self._base_path = Path(base_path)
+        self._stale_best_model_stat = self._get_file_stat(self._base_path / "best-model.pt")
+        self._original_save_model = self.trainer._save_model
+        self._original_load_model = self.trainer._load_model
+        self.trainer._save_model = self._save_model
+        self.trainer._load_model = self._load_model
+
+    @BasePlugin.hook("_training_finally")
+    def _training_finally(self, **kw):
+        """
+        Restores the save and load model methods, moves a best-model.pt written during the training to the store
+        or removes a stale one, writes the reference of the stored best model or exports it and loads the best model,
+        after the pending saves are stored, also when the training failed.
+        """
+        if self._original_save_model:
+            self.trainer._save_model = self._original_save_model
+            self.trainer._load_model = self._original_load_model
+            self._original_save_model = None
+            self._original_load_model = None
+        self.store.wait()
+        best_model_path = self._base_path / "best-model.pt"
+        best_model_stat = self._get_file_stat(best_model_path)
+        if best_model_stat is not None and best_model_stat == self._stale_best_model_stat:
+            best_model_path.unlink()
+            log.warning(f"removed {best_model_path}, it was written before the training")
+        elif best_model_stat is not None:
+            self.store.save(self._get_name(best_model_path), load_torch_state(str(best_model_path)))
+            best_model_path.unlink()
+            log.info(f"moved {best_model_path.name} to the checkpoint store as {self._get_name(best_model_path)}")
+        reference_path = CheckpointStore.get_reference_path(best_model_path)
+        reference_path.unlink(missing_ok=True)
+        if self.store.exists(self._get_name(best_model_path)):
+            if self.export_best_model:
+                self.store.export(self._get_name(best_model_path), best_model_path)
+                log.info(f"exported {self._get_name(best_model_path)} of the checkpoint store as {best_model_path}")
+            else:
+                self.store.write_reference(self._get_name(best_model_path), best_model_path)
+                log.info(f"referenced {self._get_name(best_model_path)} of the checkpoint store in {reference_path}")
+            log.info("Loading model from best epoch of the checkpoint store ...")
+            self.trainer.model.load_state_dict(self.store.load(self._get_name(best_model_path))["state_dict"])
@@ -0,0 +1,236 @@
+from flair.data import Sentence
+from flair.embeddings import TokenEmbeddings, TransformerWordEmbeddings
+from flair.embeddings.base import register_embeddings
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import flair
+import hashlib
+import json
+import numpy as np
+import os
+import torch
+import transformers
+
+
+class EmbeddingFeatureCache:
+    """
+    Persistent cache of the token embeddings of a frozen transformer encoder, so a tagger head can be trained
+    on them without running the encoder again. The embeddings of a sentence depend on its FLERT context,
+    so they are cached per distinct sentence and context, computed once in evaluation mode, i.e. with the full context
+    and without dropout, and are shared by all folds and runs with the same model and context setting.
+
+    The embeddings of all tokens are stored concatenated as float16 in features.npy and the sentence-to-token alignment
+    as offsets into them in sentence_offsets.npy, both memory-mapped when the cache is loaded, the sentence keys
+    in sentence_keys.json and the settings in config.json. The cache directory is keyed by the model name,
+    the context setting and a fingerprint of the model file of a local model and the flair and transformers versions.
+    """
+
+    def __init__(self, cache_dir: Path):
+        """
+        Load a cache directory created by create.
+        :param cache_dir: The cache directory.
+        """
+        self.cache_dir = Path(cache_dir)
+        with (self.cache_dir / "config.json").open("r", encoding="utf-8") as f:
+            self.config: Dict[str, Any] = json.load(f)
+        self._sentence_indices: Dict[str, int] = dict()
+        self._features: np.ndarray = np.zeros((0, self.config["embedding_length"] or 0), dtype=np.float16)
+        self._sentence_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self._new_sentence_keys: List[str] = list()
+        self._new_sentence_features: List[np.ndarray] = list()
+        self._load()
+
+    @classmethod
+    def create(cls, cache_root_dir: Path, model_name_or_path: str, use_context: bool | int) -> "EmbeddingFeatureCache":
+        """
+        Get the cache of the embeddings of a transformer model with a context setting, created empty if it does not exist.
+        :param cache_root_dir: Root directory of the caches of all models.
+        :param model_name_or_path: The transformer model name, or the path of a pretrained Flair model.
+        :param use_context: The FLERT context setting of the embeddings, as passed to TransformerWordEmbeddings.
+        :return: The cache.
+        """
+        context_length = 64 if use_context is True else int(use_context)
+        config = {
+            "model_name_or_path": model_name_or_path,
+            "context_length": context_length,
+            "use_context_separator": True,
+            "respect_document_boundaries": True,
+            "embedding_length": None
+        }
+        fingerprint = hashlib.sha256()
+        fingerprint_parts = [model_name_or_path, str(context_length), flair.__version__, transformers.__version__]
+        if Path(model_name_or_path).is_file():
+            model_file_stat = Path(model_name_or_path).stat()
+            fingerprint_parts += [str(model_file_stat.st_size), str(model_file_stat.st_mtime_ns)]
+        for part in fingerprint_parts:
+            fingerprint.update(part.encode("utf-8"))
+        cache_dir = cache_root_dir / (
+            f"{model_name_or_path.strip('/').replace('/', '--')}--use-context-{context_length if context_length else 'none'}"
+            f"--{fingerprint.hexdigest()[:16]}"
+        )
+        if not (cache_dir / "config.json").exists():
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            cls._write_config(cache_dir, config)
+        return cls(cache_dir)
+
+    @staticmethod
+    def _write_config(cache_dir: Path, config: Dict[str, Any]) -> None:
+        tmp_path = cache_dir / f"config.json.{os.getpid()}.tmp"
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp_path, cache_dir / "config.json")
+
+    def __len__(self) -> int:
+        return len(self._sentence_indices)
+
+    def _load(self) -> None:
+        """
+        Load the persisted entries of the cache directory with memory-mapped features and sentence offsets.
+        """
+        sentence_keys_file = self.cache_dir / "sentence_keys.json"
+        if not sentence_keys_file.exists():
+            return
+        with sentence_keys_file.open("r", encoding="utf-8") as f:
+            sentence_keys: List[str] = json.load(f)
+        self._features = np.load(self.cache_dir / "features.npy", mmap_mode="r")
+        self._sentence_offsets = np.load(self.cache_dir / "sentence_offsets.npy", mmap_mode="r")
+        self._sentence_indices = {sentence_key: index for index, sentence_key in enumerate(sentence_keys)}
+
+    def save(self) -> None:
+        """
+        Persist the cache, if sentences were added since it was loaded. The files are replaced atomically,
+        so concurrent runs never read a partially written cache, the last writer wins.
+        """
+        if not self._new_sentence_keys:
+            return
+        sentence_keys = [None] * len(self._sentence_indices)
+        for sentence_key, index in self._sentence_indices.items():
+            sentence_keys[index] = sentence_key
+        new_token_counts = np.array([len(features) for features in self._new_sentence_features], dtype=np.int64)
+        persisted_features = [np.asarray(self._features)] if len(self._features) else []
+        features = np.concatenate(persisted_features + self._new_sentence_features).astype(np.float16)
+        sentence_offsets = np.concatenate([np.asarray(self._sentence_offsets), self._sentence_offsets[-1] + np.cumsum(new_token_counts)])
+        assert len(sentence_offsets) == len(sentence_keys) + 1
+
+        suffix = f".{os.getpid()}.tmp"
+        for file_name, array in [("features.npy", features), ("sentence_offsets.npy", sentence_offsets)]:
+            with (self.cache_dir / f"{file_name}{suffix}").open("wb") as f:
+                np.save(f, array, allow_pickle=False)
+        with (self.cache_dir / f"sentence_keys.json{suffix}").open("w", encoding="utf-8") as f:
+            json.dump(sentence_keys, f)
+        # sentence_keys.json is replaced last, a reader never sees more sentences than offsets
+        for file_name in ["features.npy", "sentence_offsets.npy", "sentence_keys.json"]:
+            os.replace(self.cache_dir / f"{file_name}{suffix}", self.cache_dir / file_name)
+
+        self._new_sentence_keys, self._new_sentence_features = list(), list()
+        self._load()
+
+    def get_sentence_key(self, sentence: Sentence) -> str:
+        """
+        Key of a sentence and the context the embeddings see, as expanded by TransformerWordEmbeddings in evaluation mode.
+        :param sentence: The sentence.
+        :return: Hex digest of the tokens of the left context, the sentence and the right context.
+        """
+        left_context, right_context = list(), list()
+        if self.config["context_length"] > 0:
+            left_context = sentence.left_context(self.config["context_length"], self.config["respect_document_boundaries"])
+            right_context = sentence.right_context(self.config["context_length"], self.config["respect_document_boundaries"])
+        texts = [[token.text for token in tokens] for tokens in [left_context, sentence.tokens, right_context]]
+        return hashlib.sha1(json.dumps(texts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get_missing_sentences(self, sentences: Iterable[Sentence]) -> List[Sentence]:
+        """
+        :param sentences: The sentences.
+        :return: The sentences whose embeddings are not cached yet, one per sentence key.
+        """
+        missing_sentences: Dict[str, Sentence] = dict()
+        for sentence in sentences:
+            sentence_key = self.get_sentence_key(sentence)
+            if sentence_key not in self._sentence_indices:
+                missing_sentences.setdefault(sentence_key, sentence)
+        return list(missing_sentences.values())
+
+    def add_sentences(self, sentences: Iterable[Sentence], embeddings: TransformerWordEmbeddings, mini_batch_size: int = 32) -> int:
+        """
+        Embed the sentences that are not cached yet with the encoder in evaluation mode and add their token embeddings.
+        :param sentences: The sentences to add, linked to their context sentences.
+        :param embeddings: The transformer embeddings of the model and context setting of the cache.
+        :param mini_batch_size: Number of sentences embedded at once.
+        :return: Number of added sentences.
+        """
+        if embeddings.context_length != self.config["context_length"]:
+            raise ValueError(f"The embeddings use a context length of {embeddings.context_length}, the cache of {self.config['context_length']}.")
+        missing_sentences = sorted(self.get_missing_sentences(sentences), key=len, reverse=True)
+        if not missing_sentences:
+            return 0
+        if self.config["embedding_length"] is None:
+            self.config["embedding_length"] = embeddings.embedding_length
+            self._write_config(self.cache_dir, self.config)
+
+        was_training = embeddings.training
+        embeddings.eval()
+        try:
+            with torch.no_grad():
+                for start in range(0, len(missing_sentences), mini_batch_size):
+                    batch = missing_sentences[start: start + mini_batch_size]
+                    embeddings.embed(batch)
+                    for sentence in batch:
+                        sentence_key = self.get_sentence_key(sentence)
+                        features = torch.stack([token.get_embedding([embeddings.name]) for token in sentence])
+                        self._sentence_indices[sentence_key] = len(self._sentence_indices)
+                        self._new_sentence_keys.append(sentence_key)
+                        self._new_sentence_features.append(features.float().cpu().numpy().astype(np.float16))
+                        sentence.clear_embeddings([embeddings.name])
+        finally:
+            embeddings.train(was_training)
+        return len(missing_sentences)
+
+    def get_sentence_features(self, sentence: Sentence) -> np.ndarray:
+        """
+        Get the cached token embeddings of a sentence.
+        :param sentence: The sentence.
+        :return: Array of the float16 embeddings of its tokens.
+        """
+        sentence_key = self.get_sentence_key(sentence)
+        if sentence_key not in self._sentence_indices:
+            raise ValueError(f"The embeddings of the sentence '{sentence.to_original_text()[:50]}' are not cached in {self.cache_dir}.")
+        index = self._sentence_indices[sentence_key]
+        persisted_sentence_count = len(self._sentence_offsets) - 1
+        if index < persisted_sentence_count:
+            return self._features[self._sentence_offsets[index]: self._sentence_offsets[index + 1]]
+        return self._new_sentence_features[index - persisted_sentence_count]
+
+
+@register_embeddings
+class CachedFeatureEmbeddings(TokenEmbeddings):
+    """
+    Static token embeddings read from an EmbeddingFeatureCache, to train a tagger head on a frozen encoder.
+    A model saved with them stores the cache directory, so it can only be loaded where the cache is.
+    """
+
+    def __init__(self, cache: EmbeddingFeatureCache):
+        """
+        :param cache: The filled feature cache.
+        """
+        self.name = f"cached-features-{cache.cache_dir.name}"
+        self.static_embeddings = True
+        super().__init__()
+        self.cache = cache
+
+    @property
+    def embedding_length(self) -> int:
+        return self.cache.config["embedding_length"]
+
+    def _add_embeddings_internal(self, sentences: List[Sentence]):
+        for sentence in sentences:
+            features = torch.from_numpy(np.asarray(self.cache.get_sentence_features(sentence), dtype=np.float32)).to(flair.device)
+            for token, token_features in zip(sentence, features):
+                token.set_embedding(self.name, token_features)
+
+    def to_params(self) -> Dict[str, Any]:
+        return {"cache_dir": str(self.cache.cache_dir)}
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> "CachedFeatureEmbeddings":
+        return cls(EmbeddingFeatureCache(Path(params["cache_dir"])))
@@ -0,0 +1,319 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from flair.data import Sentence, Token
+from flair.datasets import FlairDatapointDataset, SentenceDataset
+from flair.embeddings import Embeddings
+from flair.nn import Model
+from flair.trainers.plugins import BasePlugin, MetricRecord, TrainerPlugin
+from flair.training_utils import Result
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+import logging
+import multiprocessing
+import os
+import torch
+
+log = logging.getLogger("flair")
+
+_worker_model: Model = None
+_worker_datasets: Dict[str, FlairDatapointDataset] = dict()
+_worker_best_score: float = float("-inf")
+
+
+def _dump_dataset(dataset: FlairDatapointDataset, label_type: str) -> List[Dict[str, Any]]:
+    """
+    Convert the sentences of a sequence labeling dataset to plain records for the evaluation worker process,
+    Flair sentences linked to their context sentences can not be pickled.
+    :param dataset: The dataset.
+    :param label_type: The label type of the spans.
+    :return: Per sentence, its tokens, labeled spans and the indices of its previous and next sentence.
+    """
+    sentences: List[Sentence] = [dataset[index] for index in range(len(dataset))]
+    sentence_indices = {id(sentence): index for index, sentence in enumerate(sentences)}
+    return [
+        {
+            "tokens": [(token.text, token.start_position, token.whitespace_after) for token in sentence],
+            "spans": [
+                (span.tokens[0].idx - 1, span.tokens[-1].idx, span.get_label(label_type).value, span.get_label(label_type).score)
+                for span in sentence.get_spans(label_type)
+            ],
+            "previous": sentence_indices.get(id(sentence._previous_sentence)),
+            "next": sentence_indices.get(id(sentence._next_sentence))
+        }
+        for sentence in sentences
+    ]
+
+
+def _load_dataset(sentence_records: List[Dict[str, Any]], label_type: str) -> FlairDatapointDataset:
+    """
+    Rebuild a sequence labeling dataset from the records of _dump_dataset.
+    :param sentence_records: The sentence records.
+    :param label_type: The label type of the spans.
+    :return: The dataset.
+    """
+    sentences: List[Sentence] = list()
+    for sentence_record in sentence_records:
+        sentence = Sentence([
+            Token(text, whitespace_after=whitespace_after, start_position=start_position)
+            for text, start_position, whitespace_after in sentence_record["tokens"]
+        ])
+        for start, stop, value, score in sentence_record["spans"]:
+            sentence[start: stop].add_label(label_type, value=value, score=score)
+        sentences.append(sentence)
+    for sentence, sentence_record in zip(sentences, sentence_records):
+        sentence._previous_sentence = sentences[sentence_record["previous"]] if sentence_record["previous"] is not None else None
+        sentence._next_sentence = sentences[sentence_record["next"]] if sentence_record["next"] is not None else None
+        sentence._has_context = sentence._previous_sentence is not None or sentence._next_sentence is not None
+    return SentenceDataset(sentences)
+
+
+def _init_evaluation_worker(model_class: Type[Model],
+                            model_path: Path,
+                            label_type: str,
+                            dumped_datasets: Dict[str, List[Dict[str, Any]]],
+                            num_threads: int = None,
+                            embeddings_class: Type[Embeddings] = None,
+                            best_score: float = float("-inf")) -> None:
+    """
+    Load the model and the evaluation datasets once in the evaluation worker process.
+    :param model_class: The class of the model.
+    :param model_path: Path of the model saved by the training process.
+    :param label_type: The label type of the spans.
+    :param dumped_datasets: The datasets to evaluate by split name, as records of _dump_dataset.
+    :param num_threads: Number of torch threads of the worker process, None to keep the default.
+    :param embeddings_class: The class of the embeddings of the model, unpickling it imports and registers
+                             embeddings classes defined outside of Flair before the model is loaded.
+    :param best_score: The dev score a snapshot has to beat to be saved as best model, e.g. of a resumed training.
+    """
+    global _worker_model, _worker_datasets, _worker_best_score
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    _worker_model = model_class.load(model_path)
+    _worker_model.eval()
+    _worker_datasets = {split: _load_dataset(dumped_dataset, label_type) for split, dumped_dataset in dumped_datasets.items()}
+    _worker_best_score = best_score
+
+
+def _set_worker_best_score(best_score: float) -> None:
+    """
+    Set the dev score a snapshot has to beat to be saved as best model in the evaluation worker process.
+    :param best_score: The dev score.
+    """
+    global _worker_best_score
+    _worker_best_score = best_score
+
+
+def _evaluate_snapshot(snapshot_path: Path,
+                       epoch: int,
+                       split_evaluate_kwargs: Dict[str, Dict[str, Any]],
+                       best_model_path: Path) -> Tuple[int, Dict[str, Result], bool]:
+    """
+    Evaluate a weight snapshot on the requested splits in the evaluation worker process and save it as best model
+    if its dev score beats the dev scores of all earlier snapshots, like the ModelTrainer selects the best model.
+    :param snapshot_path: Path of the saved state dict of the model, removed after loading.
+    :param epoch: The epoch of the snapshot.
+    :param split_evaluate_kwargs: The keyword arguments of the evaluate calls of the trainer by split name.
+    :param best_model_path: Path to save the best model to.
+    :return: The epoch, the evaluation results by split name and whether the snapshot was saved as best model.
+    """
+    global _worker_best_score
+    _worker_model.load_state_dict(torch.load(snapshot_path, map_location="cpu"))
+    os.remove(snapshot_path)
+    results: Dict[str, Result] = {
+        split: _worker_model.evaluate(_worker_datasets[split], **evaluate_kwargs)
+        for split, evaluate_kwargs in split_evaluate_kwargs.items()
+    }
+    is_best = "dev" in results and results["dev"].main_score > _worker_best_score
+    if is_best:
+        _worker_best_score = results["dev"].main_score
+        _worker_model.model_card["training_parameters"]["epoch"] = epoch
+        _worker_model.save(best_model_path)
+    return epoch, results, is_best
+
+
+class EvaluationCadencePlugin(TrainerPlugin):
+    """
+    A TrainerPlugin that evaluates the monitored splits only every eval_every_n_epochs epochs and after the last epoch,
+    optionally in a separate worker process while the training continues.
+    The evaluate calls of the trainer in the skipped epochs return a placeholder result with a score of -inf and
+    a loss of NaN, so the trainer neither selects nor saves a best model for them.
+    In asynchronous mode the weights are snapshotted to a file, the worker process evaluates the snapshot on the
+    dev split and the monitored test split, saves it as best-model.pt if its dev score is the best so far
+    and the results are recorded like the trainer records them once they arrive, with the best_model_saved metric
+    of the worker. All evaluations are awaited at the end of the training loop, so the final evaluation loads
+    the same best model as without the plugin. The best dev score of the published evaluations is kept in best_score,
+    a resumed training restores it with set_best_score so the worker does not replace a better best model.
+    """
+
+    def __init__(self,
+                 eval_every_n_epochs: int = 1,
+                 asynchronous: bool = False,
+                 num_threads: int = None,
+                 max_pending_evaluations: int = 2):
+        """
+        :param eval_every_n_epochs: Evaluate every n epochs and after the last epoch.
+        :param asynchronous: Whether to evaluate the weight snapshots in a separate worker process.
+        :param num_threads: Number of torch threads of the evaluation worker process, None to keep the default.
+        :param max_pending_evaluations: Maximum number of snapshots queued for evaluation,
+                                        the training waits for the oldest one beyond.
+        """
+        super().__init__()
+        if eval_every_n_epochs < 1:
+            raise ValueError(f"eval_every_n_epochs must be at least 1, got {eval_every_n_epochs}.")
+        self.eval_every_n_epochs = eval_every_n_epochs
+        self.asynchronous = asynchronous
+        self.num_threads = num_threads
+        self.max_pending_evaluations = max_pending_evaluations
+        self._base_path: Path = None
+        self._max_epochs: int = None
+        self._epoch: int = 0
+        self._original_evaluate: Callable = None
+        self._executor: ProcessPoolExecutor = None
+        self._model_path: Path = None
+        self._pending_evaluations: List[Future] = list()
+        self._split_evaluate_kwargs: Dict[str, Dict[str, Any]] = dict()
+        self._snapshot_path: Path = None
+        self.best_score: float = float("-inf")
+
+    def _is_evaluation_epoch(self) -> bool:
+        """
+        Whether the current epoch is evaluated.
+        :return: True every eval_every_n_epochs epochs and after the last epoch.
+        """
+        return self._epoch % self.eval_every_n_epochs == 0 or self._epoch == self._max_epochs
+
+    @staticmethod
+    def _get_placeholder_result() -> Result:
+        """
+        Get the result returned for skipped and asynchronous evaluations.
+        :return: A result with a score of -inf and a loss of NaN.
+        """
+        return Result(main_score=float("-inf"), detailed_results="", scores={"loss": float("nan")})
+
+    def _evaluate(self, data_points, **kw) -> Result:
+        """
+        Replaces the evaluate method of the model during the training loop.
+        :param data_points: The data points to evaluate.
+        :return: The evaluation result, or a placeholder result for skipped and asynchronous evaluations.
+        """
+        split = Path(kw["out_path"]).stem if kw.get("out_path") else None
+        if split not in ("dev", "test"):
+            return self._original_evaluate(data_points, **kw)
+        if not self._is_evaluation_epoch():
+            log.info(f"{split.upper()} : evaluation skipped in epoch {self._epoch}")
+            return self._get_placeholder_result()
+        if not self.asynchronous:
+            return self._original_evaluate(data_points, **kw)
+
+        if self._snapshot_path is None:
+            self._snapshot_path = self._base_path / f"evaluation-snapshot-epoch-{self._epoch}.pt"
+            torch.save({key: value.detach().cpu() for key, value in self.trainer.model.state_dict().items()}, self._snapshot_path)
+        self._split_evaluate_kwargs[split] = dict(kw)
+        log.info(f"{split.upper()} : evaluation of epoch {self._epoch} queued in the evaluation worker")
+        return self._get_placeholder_result()
+
+    def _publish_evaluations(self, wait: bool = False) -> None:
+        """
+        Record the results of the finished asynchronous evaluations in the order of their epochs.
+        :param wait: Whether to wait for all pending evaluations.
+        """
+        while self._pending_evaluations and (wait or self._pending_evaluations[0].done()):
+            epoch, results, is_best = self._pending_evaluations.pop(0).result()
+            for split, result in results.items():
+                log.info(
+                    f"{split.upper()} (epoch {epoch}, asynchronous) : loss {result.loss}"
+                    f" - score {round(result.main_score, 4)}"
+                )
+                self.trainer._publish_eval_result(result, split, global_step=epoch)
+            self.trainer._record(MetricRecord.scalar(("best_model_saved",), int(is_best), epoch))
+            if is_best:
+                self.best_score = results["dev"].main_score
+                log.info(f"saved best model of epoch {epoch}")
+
+    def set_best_score(self, best_score: float) -> None:
+        """
+        Set the best dev score of the asynchronous evaluations, e.g. of a resumed training,
+        the worker process only saves snapshots with a better dev score as best model.
+        :param best_score: The best dev score.
+        """
+        self.best_score = best_score
+        if self._executor:
+            self._executor.submit(_set_worker_best_score, best_score)
+
+    @BasePlugin.hook("after_setup")
+    def after_setup(self, base_path=None, max_epochs=None, **kw):
+        """
+        Replaces the evaluate method of the model and starts the evaluation worker process in asynchronous mode.
+        :param base_path: The training base path.
+        :param max_epochs: The number of training epochs.
+        """
+        self._base_path = Path(base_path)
+        self._max_epochs = max_epochs
+        model = self.trainer.model
+        if self.asynchronous:
+            self._model_path = self._base_path / "evaluation-worker-model.pt"
+            model.save(self._model_path)
+            dumped_datasets = {"dev": _dump_dataset(self.trainer.corpus.dev, model.label_type)}
+            if self.trainer.corpus.test:
+                dumped_datasets["test"] = _dump_dataset(self.trainer.corpus.test, model.label_type)
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_evaluation_worker,
+                initargs=(
+                    type(model), self._model_path, model.label_type, dumped_datasets, self.num_threads, type(model.embeddings),
+                    self.best_score
+                )
+            )
+        self._original_evaluate = model.evaluate
+        model.evaluate = self._evaluate
+
+    @BasePlugin.hook("before_training_epoch")
+    def before_training_epoch(self, epoch=None):
+        """
+        Records the finished asynchronous evaluations and keeps the current epoch.
+        :param epoch: The current epoch number.
+        """
+        self._epoch = epoch
+        if self._executor:
+            self._publish_evaluations()
+
+    @BasePlugin.hook("after_evaluation")
+    def after_evaluation(self, epoch=None, **kw):
+        """
+        Submits the weight snapshot of the epoch to the evaluation worker process in asynchronous mode.
+        :param epoch: The current epoch number.
+        """
+        if self._executor and self._snapshot_path is not None:
+            if len(self._pending_evaluations) >= self.max_pending_evaluations:
+                self._pending_evaluations[0].result()
+            self._pending_evaluations.append(self._executor.submit(
+                _evaluate_snapshot, self._snapshot_path, epoch, self._split_evaluate_kwargs, self._base_path / "best-model.pt"
+            ))
+            self._snapshot_path = None
+            self._split_evaluate_kwargs = dict()
+            self._publish_evaluations()
+
+    @BasePlugin.hook("after_training_loop")
+    def after_training_loop(self, **kw):
+        """
+        Waits for all asynchronous evaluations, so the final evaluation loads the best model.
+        """
+        if self._executor:
+            self._publish_evaluations(wait=True)
+
+    @BasePlugin.hook("_training_finally")
+    def _training_finally(self, **kw):
+        """
+        Restores the evaluate method of the model and stops the evaluation worker process, also when the training failed.
+        """
+        if self._original_evaluate:
+            del self.trainer.model.evaluate
+            self._original_evaluate = None
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._pending_evaluations = list()
+            self._model_path.unlink(missing_ok=True)
+            for snapshot_path in self._base_path.glob("evaluation-snapshot-epoch-*.pt"):
+                snapshot_path.unlink(missing_ok=True)
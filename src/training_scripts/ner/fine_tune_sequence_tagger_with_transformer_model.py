@@ -3,22 +3,130 @@ import sys
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
 from data_handlers.grascco_data_handler import GrasccoDataHandler
-from flair.data import Corpus, Dictionary
+from flair.data import Corpus, Dictionary, Sentence
 from flair.datasets import ColumnCorpus
 from flair.embeddings import TokenEmbeddings, TransformerWordEmbeddings
 from flair.models import SequenceTagger
 from flair.trainers import ModelTrainer
+from flair.trainers.plugins import MetricHistoryPlugin
+from training_scripts.ner.checkpoint_store import CheckpointStore, CheckpointStorePlugin
+from training_scripts.ner.embedding_feature_cache import CachedFeatureEmbeddings, EmbeddingFeatureCache
+from training_scripts.ner.evaluation_cadence_plugin import EvaluationCadencePlugin
+from training_scripts.ner.subword_tokenization_cache import CachedSubwordTokenizer, SubwordTokenizationCache
+from training_scripts.ner.telemetry_plugin import TelemetryPlugin
+from training_scripts.ner.token_budget_batching import BatchingStatsPlugin, LengthBucketSampler, TokenBudgetModelTrainer, get_sentence_subword_length
+from training_scripts.ner.training_state_plugin import TrainingStatePlugin
 from training_scripts.ner.wandb_logger_plugin import WandbLoggerPlugin
+from transformers import AutoTokenizer
+from typing import Any, Dict, Iterable, Tuple
+from utils.bioes_utils import BioesUtils
+from utils.flair_corpus_utils import FlairCorpusUtils
 from utils.project_utils import ProjectUtils
 
 
+import functools
+import math
 import os
+import torch
 import warnings
 
 warnings.filterwarnings("ignore", message=r".*torch\.cuda\.amp\.GradScaler.*")
 
 
-def fine_tune():
+def _get_embeddings(model_name_or_path: str,
+                    use_context: bool | int,
+                    use_pretrained_model: bool,
+                    embeddings_cache: Dict[Tuple[str, bool | int], Tuple[TransformerWordEmbeddings, Dict[str, torch.Tensor]]] = None) -> TransformerWordEmbeddings:
+    """
+    Load the transformer embeddings to fine-tune, from a transformer model or from the embeddings of a pretrained Flair model.
+    With an embeddings cache, the embeddings are loaded once and their initial weights are restored on every later call,
+    so several folds or configs in one process start from the same base weights without loading them again.
+    :param model_name_or_path: The transformer model name, or the path of the pretrained Flair model.
+    :param use_context: The FLERT context setting of the embeddings.
+    :param use_pretrained_model: Whether model_name_or_path is the path of a pretrained Flair model.
+    :param embeddings_cache: Dictionary of loaded embeddings and their initial weights by model and context setting, or None.
+    :return: The transformer embeddings with their initial weights.
+    """
+    cache_key = (model_name_or_path, use_context)
+    if embeddings_cache is not None and cache_key in embeddings_cache:
+        embeddings, initial_state_dict = embeddings_cache[cache_key]
+        if isinstance(embeddings.tokenizer, CachedSubwordTokenizer):
+            embeddings.tokenizer = embeddings.tokenizer.tokenizer
+        embeddings.load_state_dict(initial_state_dict)
+        print(f"Restored the initial weights of the loaded embeddings of: {model_name_or_path}")
+        return embeddings
+
+    if use_pretrained_model:
+        print(f"Loading pretrained Flair model from: {model_name_or_path}")
+        pretrained_tagger = SequenceTagger.load(model_name_or_path)
+        
+        if hasattr(pretrained_tagger.embeddings, 'model') and hasattr(pretrained_tagger.embeddings.model, 'name_or_path'):
+            base_transformer_name = pretrained_tagger.embeddings.model.name_or_path
+            print(f"base_transformer_name [pretrained_tagger.embeddings.model.name_or_path]: {base_transformer_name}")
+        
+        embeddings: TokenEmbeddings = TransformerWordEmbeddings(
+            model=base_transformer_name,
+            use_context=use_context,
+            fine_tune=True
+        )
+        
+        if hasattr(pretrained_tagger.embeddings, 'model') and hasattr(embeddings, 'model'):
+            print("Transferring fine-tuned transformer weights from pretrained model...")
+            embeddings.model.load_state_dict(pretrained_tagger.embeddings.model.state_dict())
+            print("Transformer weights transferred successfully!")
+    else:
+        embeddings: TokenEmbeddings = TransformerWordEmbeddings(
+            model=model_name_or_path,
+            use_context=use_context,
+            fine_tune=True
+        )
+
+    if embeddings_cache is not None:
+        initial_state_dict = {key: value.detach().clone() for key, value in embeddings.state_dict().items()}
+        embeddings_cache[cache_key] = (embeddings, initial_state_dict)
+    return embeddings
+
+
+def _get_cached_feature_embeddings(model_name_or_path: str,
+                                   use_context: bool | int,
+                                   use_pretrained_model: bool,
+                                   sentences: Iterable[Sentence],
+                                   feature_cache_dir: Path,
+                                   mini_batch_size: int = 32,
+                                   embeddings_cache: Dict[Tuple[str, bool | int], Tuple[TransformerWordEmbeddings, Dict[str, torch.Tensor]]] = None) -> CachedFeatureEmbeddings:
+    """
+    Get the embeddings of a frozen transformer encoder from the embedding feature cache of the model and context setting,
+    running the encoder only over the sentences that are not cached yet, so a tagger head can be trained without it.
+    :param model_name_or_path: The transformer model name, or the path of the pretrained Flair model.
+    :param use_context: The FLERT context setting of the embeddings.
+    :param use_pretrained_model: Whether model_name_or_path is the path of a pretrained Flair model.
+    :param sentences: The sentences of the corpus, linked to their context sentences.
+    :param feature_cache_dir: Root directory of the embedding feature caches.
+    :param mini_batch_size: Number of sentences the encoder embeds at once.
+    :param embeddings_cache: Dictionary of loaded embeddings and their initial weights, see _get_embeddings.
+    :return: The cached feature embeddings.
+    """
+    feature_cache = EmbeddingFeatureCache.create(feature_cache_dir, model_name_or_path, use_context)
+    missing_sentences = feature_cache.get_missing_sentences(sentences)
+    if missing_sentences:
+        encoder = _get_embeddings(model_name_or_path, use_context, use_pretrained_model, embeddings_cache=embeddings_cache)
+        feature_cache.add_sentences(missing_sentences, encoder, mini_batch_size=mini_batch_size)
+        feature_cache.save()
+    print(f"embedding feature cache: {len(feature_cache)} sentences, {len(missing_sentences)} added")
+    return CachedFeatureEmbeddings(feature_cache)
+
+
+def fine_tune(data_handler: GrasccoDataHandler = None,
+              embeddings_cache: Dict[Tuple[str, bool | int], Tuple[TransformerWordEmbeddings, Dict[str, torch.Tensor]]] = None) -> Dict[str, Any]:
+    """
+    Fine-tune a sequence tagger on one data fold, configured by environment variables.
+    The data handler and the embeddings cache let several runs in one process share the loaded dataset and base weights,
+    the tagger head is built anew on every run.
+    :param data_handler: A GrasccoDataHandler to reuse across runs, created from DATA_DIR if None.
+    :param embeddings_cache: Dictionary to reuse the loaded transformer embeddings across runs, see _get_embeddings.
+    :return: Dictionary with the model_dir_name, sample_size, data_fold_k_value, model_dir_path, test_score 
+             and the dev_score_history, the dev micro-F1 of every evaluated epoch, of the run.
+    """
 
     model_checkpoints_root_dir = os.environ.get("MODEL_CHECKPOINTS_ROOT_DIR", None)
     model_checkpoints_root_dir = Path(model_checkpoints_root_dir) if model_checkpoints_root_dir else Path.home() / "model_checkpoints"
@@ -36,6 +144,12 @@ def fine_tune():
     if log_to_wandb:
         wandb_entity = os.environ.get("WANDB_ENTITY", "sksdotsauravs-dev")
 
+        wandb_buffered = os.environ.get("WANDB_BUFFERED", None)
+        wandb_buffered = bool(int(wandb_buffered)) if wandb_buffered else True
+
+        wandb_flush_interval = os.environ.get("WANDB_FLUSH_INTERVAL", None)
+        wandb_flush_interval = float(wandb_flush_interval) if wandb_flush_interval else 5.0
+
     use_pretrained_model = os.environ.get("USE_PRETRAINED_MODEL", None)
     use_pretrained_model = int(use_pretrained_model) if use_pretrained_model else 0
     use_pretrained_model = bool(use_pretrained_model) if use_pretrained_model else False
@@ -53,18 +167,117 @@ def fine_tune():
     use_context = int(use_context) if use_context else 1
     if use_context == 0 or use_context == 1:
         use_context = bool(use_context)
+
+    frozen_encoder = os.environ.get("FROZEN_ENCODER", None)
+    frozen_encoder = bool(int(frozen_encoder)) if frozen_encoder else False
+
+    feature_cache_dir = os.environ.get("FEATURE_CACHE_DIR", None)
+    feature_cache_dir = Path(feature_cache_dir) if feature_cache_dir else model_checkpoints_root_dir / "embedding_feature_cache"
+
+    use_rnn = os.environ.get("USE_RNN", None)
+    use_rnn = bool(int(use_rnn)) if use_rnn else False
+
+    use_crf = os.environ.get("USE_CRF", None)
+    use_crf = bool(int(use_crf)) if use_crf else False
     
     learning_rate = os.environ.get("LEARNING_RATE", None)
-    learning_rate = float(learning_rate) if learning_rate else 5e-5
+    learning_rate = float(learning_rate) if learning_rate else (1e-3 if frozen_encoder else 5e-5)
     
     max_epochs = os.environ.get("MAX_EPOCHS", None)
     max_epochs = int(max_epochs) if max_epochs else 35
     
     mini_batch_size = os.environ.get("MINI_BATCH_SIZE", None)
     mini_batch_size = int(mini_batch_size) if mini_batch_size else 1
+
+    eval_batch_size = os.environ.get("EVAL_BATCH_SIZE", None)
+    eval_batch_size = int(eval_batch_size) if eval_batch_size else mini_batch_size
+
+    batching_mode = os.environ.get("BATCHING_MODE", None)
+    batching_mode = batching_mode if batching_mode else "fixed"
+    if batching_mode not in ["fixed", "token_budget"]:
+        raise ValueError(f"Unknown BATCHING_MODE '{batching_mode}', expected 'fixed' or 'token_budget'.")
+
+    max_batch_tokens = os.environ.get("MAX_BATCH_TOKENS", None)
+    max_batch_tokens = int(max_batch_tokens) if max_batch_tokens else 4096
+
+    gradient_accumulation = os.environ.get("GRADIENT_ACCUMULATION", None)
+    gradient_accumulation = bool(int(gradient_accumulation)) if gradient_accumulation else True
+
+    chunking_mode = os.environ.get("CHUNKING_MODE", None)
+    chunking_mode = chunking_mode if chunking_mode else "document"
+    if chunking_mode not in BioesUtils.chunking_modes:
+        raise ValueError(f"Unknown CHUNKING_MODE '{chunking_mode}', expected one of {BioesUtils.chunking_modes}.")
+
+    max_subword_count = os.environ.get("MAX_SUBWORD_COUNT", None)
+    max_subword_count = int(max_subword_count) if max_subword_count else 256
+
+    in_memory_corpus = os.environ.get("IN_MEMORY_CORPUS", None)
+    in_memory_corpus = bool(int(in_memory_corpus)) if in_memory_corpus else True
+
+    write_corpus_files = os.environ.get("WRITE_CORPUS_FILES", None)
+    write_corpus_files = bool(int(write_corpus_files)) if write_corpus_files else False
+
+    use_subword_cache = os.environ.get("USE_SUBWORD_CACHE", None)
+    use_subword_cache = bool(int(use_subword_cache)) if use_subword_cache else False
+
+    subword_cache_dir = os.environ.get("SUBWORD_CACHE_DIR", None)
+    subword_cache_dir = Path(subword_cache_dir) if subword_cache_dir else model_checkpoints_root_dir / "subword_tokenization_cache"
+
+    subword_tokenizer_name = os.environ.get("SUBWORD_TOKENIZER_NAME", None)
+    subword_tokenizer_name = subword_tokenizer_name if subword_tokenizer_name else transformer_model_name
+    if chunking_mode == "subword_budget" and not subword_tokenizer_name:
+        raise ValueError(
+            "'SUBWORD_TOKENIZER_NAME' environment variable must be set for CHUNKING_MODE 'subword_budget' when 'USE_PRETRAINED_MODEL' is True."
+        )
+    
+    eval_every_n_epochs = os.environ.get("EVAL_EVERY_N_EPOCHS", None)
+    eval_every_n_epochs = int(eval_every_n_epochs) if eval_every_n_epochs else 1
+
+    monitor_test = os.environ.get("MONITOR_TEST", None)
+    monitor_test = bool(int(monitor_test)) if monitor_test else True
+
+    async_eval = os.environ.get("ASYNC_EVAL", None)
+    async_eval = bool(int(async_eval)) if async_eval else False
+
+    async_eval_num_threads = os.environ.get("ASYNC_EVAL_NUM_THREADS", None)
+    async_eval_num_threads = int(async_eval_num_threads) if async_eval_num_threads else None
+
+    telemetry = os.environ.get("TELEMETRY", None)
+    telemetry = bool(int(telemetry)) if telemetry else False
+
+    telemetry_log_batches = os.environ.get("TELEMETRY_LOG_BATCHES", None)
+    telemetry_log_batches = bool(int(telemetry_log_batches)) if telemetry_log_batches else False
+
+    telemetry_synchronize_batches = os.environ.get("TELEMETRY_SYNCHRONIZE_BATCHES", None)
+    telemetry_synchronize_batches = bool(int(telemetry_synchronize_batches)) if telemetry_synchronize_batches else telemetry_log_batches
+
+    use_checkpoint_store = os.environ.get("USE_CHECKPOINT_STORE", None)
+    use_checkpoint_store = bool(int(use_checkpoint_store)) if use_checkpoint_store else False
+
+    checkpoint_store_dir = os.environ.get("CHECKPOINT_STORE_DIR", None)
+    checkpoint_store_dir = Path(checkpoint_store_dir) if checkpoint_store_dir else model_checkpoints_root_dir / "checkpoint_store"
+
+    export_best_model = os.environ.get("EXPORT_BEST_MODEL", None)
+    export_best_model = bool(int(export_best_model)) if export_best_model else False
+
+    save_training_state = os.environ.get("SAVE_TRAINING_STATE", None)
+    save_training_state = bool(int(save_training_state)) if save_training_state else True
+
+    save_training_state_every_n_epochs = os.environ.get("SAVE_TRAINING_STATE_EVERY_N_EPOCHS", None)
+    save_training_state_every_n_epochs = int(save_training_state_every_n_epochs) if save_training_state_every_n_epochs else 5
+
+    save_training_state_every_n_batches = os.environ.get("SAVE_TRAINING_STATE_EVERY_N_BATCHES", None)
+    save_training_state_every_n_batches = int(save_training_state_every_n_batches) if save_training_state_every_n_batches else 0
+
+    resume_training = os.environ.get("RESUME_TRAINING", None)
+    resume_training = bool(int(resume_training)) if resume_training else True
+
+    run_name = os.environ.get("RUN_NAME", None)
+    run_name = run_name if run_name else None
     
     project_root: Path = ProjectUtils.get_project_root()
-    data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
+    if data_handler is None:
+        data_handler = GrasccoDataHandler(project_root, data_dir=data_dir)
     datasetdict = data_handler.get_train_dev_test_datasetdict(data_fold_k_value)
     
     label_order = [
@@ -87,6 +300,9 @@ def fine_tune():
     print(f"log_to_wandb: {log_to_wandb}")
     if log_to_wandb:
         print(f"wandb_entity: {wandb_entity}")
+        print(f"wandb_buffered: {wandb_buffered}")
+        if wandb_buffered:
+            print(f"wandb_flush_interval: {wandb_flush_interval}")
     
     print(f"use_pretrained_model: {use_pretrained_model}")
     if use_pretrained_model:
@@ -96,9 +312,47 @@ def fine_tune():
         print(f"transformer_model_name: {transformer_model_name}")
 
     print(f"use_context: {use_context}")
+    print(f"frozen_encoder: {frozen_encoder}")
+    if frozen_encoder:
+        print(f"feature_cache_dir: {feature_cache_dir}")
+    print(f"use_rnn: {use_rnn}")
+    print(f"use_crf: {use_crf}")
     print(f"learning_rate: {learning_rate:.0e}".replace('e-0', 'e-'))
     print(f"mini_batch_size: {mini_batch_size}")
+    print(f"eval_batch_size: {eval_batch_size}")
+    print(f"batching_mode: {batching_mode}")
+    if batching_mode == "token_budget":
+        print(f"max_batch_tokens: {max_batch_tokens}")
+        print(f"gradient_accumulation: {gradient_accumulation}")
     print(f"max_epochs: {max_epochs}")
+    print(f"eval_every_n_epochs: {eval_every_n_epochs}")
+    print(f"monitor_test: {monitor_test}")
+    print(f"async_eval: {async_eval}")
+    if async_eval:
+        print(f"async_eval_num_threads: {async_eval_num_threads}")
+    print(f"in_memory_corpus: {in_memory_corpus}")
+    print(f"write_corpus_files: {write_corpus_files}")
+    print(f"use_subword_cache: {use_subword_cache}")
+    if use_subword_cache:
+        print(f"subword_cache_dir: {subword_cache_dir}")
+    print(f"chunking_mode: {chunking_mode}")
+    if chunking_mode == "subword_budget":
+        print(f"max_subword_count: {max_subword_count}")
+        print(f"subword_tokenizer_name: {subword_tokenizer_name}")
+    print(f"telemetry: {telemetry}")
+    if telemetry:
+        print(f"telemetry_log_batches: {telemetry_log_batches}")
+        print(f"telemetry_synchronize_batches: {telemetry_synchronize_batches}")
+    print(f"use_checkpoint_store: {use_checkpoint_store}")
+    if use_checkpoint_store:
+        print(f"checkpoint_store_dir: {checkpoint_store_dir}")
+        print(f"export_best_model: {export_best_model}")
+    print(f"save_training_state: {save_training_state}")
+    if save_training_state:
+        print(f"save_training_state_every_n_epochs: {save_training_state_every_n_epochs}")
+        print(f"save_training_state_every_n_batches: {save_training_state_every_n_batches}")
+        print(f"resume_training: {resume_training}")
+    print(f"run_name: {run_name}")
     print(f"sample_size: {sample_size}")
 
     model_dir_name = ""
@@ -107,7 +361,8 @@ def fine_tune():
             raise ValueError(
                 "Both 'PRETRAINED_MODEL_PATH' and 'PRETRAINED_MODEL_NAME' environment variables must be set when 'USE_PRETRAINED_MODEL' is True."
             )
-        if not Path(pretrained_model_path).exists():
+        # a best model of a run with the checkpoint store is only exported on demand
+        if not CheckpointStore.resolve(Path(pretrained_model_path)).exists():
             raise FileNotFoundError(f"Pretrained model path '{pretrained_model_path}' does not exist.")
 
         model_dir_name = pretrained_model_name.replace("/", "--").replace("_", "-")
@@ -128,75 +383,122 @@ def fine_tune():
     elif isinstance(use_context, int):
         data_dir_path = data_dir_path / f"use-context-{use_context}"
 
+    if chunking_mode == "sentence":
+        data_dir_path = data_dir_path / "chunking-sentence"
+    elif chunking_mode == "subword_budget":
+        data_dir_path = data_dir_path / f"chunking-subword-budget-{max_subword_count}"
+
     data_dir_path =  data_dir_path / f"sample-size-{sample_size}" / f"data-fold-{data_fold_k_value}"
     data_dir_path.mkdir(parents=True, exist_ok=True)
 
-    train_text = train_df.bioes_text.str.cat(sep="\n\n")
-    dev_text = dev_df.bioes_text.str.cat(sep="\n\n")
-    test_text = test_df.bioes_text.str.cat(sep="\n\n")
-    with (data_dir_path / "train.txt").open("w", encoding="utf-8") as writer:
-        writer.write(train_text)
-    with (data_dir_path / "dev.txt").open("w", encoding="utf-8") as writer:
-        writer.write(dev_text)
-    with (data_dir_path / "test.txt").open("w", encoding="utf-8") as writer:
-        writer.write(test_text)
-
-    corpus: Corpus = ColumnCorpus(data_dir_path, {0: 'text', 1: 'ner'})
+    get_subword_count = None
+    if chunking_mode == "subword_budget":
+        subword_tokenizer = AutoTokenizer.from_pretrained(subword_tokenizer_name)
+        get_subword_count = lambda token_text: max(1, len(subword_tokenizer.tokenize(token_text)))
+
+    if write_corpus_files or not in_memory_corpus:
+        if chunking_mode == "document":
+            train_text = train_df.bioes_text.str.cat(sep="\n\n")
+            dev_text = dev_df.bioes_text.str.cat(sep="\n\n")
+            test_text = test_df.bioes_text.str.cat(sep="\n\n")
+        else:
+            train_text, dev_text, test_text = [
+                "\n\n".join(
+                    GrasccoDataHandler.get_chunked_bioes_text(row, chunking_mode, max_subword_count, get_subword_count)
+                    for _, row in df.iterrows()
+                )
+                for df in [train_df, dev_df, test_df]
+            ]
+        FlairCorpusUtils.write_column_files(data_dir_path, train_text, dev_text, test_text)
+
+    if in_memory_corpus:
+        corpus: Corpus = FlairCorpusUtils.get_corpus(
+            train_df, 
+            dev_df, 
+            test_df, 
+            chunking_mode=chunking_mode, 
+            max_subword_count=max_subword_count, 
+            get_subword_count=get_subword_count, 
+            name=str(data_dir_path)
+        )
+    else:
+        corpus: Corpus = ColumnCorpus(data_dir_path, {0: 'text', 1: 'ner'})
     label_dict: Dictionary = corpus.make_label_dictionary(label_type="ner")
 
     model_dir_path = data_dir_path / f"learning-rate-{learning_rate:.0e}".replace('e-0', 'e-')
     model_dir_path = model_dir_path / f"max-epochs-{max_epochs}"
     model_dir_path = model_dir_path / f"mini-batch-size-{mini_batch_size}"
+    if batching_mode == "token_budget":
+        model_dir_path = model_dir_path / (
+            f"max-batch-tokens-{max_batch_tokens}" if gradient_accumulation else "length-bucketed"
+        )
+    if eval_every_n_epochs > 1:
+        model_dir_path = model_dir_path / f"eval-every-{eval_every_n_epochs}-epochs"
+    if frozen_encoder:
+        model_dir_path = model_dir_path / "frozen-encoder"
+    if use_rnn or use_crf:
+        model_dir_path = model_dir_path / ("head" + ("-rnn" if use_rnn else "") + ("-crf" if use_crf else ""))
+    if run_name:
+        # separates runs whose settings are not part of the model directory path, e.g. the trials of a sweep
+        model_dir_path = model_dir_path / f"run-{run_name}"
     model_dir_path.mkdir(parents=True, exist_ok=True)
 
-    if use_pretrained_model:
-        print(f"Loading pretrained Flair model from: {pretrained_model_path}")
-        pretrained_tagger = SequenceTagger.load(pretrained_model_path)
-        
-        if hasattr(pretrained_tagger.embeddings, 'model') and hasattr(pretrained_tagger.embeddings.model, 'name_or_path'):
-            base_transformer_name = pretrained_tagger.embeddings.model.name_or_path
-            print(f"base_transformer_name [pretrained_tagger.embeddings.model.name_or_path]: {base_transformer_name}")
-        
-        embeddings: TokenEmbeddings = TransformerWordEmbeddings(
-            model=base_transformer_name,
-            use_context=use_context,
-            fine_tune=True
-        )
-        
-        if hasattr(pretrained_tagger.embeddings, 'model') and hasattr(embeddings, 'model'):
-            print("Transferring fine-tuned transformer weights from pretrained model...")
-            embeddings.model.load_state_dict(pretrained_tagger.embeddings.model.state_dict())
-            print("Transformer weights transferred successfully!")
-        
-        tagger: SequenceTagger = SequenceTagger(
-            hidden_size=256,
-            embeddings=embeddings,
-            tag_dictionary=label_dict,
-            tag_type="ner",
-            use_rnn=False,
-            use_crf=False,
-            reproject_embeddings=False
+    if frozen_encoder:
+        embeddings: TokenEmbeddings = _get_cached_feature_embeddings(
+            pretrained_model_path if use_pretrained_model else transformer_model_name, 
+            use_context, 
+            use_pretrained_model, 
+            corpus.get_all_sentences(), 
+            feature_cache_dir, 
+            mini_batch_size=eval_batch_size, 
+            embeddings_cache=embeddings_cache
         )
     else:
-        embeddings: TokenEmbeddings = TransformerWordEmbeddings(
-            model=transformer_model_name,
-            use_context=use_context,
-            fine_tune=True
+        embeddings: TokenEmbeddings = _get_embeddings(
+            pretrained_model_path if use_pretrained_model else transformer_model_name, 
+            use_context, 
+            use_pretrained_model, 
+            embeddings_cache=embeddings_cache
         )
 
-        tagger: SequenceTagger = SequenceTagger(
-            hidden_size = 256,
-            embeddings=embeddings,
-            tag_dictionary=label_dict,
-            tag_type="ner",
-            use_rnn=False,
-            use_crf=False,
-            reproject_embeddings=False
-        )
+    tagger: SequenceTagger = SequenceTagger(
+        hidden_size=256,
+        embeddings=embeddings,
+        tag_dictionary=label_dict,
+        tag_type="ner",
+        use_rnn=use_rnn,
+        use_crf=use_crf,
+        reproject_embeddings=False
+    )
     
     tagger.label_dictionary.add_unk = True
 
-    trainer: ModelTrainer = ModelTrainer(tagger, corpus)
+    subword_tokenization_cache = None
+    if use_subword_cache and not frozen_encoder:
+        subword_tokenization_cache = SubwordTokenizationCache(subword_cache_dir, embeddings.tokenizer)
+        added_word_count = subword_tokenization_cache.add_words(
+            token.text for sentence in corpus.get_all_sentences() for token in sentence
+        )
+        subword_tokenization_cache.save()
+        print(f"subword tokenization cache: {len(subword_tokenization_cache)} words, {added_word_count} added")
+        embeddings.tokenizer = CachedSubwordTokenizer(embeddings.tokenizer, subword_tokenization_cache)
+
+    if frozen_encoder:
+        # the head processes every token once, without subwords and context
+        get_sentence_length = len
+    else:
+        subword_tokenizer = embeddings.tokenizer
+        get_token_subword_count = functools.lru_cache(maxsize=None)(lambda token_text: len(subword_tokenizer.tokenize(token_text)))
+        get_sentence_length = functools.lru_cache(maxsize=None)(
+            lambda sentence: get_sentence_subword_length(sentence, get_token_subword_count, embeddings.context_length)
+        )
+    trainer: ModelTrainer = TokenBudgetModelTrainer(
+        tagger, 
+        corpus, 
+        get_sentence_length, 
+        max_batch_tokens=max_batch_tokens if batching_mode == "token_budget" and gradient_accumulation else None
+    )
+    sampler = LengthBucketSampler(get_sentence_length, mini_batch_size) if batching_mode == "token_budget" else None
 
     wandb_plugin = None
     if log_to_wandb:
@@ -210,8 +512,22 @@ def fine_tune():
         wandb_config["data_fold"] = data_fold_k_value
         wandb_config["learning_rate"] = learning_rate
         wandb_config["max_epochs"] = max_epochs
+        wandb_config["eval_every_n_epochs"] = eval_every_n_epochs
+        wandb_config["async_eval"] = async_eval
+        wandb_config["use_checkpoint_store"] = use_checkpoint_store
         wandb_config["mini_batch_size"] = mini_batch_size
+        wandb_config["batching_mode"] = batching_mode
+        if batching_mode == "token_budget":
+            wandb_config["max_batch_tokens"] = max_batch_tokens
+            wandb_config["gradient_accumulation"] = gradient_accumulation
         wandb_config["use_context"] = use_context
+        wandb_config["frozen_encoder"] = frozen_encoder
+        wandb_config["use_rnn"] = use_rnn
+        wandb_config["use_crf"] = use_crf
+        wandb_config["in_memory_corpus"] = in_memory_corpus
+        wandb_config["chunking_mode"] = chunking_mode
+        if chunking_mode == "subword_budget":
+            wandb_config["max_subword_count"] = max_subword_count
         wandb_config["sample_size"] = sample_size
         wandb_config["fold_stats"] = fold_stats
 
@@ -221,6 +537,8 @@ def fine_tune():
             config = wandb_config,
             tracked = {
                 "train/loss", 
+                "train/padding_ratio", 
+                "train/tokens_per_second", 
                 "dev/loss", 
                 "test/loss", 
                 "dev/micro avg/precision", 
@@ -236,22 +554,100 @@ def fine_tune():
                 "test/macro avg/precision", 
                 "test/macro avg/recall", 
                 "test/macro avg/f1-score", 
-                "test/accuracy"
-            }
+                "test/accuracy", 
+                "best_model_saved"
+            } | ({f"telemetry/{name}" for name in TelemetryPlugin.epoch_metric_names} if telemetry else set()), 
+            buffered = wandb_buffered, 
+            flush_interval = wandb_flush_interval, 
+            fallback_log_path = model_dir_path / "wandb_fallback_metrics.jsonl"
+        )
+
+    telemetry_plugin = None
+    if telemetry:
+        telemetry_plugin = TelemetryPlugin(
+            model_dir_path / "telemetry.jsonl", 
+            get_sentence_length = get_sentence_length, 
+            run_info = {
+                "model_dir_name": model_dir_name, 
+                "data_fold": data_fold_k_value, 
+                "sample_size": sample_size, 
+                "learning_rate": learning_rate, 
+                "mini_batch_size": mini_batch_size, 
+                "batching_mode": batching_mode, 
+                "chunking_mode": chunking_mode
+            }, 
+            log_batches = telemetry_log_batches, 
+            record_metrics = log_to_wandb, 
+            synchronize_batches = telemetry_synchronize_batches
+        )
+
+    evaluation_cadence_plugin = None
+    if eval_every_n_epochs > 1 or async_eval:
+        evaluation_cadence_plugin = EvaluationCadencePlugin(
+            eval_every_n_epochs = eval_every_n_epochs, 
+            asynchronous = async_eval, 
+            num_threads = async_eval_num_threads
+        )
+
+    checkpoint_store = None
+    checkpoint_store_plugin = None
+    if use_checkpoint_store:
+        checkpoint_store = CheckpointStore(checkpoint_store_dir)
+        checkpoint_store_plugin = CheckpointStorePlugin(
+            checkpoint_store, 
+            model_dir_path.relative_to(model_checkpoints_root_dir).as_posix(), 
+            export_best_model = export_best_model
+        )
+
+    training_state_plugin = None
+    if save_training_state:
+        training_state_plugin = TrainingStatePlugin(
+            model_dir_path / "training-state.pt", 
+            save_every_n_epochs = save_training_state_every_n_epochs, 
+            save_every_n_batches = save_training_state_every_n_batches, 
+            resume = resume_training
         )
 
-    trainer.fine_tune(
+    return_values = trainer.fine_tune(
         model_dir_path, 
         learning_rate = learning_rate, 
         max_epochs = max_epochs, 
         mini_batch_size = mini_batch_size, 
-        eval_batch_size = mini_batch_size, 
+        eval_batch_size = eval_batch_size, 
         write_weights = True, 
-        monitor_test = True, 
+        monitor_test = monitor_test, 
         save_final_model = False, 
         use_final_model_for_eval = False, 
-        plugins = [wandb_plugin] if log_to_wandb else None
+        sampler = sampler, 
+        epoch = training_state_plugin.completed_epochs if save_training_state else 0, 
+        # the training state plugin has to follow the telemetry and checkpoint store plugins, see TrainingStatePlugin
+        plugins = [BatchingStatsPlugin(), MetricHistoryPlugin()] + 
+                  ([evaluation_cadence_plugin] if evaluation_cadence_plugin else []) + 
+                  ([telemetry_plugin] if telemetry else []) + 
+                  ([checkpoint_store_plugin] if use_checkpoint_store else []) + 
+                  ([training_state_plugin] if save_training_state else []) + 
+                  ([wandb_plugin] if log_to_wandb else [])
     )
 
+    if use_checkpoint_store:
+        checkpoint_store.close()
+        print(
+            f"checkpoint store: {checkpoint_store.written_bytes / 2 ** 20:.1f} MiB written, "
+            f"{checkpoint_store.deduplicated_bytes / 2 ** 20:.1f} MiB deduplicated, "
+            f"{checkpoint_store.removed_bytes / 2 ** 20:.1f} MiB of replaced checkpoints removed"
+        )
+
+    if subword_tokenization_cache is not None:
+        subword_tokenization_cache.save()
+
+    return {
+        "model_dir_name": model_dir_name,
+        "sample_size": sample_size,
+        "data_fold_k_value": data_fold_k_value,
+        "model_dir_path": model_dir_path,
+        "test_score": return_values["test_score"],
+        "dev_score_history": [score for score in return_values["dev_score_history"] if math.isfinite(score)]
+    }
+
 if __name__ == "__main__":
     fine_tune()
\ No newline at end of file
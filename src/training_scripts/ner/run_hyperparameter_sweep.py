@@ -0,0 +1,230 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from training_scripts.ner.fine_tune_sequence_tagger_with_transformer_model import fine_tune
+from typing import Any, Dict, List, Tuple
+from utils.environment_utils import EnvironmentUtils
+from utils.project_utils import ProjectUtils
+
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import statistics
+import torch
+
+_data_handler: GrasccoDataHandler = None
+_embeddings_cache: Dict = None
+
+
+def _init_worker(num_threads: int = None) -> None:
+    """
+    Initialize the data handler and the embeddings cache shared by all trials of this process.
+    :param num_threads: Number of torch threads of this process, None to keep the default.
+    """
+    global _data_handler, _embeddings_cache
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+    _data_handler = GrasccoDataHandler(ProjectUtils.get_project_root(), data_dir=data_dir)
+    _embeddings_cache = dict()
+
+
+def _run_trial(config: Dict[str, str], data_fold_k_value: int, max_epochs: int, sweep_name: str) -> Dict[str, Any]:
+    """
+    Fine-tune one config on one data fold with an epoch budget, in a model directory of its own.
+    :param config: The environment variable overrides of the config.
+    :param data_fold_k_value: The data fold number.
+    :param max_epochs: The epoch budget.
+    :param sweep_name: The name of the sweep.
+    :return: Dictionary with the best dev_score, the test_score and the model_dir_path of the trial.
+    """
+    # configs may differ in settings that are not part of the model directory path, or only in the rounding
+    # of the learning rate in it, so every trial is named by the hash of its key
+    trial_hash = hashlib.sha256(_get_trial_key(config, data_fold_k_value, max_epochs).encode("utf-8")).hexdigest()
+    with EnvironmentUtils.override_environ({
+        **config,
+        "DATA_FOLD_K_VALUE": str(data_fold_k_value),
+        "MAX_EPOCHS": str(max_epochs),
+        "RUN_NAME": f"{sweep_name}-{trial_hash[:16]}"
+    }):
+        result = fine_tune(data_handler=_data_handler, embeddings_cache=_embeddings_cache)
+    return {
+        "dev_score": max(result["dev_score_history"], default=0.0),
+        "test_score": result["test_score"],
+        "model_dir_path": str(result["model_dir_path"])
+    }
+
+
+def _get_trial_key(config: Dict[str, str], data_fold_k_value: int, max_epochs: int) -> str:
+    """
+    Get the key of a trial in the sweep state.
+    :param config: The environment variable overrides of the config.
+    :param data_fold_k_value: The data fold number.
+    :param max_epochs: The epoch budget.
+    :return: The trial key.
+    """
+    return json.dumps({"config": config, "data_fold_k_value": data_fold_k_value, "max_epochs": max_epochs}, sort_keys=True)
+
+
+def _save_sweep_state(sweep_state_path: Path, sweep_state: Dict[str, Any]) -> None:
+    """
+    Write the sweep state atomically, so an interrupted sweep never leaves a partial state file.
+    :param sweep_state_path: Path to the sweep state JSON file.
+    :param sweep_state: The sweep state.
+    """
+    sweep_state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = sweep_state_path.with_name(f"{sweep_state_path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as writer:
+        json.dump(sweep_state, writer, indent=2)
+    os.replace(tmp_path, sweep_state_path)
+
+
+def get_rung_epochs(min_epochs: int, max_epochs: int, reduction_factor: int) -> List[int]:
+    """
+    Get the epoch budgets of the successive halving rungs, growing by the reduction factor from min_epochs up to max_epochs.
+    :param min_epochs: The epoch budget of the first rung.
+    :param max_epochs: The epoch budget of the last rung.
+    :param reduction_factor: The factor the budget grows and the number of configs shrinks by per rung.
+    :return: The epoch budget of every rung.
+    """
+    if min_epochs < 1 or max_epochs < min_epochs or reduction_factor < 2:
+        raise ValueError("Expected 1 <= MIN_EPOCHS <= MAX_EPOCHS and REDUCTION_FACTOR >= 2.")
+    rung_epochs: List[int] = [min_epochs]
+    while rung_epochs[-1] < max_epochs:
+        rung_epochs.append(min(rung_epochs[-1] * reduction_factor, max_epochs))
+    return rung_epochs
+
+
+def run_hyperparameter_sweep():
+    """
+    Sweep fine-tuning configs with successive halving: every rung trains the remaining configs on all data folds
+    with the epoch budget of the rung, ranks them by their dev micro-F1 averaged over the folds and promotes
+    the best 1 / REDUCTION_FACTOR of them to the next rung with a budget REDUCTION_FACTOR times larger.
+    The configs are the grid of SWEEP_LEARNING_RATES, SWEEP_MINI_BATCH_SIZES and the environment variable overrides
+    of SWEEP_CONFIGS, all other settings are read by fine_tune from the environment variables.
+    The trials run in MAX_WORKERS worker processes, each in its own model directory, and every finished trial is stored
+    in the sweep state file, a restarted sweep skips the stored trials.
+    """
+
+    model_checkpoints_root_dir = os.environ.get("MODEL_CHECKPOINTS_ROOT_DIR", None)
+    model_checkpoints_root_dir = Path(model_checkpoints_root_dir) if model_checkpoints_root_dir else Path.home() / "model_checkpoints"
+
+    sweep_name = os.environ.get("SWEEP_NAME", None)
+    sweep_name = sweep_name if sweep_name else "sweep"
+
+    sweep_state_path = os.environ.get("SWEEP_STATE_PATH", None)
+    sweep_state_path = Path(sweep_state_path) if sweep_state_path else model_checkpoints_root_dir / "grascco" / "ner" / "sweeps" / f"{sweep_name}.json"
+
+    learning_rates = os.environ.get("SWEEP_LEARNING_RATES", None)
+    learning_rates = [float(value) for value in learning_rates.split(",")] if learning_rates else [5e-5]
+
+    mini_batch_sizes = os.environ.get("SWEEP_MINI_BATCH_SIZES", None)
+    mini_batch_sizes = [int(value) for value in mini_batch_sizes.split(",")] if mini_batch_sizes else [1]
+
+    sweep_configs = os.environ.get("SWEEP_CONFIGS", None)
+    sweep_configs = json.loads(sweep_configs) if sweep_configs else [dict()]
+    if not isinstance(sweep_configs, list) or not all(isinstance(config, dict) for config in sweep_configs):
+        raise ValueError("'SWEEP_CONFIGS' must be a JSON list of objects of environment variable overrides.")
+
+    data_fold_k_values = os.environ.get("DATA_FOLD_K_VALUES", None)
+    data_fold_k_values = [int(value) for value in data_fold_k_values.split(",")] if data_fold_k_values else [1]
+
+    min_epochs = os.environ.get("MIN_EPOCHS", None)
+    min_epochs = int(min_epochs) if min_epochs else 5
+
+    max_epochs = os.environ.get("MAX_EPOCHS", None)
+    max_epochs = int(max_epochs) if max_epochs else 35
+
+    reduction_factor = os.environ.get("REDUCTION_FACTOR", None)
+    reduction_factor = int(reduction_factor) if reduction_factor else 2
+
+    max_workers = os.environ.get("MAX_WORKERS", None)
+    max_workers = int(max_workers) if max_workers else 1
+
+    rung_epochs = get_rung_epochs(min_epochs, max_epochs, reduction_factor)
+
+    print(f"sweep_state_path: {sweep_state_path}")
+    print(f"learning_rates: {learning_rates}")
+    print(f"mini_batch_sizes: {mini_batch_sizes}")
+    print(f"sweep_configs: {sweep_configs}")
+    print(f"data_fold_k_values: {data_fold_k_values}")
+    print(f"rung_epochs: {rung_epochs}")
+    print(f"reduction_factor: {reduction_factor}")
+    print(f"max_workers: {max_workers}")
+
+    configs: List[Dict[str, str]] = [
+        {
+            **{name: str(value) for name, value in sweep_config.items()},
+            "LEARNING_RATE": str(learning_rate),
+            "MINI_BATCH_SIZE": str(mini_batch_size)
+        }
+        for learning_rate, mini_batch_size, sweep_config in itertools.product(learning_rates, mini_batch_sizes, sweep_configs)
+    ]
+
+    sweep_state: Dict[str, Any] = {"trials": dict(), "rungs": list()}
+    if sweep_state_path.exists():
+        with sweep_state_path.open("r", encoding="utf-8") as reader:
+            sweep_state["trials"] = json.load(reader)["trials"]
+        print(f"resuming sweep with {len(sweep_state['trials'])} finished trials")
+
+    executor = None
+    if max_workers > 1:
+        num_threads = max(1, torch.get_num_threads() // max_workers)
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(num_threads,)
+        )
+    else:
+        _init_worker()
+
+    try:
+        for rung_index, epochs in enumerate(rung_epochs):
+            trials: List[Tuple[Dict[str, str], int, int]] = [
+                (config, data_fold_k_value, epochs)
+                for config in configs for data_fold_k_value in data_fold_k_values
+                if _get_trial_key(config, data_fold_k_value, epochs) not in sweep_state["trials"]
+            ]
+            print(f"rung {rung_index}: {len(configs)} configs with {epochs} epochs, {len(trials)} trials to run")
+
+            if executor:
+                futures = {executor.submit(_run_trial, *trial, sweep_name): trial for trial in trials}
+                finished_trials = ((futures[future], future.result()) for future in as_completed(futures))
+            else:
+                finished_trials = ((trial, _run_trial(*trial, sweep_name)) for trial in trials)
+            for trial, trial_result in finished_trials:
+                sweep_state["trials"][_get_trial_key(*trial)] = trial_result
+                _save_sweep_state(sweep_state_path, sweep_state)
+
+            config_scores: List[Tuple[Dict[str, str], float]] = [
+                (config, statistics.mean(
+                    sweep_state["trials"][_get_trial_key(config, data_fold_k_value, epochs)]["dev_score"]
+                    for data_fold_k_value in data_fold_k_values
+                ))
+                for config in configs
+            ]
+            config_scores.sort(key=lambda config_score: config_score[1], reverse=True)
+            for config, dev_score in config_scores:
+                print(f"rung {rung_index} - dev micro-F1 {dev_score:.4f} - {config}")
+            sweep_state["rungs"] = sweep_state["rungs"][:rung_index] + [
+                {"max_epochs": epochs, "dev_scores": [{"config": config, "dev_score": dev_score} for config, dev_score in config_scores]}
+            ]
+            _save_sweep_state(sweep_state_path, sweep_state)
+
+            configs = [config for config, _ in config_scores[:max(1, len(config_scores) // reduction_factor)]]
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    print(f"best config: {config_scores[0][0]} - dev micro-F1 {config_scores[0][1]:.4f} with {rung_epochs[-1]} epochs")
+
+
+if __name__ == "__main__":
+    run_hyperparameter_sweep()
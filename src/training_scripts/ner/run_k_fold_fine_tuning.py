@@ -0,0 +1,125 @@
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from concurrent.futures import ProcessPoolExecutor
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from training_scripts.ner.fine_tune_sequence_tagger_with_transformer_model import fine_tune
+from typing import Any, Dict, List, Tuple
+from utils.environment_utils import EnvironmentUtils
+from utils.project_utils import ProjectUtils
+from utils.report_utils import ReportUtils
+
+import json
+import multiprocessing
+import os
+import statistics
+import torch
+
+
+def _run_fine_tune_jobs(jobs: List[Tuple[str, Dict[str, str], int]],
+                        metrics_dir: Path,
+                        num_threads: int = None) -> List[Dict[str, Any]]:
+    """
+    Run fine-tuning jobs one after another in this process, sharing the data handler and the loaded transformer embeddings,
+    and write the test report of every job to the metrics directory.
+    :param jobs: Tuples of the metrics model name (None for the model directory name), the environment variable overrides
+                 of the config and the data fold number.
+    :param metrics_dir: The root directory of the classification report text files.
+    :param num_threads: Number of torch threads of this process, None to keep the default.
+    :return: The results of the jobs, see fine_tune, with the metrics_file_path.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    data_dir = os.environ.get("DATA_DIR", None)
+    data_dir = Path(data_dir) if data_dir else None
+    data_handler = GrasccoDataHandler(ProjectUtils.get_project_root(), data_dir=data_dir)
+    embeddings_cache = dict()
+
+    results: List[Dict[str, Any]] = list()
+    for metrics_model_name, config, data_fold_k_value in jobs:
+        with EnvironmentUtils.override_environ({**config, "DATA_FOLD_K_VALUE": str(data_fold_k_value)}):
+            result = fine_tune(data_handler=data_handler, embeddings_cache=embeddings_cache)
+        result["metrics_file_path"] = ReportUtils.write_test_report(
+            metrics_dir,
+            metrics_model_name if metrics_model_name else result["model_dir_name"],
+            result["sample_size"],
+            data_fold_k_value,
+            result["model_dir_path"] / "training.log"
+        )
+        print(f"test report of data fold {data_fold_k_value} written to: {result['metrics_file_path']}")
+        results.append(result)
+    return results
+
+
+def run_k_fold_fine_tuning():
+    """
+    Fine-tune sequence taggers on several data folds and configs in one process, or in a local pool of worker processes,
+    each loading the dataset and the base transformer weights once and building a new tagger head per fold.
+    Every run is configured like fine_tune by the environment variables, overridden per config by FINE_TUNE_CONFIGS,
+    and writes its test report to <METRICS_DIR>/<model name>/<sample size>-K<fold>.txt. Several configs run
+    in their own model directories, named by the RUN_NAME of fine_tune after their METRICS_MODEL_NAME.
+    """
+
+    data_fold_k_values = os.environ.get("DATA_FOLD_K_VALUES", None)
+    data_fold_k_values = [int(value) for value in data_fold_k_values.split(",")] if data_fold_k_values else [1, 2, 3, 4, 5]
+
+    fine_tune_configs = os.environ.get("FINE_TUNE_CONFIGS", None)
+    fine_tune_configs = json.loads(fine_tune_configs) if fine_tune_configs else [dict()]
+    if not isinstance(fine_tune_configs, list) or not all(isinstance(config, dict) for config in fine_tune_configs):
+        raise ValueError("'FINE_TUNE_CONFIGS' must be a JSON list of objects of environment variable overrides.")
+
+    max_workers = os.environ.get("MAX_WORKERS", None)
+    max_workers = int(max_workers) if max_workers else 1
+
+    metrics_dir = os.environ.get("METRICS_DIR", None)
+    metrics_dir = Path(metrics_dir) if metrics_dir else ProjectUtils.get_project_root() / "metrics" / "ner_performance"
+
+    print(f"data_fold_k_values: {data_fold_k_values}")
+    print(f"fine_tune_configs: {fine_tune_configs}")
+    print(f"max_workers: {max_workers}")
+    print(f"metrics_dir: {metrics_dir}")
+
+    jobs: List[Tuple[str, Dict[str, str], int]] = list()
+    metrics_model_names = set()
+    for config_index, config in enumerate(fine_tune_configs, 1):
+        config = {name: str(value) for name, value in config.items()}
+        metrics_model_name = config.pop("METRICS_MODEL_NAME", None)
+        if len(fine_tune_configs) > 1:
+            if not metrics_model_name:
+                raise ValueError(f"Config {config_index} of several 'FINE_TUNE_CONFIGS' needs a 'METRICS_MODEL_NAME'.")
+            if metrics_model_name in metrics_model_names:
+                raise ValueError(f"Config {config_index} of 'FINE_TUNE_CONFIGS' repeats the 'METRICS_MODEL_NAME' '{metrics_model_name}'.")
+            metrics_model_names.add(metrics_model_name)
+            # configs may differ only in settings that are not part of the model directory path
+            config.setdefault("RUN_NAME", metrics_model_name.replace("/", "--"))
+        jobs.extend((metrics_model_name, config, data_fold_k_value) for data_fold_k_value in data_fold_k_values)
+
+    if max_workers > 1:
+        # every worker takes a share of the jobs, so it loads the dataset and the base weights only once
+        worker_count = min(max_workers, len(jobs))
+        num_threads = max(1, torch.get_num_threads() // worker_count)
+        with ProcessPoolExecutor(max_workers=worker_count, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_run_fine_tune_jobs, jobs[worker_index::worker_count], metrics_dir, num_threads)
+                for worker_index in range(worker_count)
+            ]
+            results = [result for future in futures for result in future.result()]
+    else:
+        results = _run_fine_tune_jobs(jobs, metrics_dir)
+
+    metrics_file_paths: Dict[str, List[Path]] = dict()
+    for result in results:
+        print(f"{result['metrics_file_path']}: test score {result['test_score']:.4f}")
+        metrics_file_paths.setdefault(result["metrics_file_path"].parent.name, list()).append(result["metrics_file_path"])
+    for model_name, paths in metrics_file_paths.items():
+        f1_scores = [ReportUtils.get_classification_report_dict(path)["micro avg"]["f1-score"] for path in paths]
+        print(
+            f"{model_name}: micro avg f1-score {statistics.mean(f1_scores):.4f}"
+            f" ± {statistics.pstdev(f1_scores):.4f} over {len(f1_scores)} folds"
+        )
+
+
+if __name__ == "__main__":
+    run_k_fold_fine_tuning()
@@ -0,0 +1,287 @@
+from pathlib import Path
+from transformers import BatchEncoding, PreTrainedTokenizerBase
+from transformers.utils import PaddingStrategy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import hashlib
+import json
+import numpy as np
+import os
+import torch
+import transformers
+
+
+class SubwordTokenizationCache:
+    """
+    Persistent cache of the subword ids of pretokenized words for one tokenizer.
+    Flair passes every sentence, expanded by its FLERT context, as pretokenized words to the tokenizer,
+    whose subwords are the concatenation of the subwords of each word. The cache therefore stores the subword ids
+    per distinct word, so the entries are shared by all sentences, context windows, folds and runs.
+
+    The subword ids of all words are stored concatenated in subword_ids.npy and the word-to-subword alignment
+    as offsets into them in word_offsets.npy, both memory-mapped when the cache is loaded, the words themselves
+    in words.json. The cache directory is keyed by the tokenizer name and a fingerprint of its class,
+    its configuration and vocabulary and the transformers version, so a changed tokenizer never reads stale entries.
+    """
+
+    def __init__(self, cache_root_dir: Path, tokenizer: PreTrainedTokenizerBase):
+        """
+        Initialize the cache of a tokenizer and load its persisted entries, if any.
+        :param cache_root_dir: Root directory of the caches of all tokenizers.
+        :param tokenizer: The tokenizer whose subword ids are cached.
+        """
+        self.tokenizer: PreTrainedTokenizerBase = tokenizer
+        tokenizer_name = str(getattr(tokenizer, "name_or_path", "") or type(tokenizer).__name__)
+        self.cache_dir: Path = (
+            cache_root_dir / f"{tokenizer_name.strip('/').replace('/', '--')}--{self.get_tokenizer_fingerprint(tokenizer)[:16]}"
+        )
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._word_indices: Dict[str, int] = dict()
+        self._subword_ids: np.ndarray = np.zeros(0, dtype=np.int32)
+        self._word_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self._new_words: List[str] = list()
+        self._new_word_subword_ids: List[np.ndarray] = list()
+        # subword ids of the words looked up so far, so every word is read from the arrays only once
+        self._word_subword_ids: Dict[str, List[int]] = dict()
+        self._load()
+
+    @staticmethod
+    def get_tokenizer_fingerprint(tokenizer: PreTrainedTokenizerBase) -> str:
+        """
+        Fingerprint of everything that determines the subword ids of a word.
+        :param tokenizer: The tokenizer.
+        :return: Hex digest of the tokenizer class, transformers version and tokenizer configuration and vocabulary.
+        """
+        if getattr(tokenizer, "is_fast", False):
+            # the backend keeps the truncation and padding of the last call, which do not change the subwords of a word
+            tokenizer_state = json.loads(tokenizer.backend_tokenizer.to_str())
+            tokenizer_state = json.dumps({key: value for key, value in tokenizer_state.items() if key not in ["truncation", "padding"]}, sort_keys=True)
+        else:
+            tokenizer_state = json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False)
+        fingerprint = hashlib.sha256()
+        for part in [type(tokenizer).__name__, transformers.__version__, json.dumps(tokenizer.init_kwargs, default=str, sort_keys=True), tokenizer_state]:
+            fingerprint.update(part.encode("utf-8"))
+        return fingerprint.hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._word_indices)
+
+    def _load(self) -> None:
+        """
+        Load the persisted entries of the cache directory with memory-mapped subword ids and word offsets.
+        """
+        words_file = self.cache_dir / "words.json"
+        if not words_file.exists():
+            return
+        with words_file.open("r", encoding="utf-8") as f:
+            words: List[str] = json.load(f)
+        self._subword_ids = np.load(self.cache_dir / "subword_ids.npy", mmap_mode="r")
+        self._word_offsets = np.load(self.cache_dir / "word_offsets.npy", mmap_mode="r")
+        self._word_indices = {word: index for index, word in enumerate(words)}
+
+    def save(self) -> None:
+        """
+        Persist the cache, if words were added since it was loaded. The files are replaced atomically,
+        so concurrent runs never read a partially written cache, the last writer wins.
+        """
+        if not self._new_words:
+            return
+        persisted_word_count = len(self._word_offsets) - 1
+        words = [None] * len(self._word_indices)
+        for word, index in self._word_indices.items():
+            words[index] = word
+        new_subword_counts = np.array([len(subword_ids) for subword_ids in self._new_word_subword_ids], dtype=np.int64)
+        subword_ids = np.concatenate([np.asarray(self._subword_ids)] + self._new_word_subword_ids).astype(np.int32)
+        word_offsets = np.concatenate([np.asarray(self._word_offsets), self._word_offsets[-1] + np.cumsum(new_subword_counts)])
+        assert len(word_offsets) == persisted_word_count + len(self._new_words) + 1
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        for file_name, array in [("subword_ids.npy", subword_ids), ("word_offsets.npy", word_offsets)]:
+            with (self.cache_dir / f"{file_name}{suffix}").open("wb") as f:
+                np.save(f, array, allow_pickle=False)
+        with (self.cache_dir / f"words.json{suffix}").open("w", encoding="utf-8") as f:
+            json.dump(words, f, ensure_ascii=False)
+        # words.json is replaced last, a reader never sees more words than offsets
+        for file_name in ["subword_ids.npy", "word_offsets.npy", "words.json"]:
+            os.replace(self.cache_dir / f"{file_name}{suffix}", self.cache_dir / file_name)
+
+        self._new_words, self._new_word_subword_ids = list(), list()
+        self._load()
+
+    def add_words(self, words: Iterable[str]) -> int:
+        """
+        Tokenize and add the words that are not cached yet, in one batch.
+        :param words: The words to add.
+        :return: Number of added words.
+        """
+        missing_words = list(dict.fromkeys(word for word in words if word not in self._word_indices))
+        if not missing_words:
+            return 0
+        encoding = self.tokenizer([[word] for word in missing_words], is_split_into_words=True, add_special_tokens=False)
+        for word, subword_ids in zip(missing_words, encoding["input_ids"]):
+            self._word_indices[word] = len(self._word_indices)
+            self._new_words.append(word)
+            self._new_word_subword_ids.append(np.asarray(subword_ids, dtype=np.int32))
+        self.misses += len(missing_words)
+        return len(missing_words)
+
+    def get_subword_ids(self, words: List[str]) -> Tuple[List[int], List[int]]:
+        """
+        Get the subword ids of a pretokenized word sequence, adding missing words to the cache.
+        :param words: The pretokenized words.
+        :return: The subword ids without special tokens and the index of the word of every subword.
+        """
+        self.hits += len(words) - self.add_words(words)
+        subword_ids: List[int] = list()
+        word_ids: List[int] = list()
+        for word_index, word in enumerate(words):
+            word_subword_ids = self._word_subword_ids.get(word)
+            if word_subword_ids is None:
+                word_subword_ids = self._get_word_subword_ids(word)
+                self._word_subword_ids[word] = word_subword_ids
+            subword_ids.extend(word_subword_ids)
+            word_ids.extend([word_index] * len(word_subword_ids))
+        return subword_ids, word_ids
+
+
+    def _get_word_subword_ids(self, word: str) -> List[int]:
+        """
+        Read the subword ids of a cached word from the memory-mapped or the newly added subword ids.
+        :param word: The cached word.
+        :return: Its subword ids.
+        """
+        index = self._word_indices[word]
+        persisted_word_count = len(self._word_offsets) - 1
+        if index < persisted_word_count:
+            return self._subword_ids[self._word_offsets[index]: self._word_offsets[index + 1]].tolist()
+        return self._new_word_subword_ids[index - persisted_word_count].tolist()
+
+
+class _CachedBatchEncoding(BatchEncoding):
+    """
+    BatchEncoding built from cached subword ids, which provides the word ids of a fast tokenizer encoding.
+    """
+
+    def __init__(self, data: Dict[str, Any], word_ids: List[List[Optional[int]]]):
+        super().__init__(data, tensor_type="pt")
+        self._cached_word_ids: List[List[Optional[int]]] = word_ids
+
+    def word_ids(self, batch_index: int = 0) -> List[Optional[int]]:
+        return self._cached_word_ids[batch_index]
+
+
+class CachedSubwordTokenizer:
+    """
+    Drop-in replacement for the tokenizer of Flair TransformerEmbeddings that builds the model inputs
+    from a SubwordTokenizationCache instead of retokenizing the sentences of every batch.
+    It reproduces the special tokens, truncation, overflowing windows with stride and padding of the wrapped tokenizer
+    for pretokenized input returned as PyTorch tensors, other calls and all attributes are passed to the wrapped tokenizer.
+    Pickling it pickles the wrapped tokenizer.
+    """
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, cache: SubwordTokenizationCache):
+        """
+        :param tokenizer: The tokenizer to wrap.
+        :param cache: The subword tokenization cache of the tokenizer.
+        """
+        self.tokenizer: PreTrainedTokenizerBase = tokenizer
+        self.cache: SubwordTokenizationCache = cache
+        # the position of a marker id tells the special tokens before and after a single sequence
+        marked_ids = tokenizer.build_inputs_with_special_tokens([-1])
+        marker_index = marked_ids.index(-1)
+        self._prefix_ids: List[int] = marked_ids[:marker_index]
+        self._suffix_ids: List[int] = marked_ids[marker_index + 1:]
+
+    def __getattr__(self, name: str) -> Any:
+        if "tokenizer" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.__dict__["tokenizer"], name)
+
+    def __reduce__(self):
+        return _unwrap_tokenizer, (self.tokenizer,)
+
+    def __call__(self,
+                 text: Any,
+                 stride: int = 0,
+                 return_overflowing_tokens: bool = False,
+                 truncation: Any = False,
+                 padding: Any = False,
+                 return_tensors: Any = None,
+                 is_split_into_words: bool = False,
+                 **kwargs) -> BatchEncoding:
+        padding_strategy = PaddingStrategy.LONGEST if padding is True else PaddingStrategy(padding or "do_not_pad")
+        if (kwargs or not is_split_into_words or return_tensors != "pt" or not isinstance(text, list)
+                or padding_strategy == PaddingStrategy.DO_NOT_PAD or truncation not in [True, False, "longest_first"]):
+            return self.tokenizer(
+                text,
+                stride=stride,
+                return_overflowing_tokens=return_overflowing_tokens,
+                truncation=truncation,
+                padding=padding,
+                return_tensors=return_tensors,
+                is_split_into_words=is_split_into_words,
+                **kwargs
+            )
+
+        max_window_length = self.tokenizer.model_max_length - len(self._prefix_ids) - len(self._suffix_ids)
+        sequences: List[List[int]] = list()
+        sequence_word_ids: List[List[Optional[int]]] = list()
+        overflow_to_sample_mapping: List[int] = list()
+        for sample_index, words in enumerate(text):
+            subword_ids, word_ids = self.cache.get_subword_ids(words)
+            window_starts = [0]
+            if truncation and len(subword_ids) > max_window_length:
+                if return_overflowing_tokens:
+                    window_step = max_window_length - stride
+                    while window_starts[-1] + max_window_length < len(subword_ids):
+                        window_starts.append(window_starts[-1] + window_step)
+                window_length = max_window_length
+            else:
+                window_length = len(subword_ids)
+            for window_start in window_starts:
+                window_stop = window_start + window_length
+                sequences.append(self._prefix_ids + subword_ids[window_start: window_stop] + self._suffix_ids)
+                sequence_word_ids.append(
+                    [None] * len(self._prefix_ids) + word_ids[window_start: window_stop] + [None] * len(self._suffix_ids)
+                )
+                overflow_to_sample_mapping.append(sample_index)
+
+        padded_length = (
+            self.tokenizer.model_max_length if padding_strategy == PaddingStrategy.MAX_LENGTH
+            else max(len(sequence) for sequence in sequences)
+        )
+        input_ids = torch.full((len(sequences), padded_length), self.tokenizer.pad_token_id or 0, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), padded_length), dtype=torch.long)
+        for index, sequence in enumerate(sequences):
+            positions = (
+                slice(padded_length - len(sequence), padded_length) if self.tokenizer.padding_side == "left"
+                else slice(0, len(sequence))
+            )
+            input_ids[index, positions] = torch.tensor(sequence, dtype=torch.long)
+            attention_mask[index, positions] = 1
+            padding_word_ids = [None] * (padded_length - len(sequence))
+            sequence_word_ids[index] = (
+                padding_word_ids + sequence_word_ids[index] if self.tokenizer.padding_side == "left"
+                else sequence_word_ids[index] + padding_word_ids
+            )
+
+        data: Dict[str, Any] = {"input_ids": input_ids}
+        if "token_type_ids" in self.tokenizer.model_input_names:
+            data["token_type_ids"] = torch.zeros_like(input_ids)
+        if "attention_mask" in self.tokenizer.model_input_names:
+            data["attention_mask"] = attention_mask
+        if return_overflowing_tokens:
+            data["overflow_to_sample_mapping"] = torch.tensor(overflow_to_sample_mapping, dtype=torch.long)
+        return _CachedBatchEncoding(data, sequence_word_ids)
+
+
+def _unwrap_tokenizer(tokenizer: PreTrainedTokenizerBase) -> PreTrainedTokenizerBase:
+    """
+    Unpickle a CachedSubwordTokenizer as the tokenizer it wraps.
+    :param tokenizer: The wrapped tokenizer.
+    :return: The same tokenizer.
+    """
+    return tokenizer
@@ -0,0 +1,224 @@
+from flair.data import Sentence
+from flair.trainers.plugins import BasePlugin, MetricRecord, TrainerPlugin
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from utils.benchmark_utils import BenchmarkUtils
+
+import flair
+import json
+import logging
+import time
+import torch
+
+log = logging.getLogger("flair")
+
+
+class TelemetryPlugin(TrainerPlugin):
+    """
+    A TrainerPlugin that measures the training throughput and resource usage and appends them to a JSON lines file:
+    one 'run' record with the run info, one 'epoch' record per epoch and optionally one 'batch' record per mini batch.
+    The epoch records hold the sentences and tokens per second, the forward, backward, optimizer and data loader wait
+    seconds per mini batch, the evaluation seconds, the peak RSS and the peak torch memory allocated on CUDA devices.
+    The epoch metrics can also be recorded as telemetry/<name> metrics, e.g. for the WandbLoggerPlugin.
+    On CUDA devices the epoch and evaluation timestamps synchronize the device, so the asynchronous kernels are counted
+    in the epoch they belong to. The per batch timestamps only synchronize it when the batches are logged or the
+    synchronization is asked for explicitly, since synchronizing several times per batch stops the CPU from queueing
+    the next kernels while the device is busy and slows down the training it measures. Without it, the forward,
+    backward and optimizer seconds are the time spent queueing the kernels of each phase.
+    """
+
+    epoch_metric_names = (
+        "sentences_per_second",
+        "tokens_per_second",
+        "forward_seconds_per_batch",
+        "backward_seconds_per_batch",
+        "optimizer_seconds_per_batch",
+        "data_wait_seconds_per_batch",
+        "train_seconds",
+        "evaluation_seconds",
+        "max_rss_bytes",
+        "torch_max_memory_allocated_bytes"
+    )
+
+    def __init__(self,
+                 telemetry_log_path: Path,
+                 get_sentence_length: Callable[[Sentence], int] = None,
+                 run_info: Dict[str, Any] = None,
+                 log_batches: bool = False,
+                 record_metrics: bool = False,
+                 synchronize_batches: bool = None):
+        """
+        :param telemetry_log_path: Path of the JSON lines file to append the telemetry records to.
+        :param get_sentence_length: Function returning the number of tokens of a sentence, e.g. its subword length,
+                                    the number of Flair tokens if None.
+        :param run_info: Optional dictionary describing the run, e.g. the model name, written in the 'run' record.
+        :param log_batches: Whether to write a 'batch' record per mini batch.
+        :param record_metrics: Whether to record the epoch metrics as telemetry/<name> metrics of the trainer.
+        :param synchronize_batches: Whether the per batch timestamps synchronize CUDA devices, defaults to log_batches.
+        """
+        super().__init__()
+        self.telemetry_log_path = Path(telemetry_log_path)
+        self.get_sentence_length = get_sentence_length
+        self.run_info = dict(run_info) if run_info is not None else dict()
+        self.log_batches = log_batches
+        self.record_metrics = record_metrics
+        self.synchronize_batches = log_batches if synchronize_batches is None else synchronize_batches
+        self._original_backward: Callable = None
+        self._epoch_stats: Dict[str, Any] = dict()
+        self._batch_stats: Dict[str, float] = dict()
+        self._epoch_start_time: float = None
+        self._batch_start_time: float = None
+        self._batch_end_time: float = None
+        self._optimizer_start_time: float = None
+        self._evaluation_start_time: float = None
+
+    @staticmethod
+    def _now(synchronize: bool = True) -> float:
+        """
+        Get the current time, on CUDA devices optionally after the queued CUDA kernels finished.
+        :param synchronize: Whether to synchronize CUDA devices first.
+        :return: The time in seconds.
+        """
+        if synchronize and flair.device.type == "cuda":
+            torch.cuda.synchronize(flair.device)
+        return time.perf_counter()
+
+    def _write_record(self, record: Dict[str, Any]) -> None:
+        """
+        Append a record to the telemetry log file.
+        :param record: The record.
+        """
+        with self.telemetry_log_path.open("a", encoding="utf-8") as writer:
+            writer.write(json.dumps(record) + "\n")
+
+    def _timed_backward(self, loss: torch.Tensor) -> None:
+        """
+        Call the backward method of the trainer and add its duration to the backward seconds of the batch.
+        :param loss: The loss to call backward on.
+        """
+        start = self._now(self.synchronize_batches)
+        self._original_backward(loss)
+        self._batch_stats["backward_seconds"] += self._now(self.synchronize_batches) - start
+
+    @BasePlugin.hook("after_setup")
+    def after_setup(self, **kw):
+        """
+        Writes the run record and wraps the backward method of the trainer to time it.
+        """
+        self.telemetry_log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_record({"type": "run", "time": time.time(), "device": str(flair.device), **self.run_info})
+        self._original_backward = self.trainer._backward
+        self.trainer._backward = self._timed_backward
+        if flair.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(flair.device)
+
+    @BasePlugin.hook("before_training_epoch")
+    def before_training_epoch(self, epoch=None):
+        """
+        Resets the epoch stats and starts the epoch timer.
+        :param epoch: The current epoch number.
+        """
+        self._epoch_stats = {
+            "batches": 0,
+            "sentences": 0,
+            "tokens": 0,
+            "forward_seconds": 0.0,
+            "backward_seconds": 0.0,
+            "optimizer_seconds": 0.0,
+            "data_wait_seconds": 0.0
+        }
+        self._epoch_start_time = self._now()
+        self._batch_end_time = self._epoch_start_time
+
+    @BasePlugin.hook("before_training_batch")
+    def before_training_batch(self, **kw):
+        """
+        Adds the data loader wait since the previous batch and starts the batch timer.
+        """
+        self._batch_start_time = self._now(self.synchronize_batches)
+        self._batch_stats = {"data_wait_seconds": self._batch_start_time - self._batch_end_time, "backward_seconds": 0.0}
+
+    @BasePlugin.hook("before_training_optimizer_step")
+    def before_training_optimizer_step(self, **kw):
+        """
+        Splits the forward and backward time of the batch and starts the optimizer timer.
+        """
+        self._optimizer_start_time = self._now(self.synchronize_batches)
+        forward_backward_seconds = self._optimizer_start_time - self._batch_start_time
+        self._batch_stats["forward_seconds"] = forward_backward_seconds - self._batch_stats["backward_seconds"]
+
+    @BasePlugin.hook("after_training_batch")
+    def after_training_batch(self, batch: List[Sentence] = None, batch_no: int = None, epoch: int = None, **kw):
+        """
+        Adds the optimizer time, the sentences and the tokens of the batch to the epoch stats.
+        :param batch: The sentences of the batch.
+        :param batch_no: The number of the batch in the epoch.
+        :param epoch: The current epoch number.
+        """
+        self._batch_stats["optimizer_seconds"] = self._now(self.synchronize_batches) - self._optimizer_start_time
+        sentences = len(batch)
+        tokens = sum(self.get_sentence_length(sentence) if self.get_sentence_length else len(sentence) for sentence in batch)
+        self._epoch_stats["batches"] += 1
+        self._epoch_stats["sentences"] += sentences
+        self._epoch_stats["tokens"] += tokens
+        for name, seconds in self._batch_stats.items():
+            self._epoch_stats[name] += seconds
+        if self.log_batches:
+            self._write_record({"type": "batch", "epoch": epoch, "batch": batch_no, "sentences": sentences, "tokens": tokens, **self._batch_stats})
+        self._batch_end_time = self._now(self.synchronize_batches)
+
+    @BasePlugin.hook("after_training_epoch")
+    def after_training_epoch(self, epoch=None):
+        """
+        Stops the epoch timer and starts the evaluation timer.
+        :param epoch: The current epoch number.
+        """
+        self._evaluation_start_time = self._now()
+        self._epoch_stats["train_seconds"] = self._evaluation_start_time - self._epoch_start_time
+
+    @BasePlugin.hook("after_evaluation")
+    def after_evaluation(self, epoch=None, **kw):
+        """
+        Stops the evaluation timer, writes the epoch record and records the epoch metrics.
+        :param epoch: The current epoch number.
+        """
+        stats = self._epoch_stats
+        batches = max(1, stats["batches"])
+        train_seconds = stats["train_seconds"]
+        epoch_record = {
+            "type": "epoch",
+            "epoch": epoch,
+            "batches": stats["batches"],
+            "sentences": stats["sentences"],
+            "tokens": stats["tokens"],
+            "sentences_per_second": stats["sentences"] / train_seconds if train_seconds > 0 else 0.0,
+            "tokens_per_second": stats["tokens"] / train_seconds if train_seconds > 0 else 0.0,
+            "forward_seconds_per_batch": stats["forward_seconds"] / batches,
+            "backward_seconds_per_batch": stats["backward_seconds"] / batches,
+            "optimizer_seconds_per_batch": stats["optimizer_seconds"] / batches,
+            "data_wait_seconds_per_batch": stats["data_wait_seconds"] / batches,
+            "train_seconds": train_seconds,
+            "evaluation_seconds": self._now() - self._evaluation_start_time,
+            "max_rss_bytes": BenchmarkUtils.get_max_rss_bytes(),
+            "torch_max_memory_allocated_bytes": torch.cuda.max_memory_allocated(flair.device) if flair.device.type == "cuda" else None
+        }
+        self._write_record(epoch_record)
+        log.info(
+            f"epoch {epoch} - telemetry: {epoch_record['sentences_per_second']:.2f} sentences/sec"
+            f" - {epoch_record['tokens_per_second']:.2f} tokens/sec"
+            f" - evaluation {epoch_record['evaluation_seconds']:.2f}s"
+            f" - max rss {epoch_record['max_rss_bytes'] / 2 ** 20:.0f} MiB"
+        )
+        if self.record_metrics:
+            for name in self.epoch_metric_names:
+                if epoch_record[name] is not None:
+                    self.trainer._record(MetricRecord.scalar(("telemetry", name), epoch_record[name], epoch))
+
+    @BasePlugin.hook("_training_finally")
+    def _training_finally(self, **kw):
+        """
+        Restores the backward method of the trainer after the training loop, also when it failed.
+        """
+        if self._original_backward:
+            self.trainer._backward = self._original_backward
+            self._original_backward = None
@@ -0,0 +1,185 @@
+from flair.data import Corpus, Sentence
+from flair.nn import Model
+from flair.samplers import FlairSampler
+from flair.trainers import ModelTrainer
+from flair.trainers.plugins import BasePlugin, MetricRecord, TrainerPlugin
+from typing import Any, Callable, Dict, Iterator, List
+
+import logging
+import time
+import torch
+
+log = logging.getLogger("flair")
+
+
+def get_sentence_subword_length(sentence: Sentence,
+                                get_subword_count: Callable[[str], int],
+                                context_length: int = 0) -> int:
+    """
+    Get the number of subwords the transformer embeddings feed to the model for a sentence,
+    including its FLERT context without context dropout and excluding special tokens.
+    :param sentence: The Flair sentence.
+    :param get_subword_count: Function returning the number of subwords of a token text.
+    :param context_length: Number of context tokens on each side of the sentence, 0 without context.
+    :return: The number of subwords.
+    """
+    tokens = sentence.tokens
+    if context_length > 0:
+        tokens = sentence.left_context(context_length) + tokens + sentence.right_context(context_length)
+    return sum(get_subword_count(token.text) for token in tokens)
+
+
+class LengthBucketSampler(FlairSampler):
+    """
+    Sampler that orders the training sentences so every mini batch holds sentences of similar subword length.
+    The shuffled sentences are split into pools of bucket_batch_count mini batches, every pool is sorted by length
+    and cut into mini batches, and the mini batches of all pools are shuffled. The DataLoader of the trainer cuts
+    the sampled indices into mini batches of the same size, so mini_batch_size must match the trainer's.
+    """
+
+    def __init__(self,
+                 get_sentence_length: Callable[[Sentence], int],
+                 mini_batch_size: int,
+                 bucket_batch_count: int = 50):
+        """
+        :param get_sentence_length: Function returning the subword length of a sentence.
+        :param mini_batch_size: Number of sentences per mini batch of the trainer.
+        :param bucket_batch_count: Number of mini batches per pool sorted by length,
+                                   larger pools give less padding and less randomness.
+        """
+        self.get_sentence_length: Callable[[Sentence], int] = get_sentence_length
+        self.mini_batch_size: int = mini_batch_size
+        self.bucket_batch_count: int = bucket_batch_count
+        self.lengths: List[int] = list()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Drop the length function and the dataset when the sampler is pickled, 
+        flair stores the sampler in the training parameters of the model card.
+        :return: The picklable state of the sampler.
+        """
+        state = self.__dict__.copy()
+        state["get_sentence_length"] = None
+        state["data_source"] = None
+        state["lengths"] = list()
+        return state
+
+    def set_dataset(self, data_source):
+        """
+        Initialize the dataset to sample from and the lengths of its sentences.
+        :param data_source: The training dataset.
+        """
+        super().set_dataset(data_source)
+        self.lengths = [self.get_sentence_length(data_source[index]) for index in range(self.num_samples)]
+
+    def __iter__(self) -> Iterator[int]:
+        indices = torch.randperm(self.num_samples).tolist()
+        pool_size = self.mini_batch_size * self.bucket_batch_count
+        batches: List[List[int]] = list()
+        for pool_start in range(0, len(indices), pool_size):
+            pool = sorted(indices[pool_start: pool_start + pool_size], key=lambda index: self.lengths[index])
+            batches.extend(pool[start: start + self.mini_batch_size] for start in range(0, len(pool), self.mini_batch_size))
+        # only the last pool can end with an incomplete mini batch, it has to stay last to keep the batch boundaries
+        last_batch = batches.pop() if batches and len(batches[-1]) < self.mini_batch_size else None
+        batches = [batches[index] for index in torch.randperm(len(batches)).tolist()]
+        if last_batch:
+            batches.append(last_batch)
+        return iter([index for batch in batches for index in batch])
+
+
+class TokenBudgetModelTrainer(ModelTrainer):
+    """
+    ModelTrainer that splits every mini batch into forward and backward steps of at most max_batch_tokens padded subwords,
+    grouping sentences of similar length. The optimizer still steps once per mini batch, so the gradients of the steps
+    are accumulated and the effective batch size stays mini_batch_size sentences.
+    Without a token budget the mini batches are processed like by ModelTrainer.
+    In both cases the subwords and padded subwords of all steps are counted in batching_stats.
+    """
+
+    def __init__(self,
+                 model: Model,
+                 corpus: Corpus,
+                 get_sentence_length: Callable[[Sentence], int],
+                 max_batch_tokens: int = None):
+        """
+        :param model: The model to train.
+        :param corpus: The corpus to train on.
+        :param get_sentence_length: Function returning the subword length of a sentence.
+        :param max_batch_tokens: Maximum number of padded subwords per step, or None to keep the mini batches whole.
+        """
+        super().__init__(model, corpus)
+        self.get_sentence_length: Callable[[Sentence], int] = get_sentence_length
+        self.max_batch_tokens: int = max_batch_tokens
+        self.batching_stats: Dict[str, int] = dict()
+        self.reset_batching_stats()
+
+    def reset_batching_stats(self) -> None:
+        """
+        Reset the counts of sentences, steps, subwords and padded subwords.
+        """
+        self.batching_stats = {"sentences": 0, "steps": 0, "subwords": 0, "padded_subwords": 0}
+
+    def get_batch_steps(self, batch: List[Sentence], mini_batch_chunk_size: int = None) -> List[List[Sentence]]:
+        """
+        Split a mini batch into steps, by the token budget if set, otherwise like ModelTrainer.
+        :param batch: The sentences of the mini batch.
+        :param mini_batch_chunk_size: Maximum number of sentences per step of ModelTrainer, used without token budget.
+        :return: The steps.
+        """
+        if self.max_batch_tokens:
+            batch = sorted(batch, key=self.get_sentence_length, reverse=True)
+            batch_steps: List[List[Sentence]] = list()
+            for sentence in batch:
+                # sorted by descending length, the first sentence of a step sets its padded length
+                if batch_steps and self.get_sentence_length(batch_steps[-1][0]) * (len(batch_steps[-1]) + 1) <= self.max_batch_tokens:
+                    batch_steps[-1].append(sentence)
+                else:
+                    batch_steps.append([sentence])
+        else:
+            batch_steps = ModelTrainer.get_batch_steps(batch, mini_batch_chunk_size)
+
+        for batch_step in batch_steps:
+            lengths = [self.get_sentence_length(sentence) for sentence in batch_step]
+            self.batching_stats["sentences"] += len(batch_step)
+            self.batching_stats["steps"] += 1
+            self.batching_stats["subwords"] += sum(lengths)
+            self.batching_stats["padded_subwords"] += max(lengths, default=0) * len(lengths)
+        return batch_steps
+
+
+class BatchingStatsPlugin(TrainerPlugin):
+    """
+    A TrainerPlugin that logs the padding ratio, the steps per epoch and the subwords per second of every training epoch,
+    from the batching stats of a TokenBudgetModelTrainer, and records them as train/padding_ratio
+    and train/tokens_per_second metrics.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._epoch_start_time: float = None
+
+    @BasePlugin.hook("before_training_epoch")
+    def before_training_epoch(self, epoch=None):
+        """
+        Resets the batching stats and starts the epoch timer.
+        :param epoch: The current epoch number.
+        """
+        self.trainer.reset_batching_stats()
+        self._epoch_start_time = time.time()
+
+    @BasePlugin.hook("after_training_epoch")
+    def after_training_epoch(self, epoch=None):
+        """
+        Logs and records the batching stats of the epoch.
+        :param epoch: The current epoch number.
+        """
+        stats = self.trainer.batching_stats
+        duration = time.time() - self._epoch_start_time
+        padding_ratio = 1 - stats["subwords"] / stats["padded_subwords"] if stats["padded_subwords"] else 0.0
+        tokens_per_second = stats["subwords"] / duration if duration > 0 else 0.0
+        log.info(
+            f"epoch {epoch} - batching: {stats['sentences']} sentences in {stats['steps']} steps"
+            f" - padding ratio {padding_ratio:.4f} - tokens/sec: {tokens_per_second:.2f}"
+        )
+        self.trainer._record(MetricRecord.scalar(("train", "padding_ratio"), padding_ratio, epoch))
+        self.trainer._record(MetricRecord.scalar(("train", "tokens_per_second"), tokens_per_second, epoch))
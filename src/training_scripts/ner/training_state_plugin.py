@@ -0,0 +1,331 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from flair.data import Sentence
+from flair.trainers.plugins import BasePlugin, MetricHistoryPlugin, TrainerPlugin, WeightExtractorPlugin
+from pathlib import Path
+from training_scripts.ner.checkpoint_store import CheckpointStore
+from training_scripts.ner.evaluation_cadence_plugin import EvaluationCadencePlugin
+from typing import Any, Callable, Dict, List
+
+import copy
+import logging
+import numpy as np
+import os
+import random
+import torch
+
+log = logging.getLogger("flair")
+
+
+class TrainingStatePlugin(TrainerPlugin):
+    """
+    A TrainerPlugin that periodically saves the full training state, so an interrupted training, e.g. of an evicted pod,
+    resumes where it stopped with the same results as an uninterrupted one. The training state holds the model,
+    optimizer and learning rate scheduler states, the Python, NumPy, torch and CUDA random number generator states,
+    the epoch and batch position, the best dev score, the best dev score of the asynchronous evaluations published by
+    the EvaluationCadencePlugin, the metric history of the MetricHistoryPlugin and the indices of the weights written
+    by the WeightExtractorPlugin, which are drawn from the random number generator once.
+    It is saved at the start of every save_every_n_epochs-th epoch, i.e. after the previous epoch and its best model
+    were saved, and optionally every save_every_n_batches batches, replacing the training state file atomically.
+    The training loop only waits for the tensors to be copied to the CPU, as for CheckpointStore.save_async,
+    the copy is written by a background thread. A save waits for the previous one, so at most one copy is kept in memory.
+
+    To resume, pass completed_epochs as epoch to the trainer. The epoch the training stopped in is then started with
+    the random number generator state of its start, so the data loader yields the same batches, the batches
+    trained before the interruption are skipped without forward and backward pass and the saved state is restored
+    before the first batch after them. The before_training_optimizer_step and after_training_batch hooks of all plugins
+    are detached from the trainer during the skipped batches, so e.g. the WeightExtractorPlugin does not write
+    the weights of the freshly initialized model and the TelemetryPlugin does not count the skipped sentences.
+    Since the trainer compares the dev scores of the resumed epochs only with each other,
+    best-model.pt is only saved if the dev score is better than the best dev score of the whole training.
+    The train loss of the resumed epoch averages the batches after the resume position.
+
+    The plugin depends on its position in the plugin list of the trainer: it has to follow the plugins replacing
+    the save model method of the trainer, e.g. the CheckpointStorePlugin, since it wraps the save model method
+    it finds in after_setup, and the plugins tracking the batches of an epoch in before_training_batch, e.g. the
+    TelemetryPlugin, since it detaches the later batch hooks. The save model method is restored by an identity check,
+    so a plugin replacing it after this plugin has to restore it before this plugin does.
+    """
+
+    def __init__(self,
+                 training_state_path: Path,
+                 save_every_n_epochs: int = 1,
+                 save_every_n_batches: int = 0,
+                 resume: bool = True,
+                 keep_training_state: bool = False):
+        """
+        :param training_state_path: Path of the training state file.
+        :param save_every_n_epochs: Number of epochs between the saves at the start of an epoch.
+        :param save_every_n_batches: Number of batches between the saves within an epoch, 0 to save at the start of every epoch only.
+        :param resume: Whether to resume from an existing training state file.
+        :param keep_training_state: Whether to keep the training state file after the training completed.
+        """
+        super().__init__()
+        self.training_state_path = Path(training_state_path)
+        self.save_every_n_epochs = max(1, save_every_n_epochs)
+        self.save_every_n_batches = save_every_n_batches
+        self.keep_training_state = keep_training_state
+        self.resume_state: Dict[str, Any] = None
+        if resume and self.training_state_path.exists():
+            self.resume_state = torch.load(self.training_state_path, map_location="cpu", weights_only=False)
+            log.info(
+                f"found training state {self.training_state_path} of epoch {self.resume_state['epoch']}"
+                f" after batch {self.resume_state['batch']}"
+            )
+        self._best_score: float = 0.0
+        self._current_model_is_best: bool = False
+        self._start_epoch: int = None
+        self._epoch_rng_state: Dict[str, Any] = None
+        self._skip_batch: bool = False
+        self._detached_batch_hooks: Dict[str, Dict[Any, Any]] = None
+        self._training_completed: bool = False
+        self._original_get_batch_steps: Callable = None
+        self._original_save_model: Callable = None
+        self._executor: ThreadPoolExecutor = None
+        self._pending_save: Future = None
+
+    @property
+    def completed_epochs(self) -> int:
+        """
+        :return: Number of epochs completed before the resumed training state, 0 without one.
+        """
+        return self.resume_state["epoch"] - 1 if self.resume_state else 0
+
+    @staticmethod
+    def get_rng_state() -> Dict[str, Any]:
+        """
+        :return: The states of the Python, NumPy, torch and CUDA random number generators.
+        """
+        return {
+            "python": random.getstate(),
+            "numpy": np.random.get_state(),
+            "torch": torch.get_rng_state(),
+            "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None
+        }
+
+    @staticmethod
+    def set_rng_state(rng_state: Dict[str, Any]) -> None:
+        """
+        Set the states of the random number generators.
+        :param rng_state: The states, as returned by get_rng_state.
+        """
+        random.setstate(rng_state["python"])
+        np.random.set_state(rng_state["numpy"])
+        torch.set_rng_state(rng_state["torch"])
+        if rng_state["cuda"] is not None and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all(rng_state["cuda"])
+
+    def _get_scheduler(self) -> Any:
+        """
+        :return: The learning rate scheduler of a scheduler plugin of the trainer, or None.
+        """
+        return next((plugin.scheduler for plugin in self.trainer.plugins if hasattr(plugin, "scheduler")), None)
+
+    def _get_metric_history_plugins(self) -> List[MetricHistoryPlugin]:
+        return [plugin for plugin in self.trainer.plugins if isinstance(plugin, MetricHistoryPlugin)]
+
+    def _get_weight_extractor_plugins(self) -> List[WeightExtractorPlugin]:
+        return [plugin for plugin in self.trainer.plugins if isinstance(plugin, WeightExtractorPlugin)]
+
+    def _get_evaluation_cadence_plugins(self) -> List[EvaluationCadencePlugin]:
+        return [plugin for plugin in self.trainer.plugins if isinstance(plugin, EvaluationCadencePlugin)]
+
+    def _save_training_state(self, epoch: int, batch: int) -> None:
+        """
+        Copy the training state and save the copy atomically by the background thread, after the previous save.
+        :param epoch: The current epoch number.
+        :param batch: Number of trained batches of the current epoch.
+        """
+        self._wait_for_pending_save()
+        scheduler = self._get_scheduler()
+        training_state = {
+            "epoch": epoch,
+            "batch": batch,
+            "model": self.trainer.model.state_dict(),
+            "optimizer": self.trainer.optimizer.state_dict(),
+            "scheduler": scheduler.state_dict() if scheduler is not None else None,
+            "rng_state": self.get_rng_state(),
+            "epoch_rng_state": self._epoch_rng_state,
+            "best_score": self._best_score,
+            "evaluation_best_scores": [plugin.best_score for plugin in self._get_evaluation_cadence_plugins()],
+            "metric_history": [plugin.metric_history for plugin in self._get_metric_history_plugins()],
+            "weight_indices": [
+                {key: dict(indices) for key, indices in plugin.weight_extractor.weights_dict.items()}
+                for plugin in self._get_weight_extractor_plugins()
+            ]
+        }
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="training-state")
+        self._pending_save = self._executor.submit(self._write_training_state, CheckpointStore.snapshot(training_state))
+
+    def _write_training_state(self, training_state: Dict[str, Any]) -> None:
+        """
+        Write a copied training state atomically.
+        :param training_state: The copied training state.
+        """
+        tmp_path = self.training_state_path.with_name(f"{self.training_state_path.name}.tmp")
+        torch.save(training_state, tmp_path)
+        os.replace(tmp_path, self.training_state_path)
+        log.info(f"saved training state of epoch {training_state['epoch']} after batch {training_state['batch']}")
+
+    def _wait_for_pending_save(self) -> None:
+        """
+        Wait until the previous training state is written, raising the exception of a failed save.
+        """
+        pending_save, self._pending_save = self._pending_save, None
+        if pending_save is not None:
+            pending_save.result()
+
+    def _restore_training_state(self) -> None:
+        """
+        Restore the resumed training state, all but the random number generator state of the epoch start.
+        """
+        training_state, self.resume_state = self.resume_state, None
+        self.trainer.model.load_state_dict(training_state["model"])
+        self.trainer.optimizer.load_state_dict(training_state["optimizer"])
+        scheduler = self._get_scheduler()
+        if scheduler is not None and training_state["scheduler"] is not None:
+            scheduler.load_state_dict(training_state["scheduler"])
+        self._best_score = training_state["best_score"]
+        for plugin, metric_history in zip(self._get_metric_history_plugins(), training_state["metric_history"]):
+            plugin.metric_history = copy.deepcopy(metric_history)
+        for plugin, weight_indices in zip(self._get_weight_extractor_plugins(), training_state["weight_indices"]):
+            plugin.weight_extractor.weights_dict.update(copy.deepcopy(weight_indices))
+        for plugin, best_score in zip(self._get_evaluation_cadence_plugins(), training_state.get("evaluation_best_scores", [])):
+            plugin.set_best_score(best_score)
+        self.set_rng_state(training_state["rng_state"])
+        log.info(f"resumed training at epoch {training_state['epoch']} after batch {training_state['batch']}")
+
+    def _detach_batch_hooks(self) -> None:
+        """
+        Detach the hooks of the trainer events after the forward and backward pass of a batch.
+        """
+        if self._detached_batch_hooks is None:
+            self._detached_batch_hooks = {
+                event: self.trainer._hook_handles.pop(event, dict())
+                for event in ("before_training_optimizer_step", "after_training_batch")
+            }
+
+    def _attach_batch_hooks(self) -> None:
+        """
+        Attach the hooks detached by _detach_batch_hooks again.
+        """
+        if self._detached_batch_hooks is not None:
+            self.trainer._hook_handles.update(self._detached_batch_hooks)
+            self._detached_batch_hooks = None
+
+    def _get_batch_steps(self, batch: List[Sentence], mini_batch_chunk_size: int = None) -> List[List[Sentence]]:
+        """
+        Replaces the get batch steps method of the trainer, returning no steps for the skipped batches.
+        :param batch: The sentences of the mini batch.
+        :param mini_batch_chunk_size: Maximum number of sentences per step.
+        :return: The steps.
+        """
+        if self._skip_batch:
+            return []
+        return self._original_get_batch_steps(batch, mini_batch_chunk_size=mini_batch_chunk_size)
+
+    def _save_model(self, model_file: Path, checkpoint: bool = False) -> None:
+        """
+        Replaces the save model method of the trainer, skipping the best model saves of resumed epochs
+        whose dev score is not better than the best dev score of the whole training.
+        :param model_file: The model file.
+        :param checkpoint: Passed to the save model method of the trainer.
+        """
+        if Path(model_file).name == "best-model.pt" and not self._current_model_is_best:
+            log.info(f"not saving best model, the best dev score of the training is {self._best_score:.4f}")
+            return
+        self._original_save_model(model_file, checkpoint=checkpoint)
+
+    @BasePlugin.hook("after_setup")
+    def after_setup(self, **kw):
+        """
+        Replaces the get batch steps and save model methods of the trainer.
+        """
+        self._original_get_batch_steps = self.trainer.get_batch_steps
+        self._original_save_model = self.trainer._save_model
+        self.trainer.get_batch_steps = self._get_batch_steps
+        self.trainer._save_model = self._save_model
+
+    @BasePlugin.hook("before_training_epoch")
+    def before_training_epoch(self, epoch=None):
+        """
+        Saves the training state of the epoch start, or restores the resumed training state or the
+        random number generator state of the start of the resumed epoch, before the data loader is created.
+        :param epoch: The current epoch number.
+        """
+        if self._start_epoch is None:
+            self._start_epoch = epoch
+        if self.resume_state and self.resume_state["epoch"] == epoch:
+            if self.resume_state["batch"] == 0:
+                self._restore_training_state()
+            else:
+                self.set_rng_state(self.resume_state["epoch_rng_state"])
+        self._epoch_rng_state = self.get_rng_state()
+        if epoch != self._start_epoch and (epoch - 1) % self.save_every_n_epochs == 0:
+            self._save_training_state(epoch, 0)
+
+    @BasePlugin.hook("before_training_batch")
+    def before_training_batch(self, batch_no=None, epoch=None, **kw):
+        """
+        Skips the batches trained before the resumed training state without their batch hooks, restores it before
+        the first batch after them and saves the training state every save_every_n_batches batches.
+        :param batch_no: The number of the batch in the epoch.
+        :param epoch: The current epoch number.
+        """
+        self._skip_batch = bool(self.resume_state) and self.resume_state["epoch"] == epoch and batch_no < self.resume_state["batch"]
+        if self._skip_batch:
+            self._detach_batch_hooks()
+        else:
+            self._attach_batch_hooks()
+        if self.resume_state and self.resume_state["epoch"] == epoch and batch_no == self.resume_state["batch"]:
+            self._restore_training_state()
+        elif not self._skip_batch and self.save_every_n_batches and batch_no > 0 and batch_no % self.save_every_n_batches == 0:
+            self._save_training_state(epoch, batch_no)
+
+    @BasePlugin.hook("after_evaluation")
+    def after_evaluation(self, current_model_is_best=None, validation_scores=None, **kw):
+        """
+        Tracks the best dev score of the whole training.
+        :param current_model_is_best: Whether the trainer considers the current model the best.
+        :param validation_scores: The main dev score and loss of the current model.
+        """
+        self._current_model_is_best = bool(current_model_is_best) and validation_scores[0] > self._best_score
+        if self._current_model_is_best:
+            self._best_score = validation_scores[0]
+
+    @BasePlugin.hook("after_training_loop")
+    def after_training_loop(self, **kw):
+        """
+        Marks the training as completed, an interrupted training keeps its training state file.
+        """
+        self._training_completed = True
+
+    @BasePlugin.hook("_training_finally")
+    def _training_finally(self, **kw):
+        """
+        Restores the get batch steps and save model methods and the batch hooks of the trainer and waits for the pending
+        training state save, also when the training failed. The save model method is only restored if no other plugin
+        replaced it after this plugin.
+        """
+        self._attach_batch_hooks()
+        if self._original_get_batch_steps:
+            self.trainer.get_batch_steps = self._original_get_batch_steps
+            self._original_get_batch_steps = None
+        if self._original_save_model:
+            if self.trainer._save_model == self._save_model:
+                self.trainer._save_model = self._original_save_model
+            self._original_save_model = None
+        try:
+            self._wait_for_pending_save()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    @BasePlugin.hook("after_training")
+    def after_training(self, **kw):
+        """
+        Removes the training state file after the completed training, unless keep_training_state is set.
+        """
+        if self._training_completed and not self.keep_training_state:
+            self.training_state_path.unlink(missing_ok=True)
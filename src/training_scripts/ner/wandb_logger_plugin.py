@@ -1,19 +1,99 @@
 from flair.trainers.plugins import BasePlugin, MetricRecord, TrainerPlugin
-from typing import Any, Dict, Set
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
 
+import json
+import logging
+import math
+import queue
+import threading
+import time
 import wandb
 
+log = logging.getLogger("flair")
+
+
+class LocalMetricLogger:
+    """
+    A local stand-in for the wandb module with the init, define_metric, log and finish calls used by WandbLoggerPlugin,
+    keeping the logged metrics in memory and optionally appending them to a JSON lines file.
+    It can simulate a slow or unreachable backend, e.g. to measure the logging overhead of the training loop.
+    """
+
+    def __init__(self,
+                 log_path: Path = None,
+                 latency: float = 0.0,
+                 unreachable: bool = False):
+        """
+        :param log_path: Optional path of the JSON lines file to append the logged metrics to.
+        :param latency: Seconds every log call blocks, simulating the network round trip.
+        :param unreachable: Whether every log call raises a ConnectionError, simulating an unreachable backend.
+        """
+        self.log_path = log_path
+        self.latency = latency
+        self.unreachable = unreachable
+        self.records: List[Tuple[int, Dict[str, Any]]] = list()
+        self.step_metrics: Dict[str, str] = dict()
+        self.log_call_count: int = 0
+
+    def init(self, **kw) -> "LocalMetricLogger":
+        """
+        Starts a run, the stand-in is its own run.
+        :return: The run.
+        """
+        return self
+
+    def define_metric(self, name: str, step_metric: str = None, **kw) -> None:
+        """
+        Defines the x-axis metric of the metrics matching a name.
+        :param name: The metric name or a glob pattern of metric names.
+        :param step_metric: The x-axis metric.
+        """
+        self.step_metrics[name] = step_metric
+
+    def log(self, data: Dict[str, Any], step: int = None) -> None:
+        """
+        Logs the metrics of a step.
+        :param data: Dictionary of metric names and values.
+        :param step: The step of the metrics.
+        """
+        self.log_call_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.unreachable:
+            raise ConnectionError("The local metric logger simulates an unreachable backend.")
+        self.records.append((step, dict(data)))
+        if self.log_path:
+            with self.log_path.open("a", encoding="utf-8") as writer:
+                writer.write(json.dumps({"step": step, "data": data}) + "\n")
+
+    def finish(self) -> None:
+        """
+        Finishes the run.
+        """
+        pass
+
 
 class WandbLoggerPlugin(TrainerPlugin):
     """
     A TrainerPlugin that logs training metrics to Weights & Biases (wandb).
+    In buffered mode the metrics are queued and logged in batches by a background thread, so a slow backend
+    does not block the training loop, and the metrics the backend does not accept are appended to a local
+    JSON lines file instead.
+    All metrics are logged against the epoch metric as x-axis instead of the wandb step, which only increases,
+    so the results of asynchronous evaluations recorded for an earlier epoch are not dropped.
     """
     def __init__(self, 
                  entity: str, 
                  project: str, 
                  config: Dict[str, Any] = None, 
                  tracked: Set[str] = None, 
-                 reinit: str = "finish_previous"):
+                 reinit: str = "finish_previous", 
+                 buffered: bool = False, 
+                 flush_interval: float = 5.0, 
+                 max_batch_size: int = 1000, 
+                 fallback_log_path: Path = None, 
+                 logger: Any = None):
         
         """
         Initializes the WandbLoggerPlugin.
@@ -22,6 +102,12 @@ class WandbLoggerPlugin(TrainerPlugin):
         :param config: Optional configuration dictionary to log to wandb.
         :param tracked: Optional set of metric names to track.
         :param reinit: Strategy for reinitializing wandb runs.
+        :param buffered: Whether to queue the metrics and log them in batches from a background thread.
+        :param flush_interval: Maximum seconds the background thread collects metrics before logging them.
+        :param max_batch_size: Maximum number of queued metrics logged in one batch.
+        :param fallback_log_path: Path of the JSON lines file for the metrics the backend does not accept in buffered mode,
+                                  'wandb_fallback_metrics.jsonl' in the working directory if None.
+        :param logger: Optional stand-in for the wandb module, e.g. a LocalMetricLogger.
         """
         
         self.entity = entity
@@ -29,32 +115,130 @@ class WandbLoggerPlugin(TrainerPlugin):
         self.config = dict(config) if config is not None else dict()
         self.tracked = set(tracked) if tracked is not None else None
         self.reinit = reinit
+        self.buffered = buffered
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.fallback_log_path = Path(fallback_log_path) if fallback_log_path else Path("wandb_fallback_metrics.jsonl")
+        self.logger = logger if logger is not None else wandb
         self._run = None
         self._pluggable = None
         self._hook_handles = []
+        self._queue: queue.Queue = None
+        self._flush_thread: threading.Thread = None
+        self.fallback_record_count: int = 0
+
+    def _log(self, data: Dict[str, Any], step: int = None):
+        """
+        Logs metrics directly, or queues them for the background thread in buffered mode.
+        :param data: Dictionary of metric names and values.
+        :param step: The step of the metrics.
+        """
+        if self._flush_thread:
+            self._queue.put((data, step))
+        else:
+            self._log_to_backend(data, step)
+
+    def _log_to_backend(self, data: Dict[str, Any], step: int = None):
+        """
+        Logs metrics to the backend with the step as epoch metric.
+        :param data: Dictionary of metric names and values.
+        :param step: The step of the metrics.
+        """
+        self.logger.log({**data, "epoch": step} if step is not None else data)
+
+    def _flush(self):
+        """
+        Logs the queued metrics in batches until the stop sentinel None is queued,
+        a batch is logged after flush_interval seconds or when max_batch_size metrics are queued.
+        """
+        while True:
+            records: List[Tuple[Dict[str, Any], int]] = list()
+            record = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while record is not None:
+                records.append(record)
+                if len(records) >= self.max_batch_size:
+                    break
+                try:
+                    record = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self._log_batch(records)
+            if record is None:
+                return
+
+    def _log_batch(self, records: List[Tuple[Dict[str, Any], int]]):
+        """
+        Logs a batch of queued metrics with one log call per step,
+        appending the metrics of the failed and following log calls to the fallback log file.
+        :param records: The queued metrics and their steps, in the order they were recorded.
+        """
+        step_records: List[Tuple[Dict[str, Any], int]] = list()
+        for data, step in records:
+            if step_records and step_records[-1][1] == step:
+                step_records[-1][0].update(data)
+            else:
+                step_records.append((dict(data), step))
+
+        for index, (data, step) in enumerate(step_records):
+            try:
+                if self._run is None:
+                    raise ConnectionError("No run was started.")
+                self._log_to_backend(data, step)
+            except Exception as exception:
+                log.warning(f"wandb logging failed ({exception}), appending metrics to {self.fallback_log_path}")
+                self.fallback_log_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.fallback_log_path.open("a", encoding="utf-8") as writer:
+                    for fallback_data, fallback_step in step_records[index:]:
+                        writer.write(json.dumps({"step": fallback_step, "data": fallback_data}) + "\n")
+                self.fallback_record_count += len(step_records) - index
+                return
+
+    def _stop_flush_thread(self):
+        """
+        Logs the remaining queued metrics and stops the background thread.
+        """
+        if self._flush_thread:
+            self._queue.put(None)
+            self._flush_thread.join()
+            self._flush_thread = None
 
     @BasePlugin.hook("after_setup")
     def after_setup(self, **kw):
         """
-        Initializes the wandb run after the trainer setup.
+        Initializes the wandb run after the trainer setup with the epoch metric as x-axis of all metrics,
+        and starts the background thread in buffered mode.
         """
-        self._run = wandb.init(
-            entity=self.entity, 
-            project=self.project, 
-            config=self.config, 
-            reinit=self.reinit
-        )
+        try:
+            self._run = self.logger.init(
+                entity=self.entity, 
+                project=self.project, 
+                config=self.config, 
+                reinit=self.reinit
+            )
+            self._run.define_metric("epoch")
+            self._run.define_metric("*", step_metric="epoch")
+        except Exception as exception:
+            if not self.buffered:
+                raise
+            log.warning(f"wandb run could not be started ({exception}), appending metrics to {self.fallback_log_path}")
+            self._run = None
+        if self.buffered:
+            self._queue = queue.Queue()
+            self._flush_thread = threading.Thread(target=self._flush, name="wandb-logger-flush", daemon=True)
+            self._flush_thread.start()
 
     @BasePlugin.hook("metric_recorded")
     def metric_recorded(self, metric: MetricRecord):
         """
-        Logs the recorded metric to wandb if it is in the tracked set.
+        Logs the recorded metric to wandb if it is in the tracked set and finite, 
+        skipped evaluations are recorded with a NaN loss and a score of -inf.
         :param metric: The MetricRecord instance containing the metric details.
         """
         name = metric.joined_name
         value = metric.value
-        if (self.tracked and name in self.tracked and not isinstance(value, str)):
-            wandb.log({name: float(value)}, step=metric.global_step)
+        if (self.tracked and name in self.tracked and not isinstance(value, str) and math.isfinite(float(value))):
+            self._log({name: float(value)}, step=metric.global_step)
 
     @BasePlugin.hook("after_training_epoch")
     def after_training_epoch(self, epoch=None):
@@ -64,25 +248,38 @@ class WandbLoggerPlugin(TrainerPlugin):
         """
         trainer = self.trainer
         lrs = [group['lr'] for group in trainer.optimizer.param_groups]
-        wandb.log({"learning_rate": lrs[0] if len(lrs) == 1 else lrs}, step=epoch)
+        self._log({"learning_rate": lrs[0] if len(lrs) == 1 else lrs}, step=epoch)
 
     @BasePlugin.hook("after_evaluation")
-    def after_evaluation(self, epoch=None, current_model_is_best=None, **kw):
+    def after_evaluation(self, epoch=None, current_model_is_best=None, validation_scores=None, **kw):
         """
-        Logs whether the current model is the best model after evaluation.
+        Logs whether the current model is the best model after evaluation, skipped and asynchronous evaluations
+        are recorded with a score of -inf, the EvaluationCadencePlugin records the best_model_saved metric
+        of an asynchronous evaluation once it arrives.
         :param epoch: The current epoch number.
         :param current_model_is_best: Boolean indicating if the current model is the best.
+        :param validation_scores: The main dev score and loss of the current model.
         """
+        if validation_scores and not math.isfinite(validation_scores[0]):
+            return
         if current_model_is_best:
-            wandb.log({"best_model_saved": 1}, step=epoch)
+            self._log({"best_model_saved": 1}, step=epoch)
         else:
-            wandb.log({"best_model_saved": 0}, step=epoch)
+            self._log({"best_model_saved": 0}, step=epoch)
+
+    @BasePlugin.hook("_training_exception")
+    def _training_exception(self, **kw):
+        """
+        Logs the remaining queued metrics when the training fails.
+        """
+        self._stop_flush_thread()
 
     @BasePlugin.hook("after_training")
     def after_training(self, **kw):
         """
-        Finalizes the wandb run after training is complete.
+        Logs the remaining queued metrics and finalizes the wandb run after training is complete.
         """
+        self._stop_flush_thread()
         if self._run:
             self._run.finish()
-            self._run = None
\ No newline at end of file
+            self._run = None
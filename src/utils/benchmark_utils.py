@@ -0,0 +1,167 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import json
+import re
+import resource
+import sys
+import time
+import tracemalloc
+
+
+class BenchmarkUtils:
+    """
+    Utility class for timing benchmark stages, storing their results and comparing them against a saved baseline.
+    """
+
+    @staticmethod
+    def get_max_rss_bytes() -> int:
+        """
+        Returns the peak resident set size of the current process so far.
+        :return: Peak resident set size in bytes.
+        """
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    @staticmethod
+    def measure_stage(stage_function: Callable[[], Any],
+                      repeats: int = 1,
+                      trace_memory: bool = True) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Runs a benchmark stage and measures its duration and memory.
+        The stage is timed over all repeats without memory tracing, the Python heap peak is measured
+        in one additional traced run, since tracing slows allocations down considerably.
+
+        :param stage_function: The stage to run, called without arguments.
+        :param repeats: Number of timed runs, the fastest one is reported.
+        :param trace_memory: Whether to measure the Python heap peak in an additional traced run.
+        :return: The return value of the last run and a dictionary with 'seconds', 'cpu_seconds',
+                 'peak_python_memory_bytes' (None if not traced) and 'max_rss_bytes'.
+        """
+        durations: List[float] = list()
+        cpu_durations: List[float] = list()
+        result = None
+        for _ in range(max(1, repeats)):
+            start, cpu_start = time.perf_counter(), time.process_time()
+            result = stage_function()
+            durations.append(time.perf_counter() - start)
+            cpu_durations.append(time.process_time() - cpu_start)
+
+        peak_python_memory_bytes = None
+        if trace_memory:
+            result = None
+            tracemalloc.start()
+            try:
+                result = stage_function()
+                peak_python_memory_bytes = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        return result, {
+            "seconds": min(durations),
+            "cpu_seconds": min(cpu_durations),
+            "peak_python_memory_bytes": peak_python_memory_bytes,
+            "max_rss_bytes": BenchmarkUtils.get_max_rss_bytes()
+        }
+
+    @staticmethod
+    def write_scaled_corpus(json_data_files_dir: Path,
+                            target_json_data_files_dir: Path,
+                            scale: int) -> int:
+        """
+        Writes a synthetic corpus that repeats every JSON file of the source corpus,
+        the copies get the copy number appended to their document title and file name.
+        The first copy keeps the original title and file name.
+
+        :param json_data_files_dir: Directory of the source *.json files.
+        :param target_json_data_files_dir: Directory to write the scaled corpus to, created if needed.
+        :param scale: Number of copies of every JSON file.
+        :return: Number of written JSON files.
+        """
+        document_title_pattern = re.compile(rb'"documentTitle"\s*:\s*"([^"]*)"')
+        target_json_data_files_dir.mkdir(parents=True, exist_ok=True)
+        file_count = 0
+        for json_file in sorted(json_data_files_dir.glob("*.json")):
+            content = json_file.read_bytes()
+            (target_json_data_files_dir / json_file.name).write_bytes(content)
+            file_count += 1
+            match = document_title_pattern.search(content)
+            document_title = match.group(1).decode("utf-8") if match else ""
+            file_name_stem = json_file.name.split(".")[0]
+            document_title_stem = document_title.split(".")[0]
+            for copy_number in range(2, scale + 1):
+                copy_content = content
+                if match:
+                    copy_document_title = f"{document_title_stem}_{copy_number}{document_title[len(document_title_stem):]}"
+                    copy_content = b"".join([
+                        content[:match.start(1)], 
+                        copy_document_title.encode("utf-8"), 
+                        content[match.end(1):]
+                    ])
+                copy_file_name = f"{file_name_stem}_{copy_number}{json_file.name[len(file_name_stem):]}"
+                (target_json_data_files_dir / copy_file_name).write_bytes(copy_content)
+                file_count += 1
+        return file_count
+
+    @staticmethod
+    def save_benchmark_results(benchmark_results: Dict[str, Any], output_file: Path) -> None:
+        """
+        Saves benchmark results as JSON file.
+        :param benchmark_results: The benchmark results dictionary.
+        :param output_file: Path of the JSON file, parent directories are created if needed.
+        """
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with output_file.open("w", encoding="utf-8") as f:
+            json.dump(benchmark_results, f, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def load_benchmark_results(input_file: Path) -> Dict[str, Any]:
+        """
+        Loads benchmark results from a JSON file.
+        :param input_file: Path of the JSON file.
+        :return: The benchmark results dictionary.
+        """
+        with input_file.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def compare_benchmark_results(benchmark_results: Dict[str, Any],
+                                  baseline_benchmark_results: Dict[str, Any],
+                                  regression_threshold: float = 0.1,
+                                  metric_names: Tuple[str, ...] = ("seconds", "peak_python_memory_bytes")) -> List[Dict[str, Any]]:
+        """
+        Compares benchmark results against baseline results of the same corpus, scale and stage.
+
+        :param benchmark_results: The benchmark results dictionary, with a list of stage results under 'results'.
+        :param baseline_benchmark_results: The baseline benchmark results dictionary in the same format.
+        :param regression_threshold: Relative increase over the baseline that counts as regression, e.g. 0.1 for 10%.
+        :param metric_names: The stage result metrics to compare.
+        :return: A list of comparison dictionaries with 'corpus', 'scale', 'stage', 'metric', 'baseline', 'current',
+                 'ratio' and 'regression', for every metric present in both results.
+        """
+        def get_key(stage_result: Dict[str, Any]) -> Tuple[str, int, str]:
+            return stage_result["corpus"], stage_result["scale"], stage_result["stage"]
+
+        baseline_stage_results = {get_key(stage_result): stage_result for stage_result in baseline_benchmark_results.get("results", [])}
+        comparisons: List[Dict[str, Any]] = list()
+        for stage_result in benchmark_results.get("results", []):
+            baseline_stage_result = baseline_stage_results.get(get_key(stage_result))
+            if baseline_stage_result is None:
+                continue
+            for metric_name in metric_names:
+                current, baseline = stage_result.get(metric_name), baseline_stage_result.get(metric_name)
+                if current is None or not baseline:
+                    continue
+                ratio = current / baseline
+                comparisons.append({
+                    "corpus": stage_result["corpus"],
+                    "scale": stage_result["scale"],
+                    "stage": stage_result["stage"],
+                    "metric": metric_name,
+                    "baseline": baseline,
+                    "current": current,
+                    "ratio": ratio,
+                    "regression": ratio > 1 + regression_threshold
+                })
+        return comparisons
@@ -0,0 +1,270 @@
+from itertools import chain
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class BioesUtils:
+    """
+    Utility class for assigning BIOES tags to tokens based on entity character offsets 
+    and for chunking BIOES tagged documents without cutting through entities.
+    """
+    chunking_modes: Tuple[str, ...] = ("document", "sentence", "subword_budget")
+
+    @staticmethod
+    def get_bioes_tags(token_begins: Sequence[int], 
+                       token_ends: Sequence[int], 
+                       entity_begins: Sequence[int], 
+                       entity_ends: Sequence[int], 
+                       entity_labels: Sequence[str]) -> List[str]:
+        """
+        Assigns a BIOES tag to every token. A token belongs to an entity if it lies completely within the entity 
+        boundaries, entities are applied in the given order, so a later entity overwrites the tags of an earlier one.
+        If the token offsets are sorted, the tokens of each entity are located with a binary search on the begin 
+        and end offset arrays, i.e. in O((tokens + entities) * log(tokens)) instead of O(tokens * entities).
+        
+        :param token_begins: Begin character offsets of the tokens.
+        :param token_ends: End character offsets of the tokens.
+        :param entity_begins: Begin character offsets of the entities.
+        :param entity_ends: End character offsets of the entities.
+        :param entity_labels: Labels of the entities.
+        :return: List of BIOES tags, one per token.
+        """
+        tags: List[str] = ["O"] * len(token_begins)
+        if not tags or len(entity_labels) == 0:
+            return tags
+
+        token_begins = np.asarray(token_begins, dtype=np.int64)
+        token_ends = np.asarray(token_ends, dtype=np.int64)
+        entity_begins = np.asarray(entity_begins, dtype=np.int64)
+        entity_ends = np.asarray(entity_ends, dtype=np.int64)
+
+        if np.all(token_begins[1:] >= token_begins[:-1]) and np.all(token_ends[1:] >= token_ends[:-1]):
+            # with both offset arrays sorted, the tokens within an entity form the contiguous range 
+            # from the first token beginning at or after the entity begin 
+            # to the last token ending at or before the entity end
+            first_indices = np.searchsorted(token_begins, entity_begins, side="left")
+            last_indices = np.searchsorted(token_ends, entity_ends, side="right") - 1
+            entity_token_ranges: List[Tuple[int, int]] = list(zip(first_indices.tolist(), last_indices.tolist()))
+            for (first, last), label in zip(entity_token_ranges, entity_labels):
+                BioesUtils._tag_token_range(tags, first, last, label)
+        else:
+            for begin, end, label in zip(entity_begins, entity_ends, entity_labels):
+                token_indices = np.flatnonzero((token_begins >= begin) & (token_ends <= end))
+                if len(token_indices) == 0:
+                    continue
+                if len(token_indices) == 1:
+                    tags[token_indices[0]] = f"S-{label}"
+                    continue
+                tags[token_indices[0]] = f"B-{label}"
+                for token_index in token_indices[1:-1]:
+                    tags[token_index] = f"I-{label}"
+                tags[token_indices[-1]] = f"E-{label}"
+        return tags
+
+    @staticmethod
+    def get_bioes_tags_for_documents(documents_token_begins: Sequence[Sequence[int]], 
+                                     documents_token_ends: Sequence[Sequence[int]], 
+                                     documents_entity_begins: Sequence[Sequence[int]], 
+                                     documents_entity_ends: Sequence[Sequence[int]], 
+                                     documents_entity_labels: Sequence[Sequence[str]]) -> List[List[str]]:
+        """
+        Assigns BIOES tags to the tokens of many documents in one call, with the same semantics as get_bioes_tags.
+        The offsets of all documents are shifted into one shared, non-overlapping offset space, 
+        so that a single binary search over the concatenated arrays locates the tokens of all entities.
+        Documents whose token offsets are not sorted are tagged one by one with get_bioes_tags.
+        
+        :param documents_token_begins: Per document begin character offsets of the tokens.
+        :param documents_token_ends: Per document end character offsets of the tokens.
+        :param documents_entity_begins: Per document begin character offsets of the entities.
+        :param documents_entity_ends: Per document end character offsets of the entities.
+        :param documents_entity_labels: Per document labels of the entities.
+        :return: Per document lists of BIOES tags, one per token.
+        """
+        documents_tags: List[List[str]] = [["O"] * len(token_begins) for token_begins in documents_token_begins]
+        document_indices: List[int] = [
+            document_index for document_index, tags in enumerate(documents_tags) 
+            if tags and len(documents_entity_labels[document_index]) > 0
+        ]
+        if not document_indices:
+            return documents_tags
+
+        token_counts = np.array([len(documents_tags[document_index]) for document_index in document_indices], dtype=np.int64)
+        entity_counts = np.array([len(documents_entity_labels[document_index]) for document_index in document_indices], dtype=np.int64)
+        token_begins = np.fromiter(chain.from_iterable(documents_token_begins[i] for i in document_indices), dtype=np.int64, count=int(token_counts.sum()))
+        token_ends = np.fromiter(chain.from_iterable(documents_token_ends[i] for i in document_indices), dtype=np.int64, count=int(token_counts.sum()))
+        token_starts = np.cumsum(token_counts) - token_counts
+        token_stops = token_starts + token_counts
+
+        # documents whose token offsets are not sorted are tagged one by one, 
+        # a decreasing offset at the first token of a document is only a document boundary
+        unsorted_positions = np.flatnonzero((token_begins[1:] < token_begins[:-1]) | (token_ends[1:] < token_ends[:-1])) + 1
+        is_document_start = np.zeros(len(token_begins), dtype=bool)
+        is_document_start[token_starts] = True
+        unsorted_positions = unsorted_positions[~is_document_start[unsorted_positions]]
+        if len(unsorted_positions) > 0:
+            unsorted_document_positions = set(np.searchsorted(token_starts, unsorted_positions, side="right") - 1)
+            sorted_document_indices: List[int] = list()
+            for position, document_index in enumerate(document_indices):
+                if position in unsorted_document_positions:
+                    documents_tags[document_index] = BioesUtils.get_bioes_tags(
+                        documents_token_begins[document_index], 
+                        documents_token_ends[document_index], 
+                        documents_entity_begins[document_index], 
+                        documents_entity_ends[document_index], 
+                        documents_entity_labels[document_index]
+                    )
+                else:
+                    sorted_document_indices.append(document_index)
+            sorted_documents_tags = BioesUtils.get_bioes_tags_for_documents(
+                [documents_token_begins[i] for i in sorted_document_indices], 
+                [documents_token_ends[i] for i in sorted_document_indices], 
+                [documents_entity_begins[i] for i in sorted_document_indices], 
+                [documents_entity_ends[i] for i in sorted_document_indices], 
+                [documents_entity_labels[i] for i in sorted_document_indices]
+            )
+            for document_index, tags in zip(sorted_document_indices, sorted_documents_tags):
+                documents_tags[document_index] = tags
+            return documents_tags
+
+        # shift every document into its own offset interval, separated from its neighbours by a gap, 
+        # and clip the entity offsets to that interval, which keeps their token ranges unchanged 
+        # and stops them from reaching into a neighbouring document
+        lowest_offsets = np.minimum(token_begins[token_starts], token_ends[token_starts])
+        highest_offsets = np.maximum(token_begins[token_stops - 1], token_ends[token_stops - 1])
+        interval_sizes = highest_offsets - lowest_offsets + 3
+        shifts = np.cumsum(interval_sizes) - interval_sizes - lowest_offsets + 1
+        token_shifts = np.repeat(shifts, token_counts)
+        entity_shifts = np.repeat(shifts, entity_counts)
+        entity_lowest_offsets = np.repeat(lowest_offsets, entity_counts)
+        entity_highest_offsets = np.repeat(highest_offsets, entity_counts)
+        entity_begins = np.fromiter(chain.from_iterable(documents_entity_begins[i] for i in document_indices), dtype=np.int64, count=int(entity_counts.sum()))
+        entity_ends = np.fromiter(chain.from_iterable(documents_entity_ends[i] for i in document_indices), dtype=np.int64, count=int(entity_counts.sum()))
+        entity_begins = np.clip(entity_begins, entity_lowest_offsets, entity_highest_offsets + 1) + entity_shifts
+        entity_ends = np.clip(entity_ends, entity_lowest_offsets - 1, entity_highest_offsets) + entity_shifts
+
+        first_indices = np.searchsorted(token_begins + token_shifts, entity_begins, side="left") - np.repeat(token_starts, entity_counts)
+        last_indices = np.searchsorted(token_ends + token_shifts, entity_ends, side="right") - 1 - np.repeat(token_starts, entity_counts)
+        entity_token_ranges = zip(first_indices.tolist(), last_indices.tolist())
+
+        for document_index in document_indices:
+            tags = documents_tags[document_index]
+            for label, (first, last) in zip(documents_entity_labels[document_index], entity_token_ranges):
+                BioesUtils._tag_token_range(tags, first, last, label)
+        return documents_tags
+
+    @staticmethod
+    def _tag_token_range(tags: List[str], first: int, last: int, label: str) -> None:
+        """
+        Tags the tokens from first to last (inclusive) as one entity, nothing is tagged for an empty range.
+        
+        :param tags: List of BIOES tags to update in place.
+        :param first: Index of the first token of the entity.
+        :param last: Index of the last token of the entity.
+        :param label: Label of the entity.
+        """
+        if last < first:
+            return
+        if first == last:
+            tags[first] = f"S-{label}"
+            return
+        tags[first] = f"B-{label}"
+        tags[first + 1: last] = [f"I-{label}"] * (last - first - 1)
+        tags[last] = f"E-{label}"
+
+    @staticmethod
+    def get_sentence_start_token_indices(token_begins: Sequence[int], sentence_begins: Sequence[int]) -> List[int]:
+        """
+        Locates the first token of every sentence, i.e. the first token beginning at or after the sentence begin.
+        
+        :param token_begins: Sorted begin character offsets of the tokens.
+        :param sentence_begins: Begin character offsets of the sentences.
+        :return: Sorted, distinct indices of the first tokens of the sentences.
+        """
+        token_start_indices = np.searchsorted(np.asarray(token_begins, dtype=np.int64), np.asarray(sentence_begins, dtype=np.int64), side="left")
+        return sorted(set(token_start_indices.tolist()))
+
+    @staticmethod
+    def get_chunk_token_ranges(bioes_tags: Sequence[str], 
+                               sentence_start_token_indices: Sequence[int], 
+                               chunking_mode: str = "sentence", 
+                               subword_counts: Optional[Sequence[int]] = None, 
+                               max_subword_count: int = 256) -> List[Tuple[int, int]]:
+        """
+        Splits a BIOES tagged document into chunks of consecutive tokens. A chunk never starts at an I- or E- tagged 
+        token, so no entity is cut. In 'document' mode the whole document is one chunk, in 'sentence' mode every 
+        sentence is a chunk, except that sentences an entity runs across stay together. In 'subword_budget' mode 
+        consecutive sentences are packed into chunks of at most max_subword_count subwords, sentences above the 
+        budget are split between tokens, only an entity above the budget gives a chunk above the budget.
+        
+        :param bioes_tags: BIOES tags of the tokens.
+        :param sentence_start_token_indices: Indices of the first tokens of the sentences.
+        :param chunking_mode: One of 'document', 'sentence' and 'subword_budget'.
+        :param subword_counts: Number of subwords of every token in 'subword_budget' mode, one subword per token if None.
+        :param max_subword_count: Maximum number of subwords per chunk in 'subword_budget' mode.
+        :return: List of (start, stop) token index ranges of the chunks, covering all tokens in order.
+        """
+        if chunking_mode not in BioesUtils.chunking_modes:
+            raise ValueError(f"Unknown chunking_mode '{chunking_mode}', expected one of {BioesUtils.chunking_modes}.")
+        token_count = len(bioes_tags)
+        if token_count == 0:
+            return list()
+        if chunking_mode == "document":
+            return [(0, token_count)]
+
+        is_cuttable = [not tag.startswith(("I-", "E-")) for tag in bioes_tags]
+        sentence_starts = [index for index in sentence_start_token_indices if 0 < index < token_count and is_cuttable[index]]
+        sentence_ranges = list(zip([0] + sentence_starts, sentence_starts + [token_count]))
+        if chunking_mode == "sentence":
+            return sentence_ranges
+
+        subword_counts = [1] * token_count if subword_counts is None else list(subword_counts)
+        chunk_ranges: List[Tuple[int, int]] = list()
+        chunk_subword_count = 0
+        for sentence_start, sentence_stop in sentence_ranges:
+            for start, stop in BioesUtils._split_token_range_by_subword_budget(
+                sentence_start, sentence_stop, is_cuttable, subword_counts, max_subword_count
+            ):
+                range_subword_count = sum(subword_counts[start: stop])
+                if chunk_ranges and chunk_ranges[-1][1] == start and chunk_subword_count + range_subword_count <= max_subword_count:
+                    chunk_ranges[-1] = (chunk_ranges[-1][0], stop)
+                    chunk_subword_count += range_subword_count
+                else:
+                    chunk_ranges.append((start, stop))
+                    chunk_subword_count = range_subword_count
+        return chunk_ranges
+
+    @staticmethod
+    def _split_token_range_by_subword_budget(start: int, 
+                                             stop: int, 
+                                             is_cuttable: Sequence[bool], 
+                                             subword_counts: Sequence[int], 
+                                             max_subword_count: int) -> List[Tuple[int, int]]:
+        """
+        Splits a token range greedily into ranges of at most max_subword_count subwords, cutting only before cuttable tokens.
+        
+        :param start: Index of the first token of the range.
+        :param stop: Index after the last token of the range.
+        :param is_cuttable: Whether a chunk may start at each token.
+        :param subword_counts: Number of subwords of every token.
+        :param max_subword_count: Maximum number of subwords per range.
+        :return: List of (start, stop) token index ranges.
+        """
+        ranges: List[Tuple[int, int]] = list()
+        range_start = start
+        range_subword_count = 0
+        # subword count of the current range up to the last token before which it could be cut
+        last_cut, subword_count_before_last_cut = None, 0
+        for index in range(start, stop):
+            if index > range_start and is_cuttable[index]:
+                last_cut, subword_count_before_last_cut = index, range_subword_count
+            range_subword_count += subword_counts[index]
+            if range_subword_count > max_subword_count and last_cut is not None:
+                ranges.append((range_start, last_cut))
+                range_start = last_cut
+                range_subword_count -= subword_count_before_last_cut
+                last_cut = None
+                if index > range_start and is_cuttable[index]:
+                    last_cut, subword_count_before_last_cut = index, range_subword_count - subword_counts[index]
+        ranges.append((range_start, stop))
+        return ranges
@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+import os
+
+
+class EnvironmentUtils:
+
+    @staticmethod
+    @contextmanager
+    def override_environ(overrides: Dict[str, str]) -> Iterator[None]:
+        """
+        Set environment variables for the duration of the context and restore their previous values afterwards.
+        :param overrides: The environment variables to set.
+        """
+        previous_values = {name: os.environ.get(name, None) for name in overrides}
+        os.environ.update(overrides)
+        try:
+            yield
+        finally:
+            for name, value in previous_values.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
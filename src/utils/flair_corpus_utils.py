@@ -0,0 +1,138 @@
+from data_handlers.grascco_data_handler import GrasccoDataHandler
+from flair.data import Corpus, Sentence, Token, get_spans_from_bio
+from flair.datasets import SentenceDataset
+from pandas import DataFrame
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+from utils.bioes_utils import BioesUtils
+
+import numpy as np
+
+
+class FlairCorpusUtils:
+    """
+    Utility class for building Flair corpora directly from the token and entity offsets of the NER data,
+    without writing the BIOES texts to column files and parsing them again with ColumnCorpus.
+    """
+
+    @staticmethod
+    def get_sentences(ner_data_items: Iterable[Dict[str, Any]],
+                      label_type: str = "ner",
+                      chunking_mode: str = "document",
+                      max_subword_count: int = 256,
+                      get_subword_count: Callable[[str], int] = None,
+                      skip_comment_tokens: bool = True) -> List[Sentence]:
+        """
+        Build the Flair sentences of NER data items with span labels from their BIOES tags.
+        The sentences are built like ColumnCorpus builds them from the BIOES texts, i.e. one sentence per chunk,
+        tokens separated by single whitespaces and every sentence linked to its neighbours as context.
+        By default the tokens whose BIOES line starts with '# ' are skipped as well, as ColumnCorpus skips them as comment lines.
+        :param ner_data_items: NER data dictionary objects or NER dataframe rows with 'tokens', 'sentences' and 'entities'.
+        :param label_type: The label type of the entity spans.
+        :param chunking_mode: One of 'document', 'sentence' and 'subword_budget', see BioesUtils.get_chunk_token_ranges.
+        :param max_subword_count: Maximum number of subwords per chunk in 'subword_budget' mode.
+        :param get_subword_count: Function returning the number of subwords of a token text,
+                                  required in 'subword_budget' mode.
+        :param skip_comment_tokens: Whether to skip the tokens ColumnCorpus reads as comment lines.
+        :return: The Flair sentences in the order of the NER data items and their chunks.
+        """
+        sentences: List[Sentence] = list()
+        for ner_data in ner_data_items:
+            tokens = ner_data["tokens"]
+            entities = ner_data["entities"]
+            bioes_tags = BioesUtils.get_bioes_tags(
+                [token["begin"] for token in tokens],
+                [token["end"] for token in tokens],
+                [entity["begin"] for entity in entities],
+                [entity["end"] for entity in entities],
+                [entity["label"] for entity in entities]
+            )
+            chunk_token_ranges = GrasccoDataHandler.get_chunk_token_ranges(
+                ner_data,
+                bioes_tags,
+                chunking_mode=chunking_mode,
+                max_subword_count=max_subword_count,
+                get_subword_count=get_subword_count
+            )
+            for start, stop in chunk_token_ranges:
+                token_indices = [
+                    index for index in range(start, stop) 
+                    if not (skip_comment_tokens and FlairCorpusUtils.is_comment_token(tokens[index]["text"]))
+                ]
+                if not token_indices:
+                    continue
+                chunk_tokens = [tokens[index] for index in token_indices]
+                # explicit start positions, otherwise flair derives each one from the sentence text built so far
+                start_positions = np.cumsum([0] + [len(token["text"]) + 1 for token in chunk_tokens[:-1]]).tolist()
+                sentence = Sentence([
+                    Token(token["text"], start_position=start_position)
+                    for token, start_position in zip(chunk_tokens, start_positions)
+                ])
+                for span_indices, score, label in get_spans_from_bio([bioes_tags[index] for index in token_indices]):
+                    sentence[span_indices[0]: span_indices[-1] + 1].add_label(label_type, value=label, score=score)
+                sentences.append(sentence)
+        Sentence.set_context_for_sentences(sentences)
+        return sentences
+
+    @staticmethod
+    def is_comment_token(token_text: str) -> bool:
+        """
+        Check whether the BIOES line of a token starts with the comment symbol '# ' of ColumnCorpus.
+        :param token_text: The text of the token.
+        :return: True if ColumnCorpus skips the token.
+        """
+        return f"{token_text} ".startswith("# ")
+
+    @staticmethod
+    def get_corpus(train_df: DataFrame,
+                   dev_df: DataFrame,
+                   test_df: DataFrame,
+                   label_type: str = "ner",
+                   chunking_mode: str = "document",
+                   max_subword_count: int = 256,
+                   get_subword_count: Callable[[str], int] = None,
+                   skip_comment_tokens: bool = True,
+                   name: str = "grascco") -> Corpus:
+        """
+        Build an in-memory Flair corpus from the train, dev and test NER dataframes, see get_sentences.
+        :param train_df: The train NER dataframe.
+        :param dev_df: The dev NER dataframe.
+        :param test_df: The test NER dataframe.
+        :param label_type: The label type of the entity spans.
+        :param chunking_mode: One of 'document', 'sentence' and 'subword_budget'.
+        :param max_subword_count: Maximum number of subwords per chunk in 'subword_budget' mode.
+        :param get_subword_count: Function returning the number of subwords of a token text,
+                                  required in 'subword_budget' mode.
+        :param skip_comment_tokens: Whether to skip the tokens ColumnCorpus reads as comment lines.
+        :param name: The name of the corpus.
+        :return: The Flair corpus.
+        """
+        train, dev, test = [
+            SentenceDataset(FlairCorpusUtils.get_sentences(
+                (row for _, row in df.iterrows()),
+                label_type=label_type,
+                chunking_mode=chunking_mode,
+                max_subword_count=max_subword_count,
+                get_subword_count=get_subword_count,
+                skip_comment_tokens=skip_comment_tokens
+            ))
+            for df in [train_df, dev_df, test_df]
+        ]
+        return Corpus(train=train, dev=dev, test=test, name=name, sample_missing_splits=False)
+
+    @staticmethod
+    def write_column_files(data_dir_path: Path,
+                           train_text: str,
+                           dev_text: str,
+                           test_text: str) -> None:
+        """
+        Write the BIOES texts of the splits as train.txt, dev.txt and test.txt column files, readable with ColumnCorpus.
+        :param data_dir_path: The directory to write the column files to, created if needed.
+        :param train_text: The BIOES text of the train split.
+        :param dev_text: The BIOES text of the dev split.
+        :param test_text: The BIOES text of the test split.
+        """
+        data_dir_path.mkdir(parents=True, exist_ok=True)
+        for file_name, text in [("train.txt", train_text), ("dev.txt", dev_text), ("test.txt", test_text)]:
+            with (data_dir_path / file_name).open("w", encoding="utf-8") as writer:
+                writer.write(text)
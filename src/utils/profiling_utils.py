@@ -0,0 +1,170 @@
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator
+from utils.benchmark_utils import BenchmarkUtils
+
+import atexit
+import cProfile
+import functools
+import json
+import multiprocessing
+import os
+import threading
+import time
+import warnings
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+class ProfilingUtils:
+    """
+    Opt-in instrumentation of the internal stages of the NER data pipeline.
+    Profiling is enabled by setting the PROFILE_STAGES environment variable to 1 before the process starts,
+    so it also works in the k8s training jobs. When it is disabled, profile_stage returns the decorated function
+    unchanged and stage returns a shared no-op context manager, so the instrumentation costs nothing.
+
+    When enabled, wall time, CPU time, call and item counts and the peak RSS after every stage are aggregated per stage
+    and emitted as JSON when the process exits, to PROFILE_OUTPUT_FILE or to stdout if it is not set.
+    PROFILE_CPROFILE_FILE additionally dumps cProfile stats of the whole process (readable with pstats or snakeviz),
+    PROFILE_PYINSTRUMENT_FILE an HTML report of pyinstrument, if it is installed.
+    Stages run in process pool workers are not recorded.
+    """
+    enabled: bool = os.environ.get("PROFILE_STAGES", "0").lower() in ["1", "true", "yes"]
+    _stage_stats: Dict[str, Dict[str, Any]] = dict()
+    _stage_stats_lock: threading.Lock = threading.Lock()
+    _null_context: ContextManager = nullcontext()
+    _started_at: str = datetime.now().isoformat(timespec="seconds")
+    _cprofile_profiler: cProfile.Profile = None
+    _pyinstrument_profiler: Any = None
+
+    @staticmethod
+    def stage(stage_name: str, item_count: int = None) -> ContextManager:
+        """
+        Context manager recording a stage if profiling is enabled.
+        :param stage_name: Name of the stage, the records of all calls with the same name are aggregated.
+        :param item_count: Optional number of items processed by the stage, e.g. documents.
+        :return: The recording context manager, or a no-op context manager if profiling is disabled.
+        """
+        if not ProfilingUtils.enabled:
+            return ProfilingUtils._null_context
+        return ProfilingUtils._record_stage(stage_name, lambda: item_count)
+
+    @staticmethod
+    def profile_stage(stage_name: str, get_item_count: Callable[..., int] = None) -> Callable[[Callable], Callable]:
+        """
+        Decorator recording every call of a function as stage if profiling is enabled.
+        :param stage_name: Name of the stage.
+        :param get_item_count: Optional function returning the number of processed items,
+                               called with the return value followed by the arguments of the decorated function.
+        :return: The decorator, which returns the function unchanged if profiling is disabled.
+        """
+        def decorator(function: Callable) -> Callable:
+            if not ProfilingUtils.enabled:
+                return function
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                result = None
+                get_result_item_count = (lambda: get_item_count(result, *args, **kwargs)) if get_item_count else (lambda: None)
+                with ProfilingUtils._record_stage(stage_name, get_result_item_count):
+                    result = function(*args, **kwargs)
+                return result
+            return wrapper
+        return decorator
+
+    @staticmethod
+    @contextmanager
+    def _record_stage(stage_name: str, get_item_count: Callable[[], int]) -> Iterator[None]:
+        """
+        Record the wall time, CPU time, item count and peak RSS of a stage and add them to the stage stats.
+        :param stage_name: Name of the stage.
+        :param get_item_count: Function returning the number of processed items after the stage, or None.
+        """
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall_seconds = time.perf_counter() - start
+            cpu_seconds = time.process_time() - cpu_start
+            item_count = get_item_count()
+            max_rss_bytes = BenchmarkUtils.get_max_rss_bytes()
+            with ProfilingUtils._stage_stats_lock:
+                stats = ProfilingUtils._stage_stats.setdefault(stage_name, {
+                    "calls": 0,
+                    "wall_seconds": 0.0,
+                    "cpu_seconds": 0.0,
+                    "item_count": 0,
+                    "max_rss_bytes": 0
+                })
+                stats["calls"] += 1
+                stats["wall_seconds"] += wall_seconds
+                stats["cpu_seconds"] += cpu_seconds
+                stats["item_count"] += item_count or 0
+                stats["max_rss_bytes"] = max(stats["max_rss_bytes"], max_rss_bytes)
+
+    @staticmethod
+    def get_report() -> Dict[str, Any]:
+        """
+        Get the stage stats recorded so far.
+        :return: A dictionary with process information and the stats of every stage in the order of their first call.
+        """
+        with ProfilingUtils._stage_stats_lock:
+            stage_stats = {stage_name: dict(stats) for stage_name, stats in ProfilingUtils._stage_stats.items()}
+        return {
+            "pid": os.getpid(),
+            "started_at": ProfilingUtils._started_at,
+            "reported_at": datetime.now().isoformat(timespec="seconds"),
+            "max_rss_bytes": BenchmarkUtils.get_max_rss_bytes(),
+            "stages": stage_stats
+        }
+
+    @staticmethod
+    def start_profilers() -> None:
+        """
+        Start the process-wide cProfile and pyinstrument profilers requested through the environment.
+        """
+        if os.environ.get("PROFILE_CPROFILE_FILE", None):
+            ProfilingUtils._cprofile_profiler = cProfile.Profile()
+            ProfilingUtils._cprofile_profiler.enable()
+        if os.environ.get("PROFILE_PYINSTRUMENT_FILE", None):
+            if pyinstrument is None:
+                warnings.warn("PROFILE_PYINSTRUMENT_FILE is set, but pyinstrument is not installed.")
+            else:
+                ProfilingUtils._pyinstrument_profiler = pyinstrument.Profiler()
+                ProfilingUtils._pyinstrument_profiler.start()
+
+    @staticmethod
+    def emit_report() -> None:
+        """
+        Write the stage stats as JSON to PROFILE_OUTPUT_FILE, or print them if it is not set,
+        and dump the reports of the started process-wide profilers. Nothing is emitted by worker processes.
+        """
+        if multiprocessing.parent_process() is not None:
+            return
+        if ProfilingUtils._cprofile_profiler is not None:
+            ProfilingUtils._cprofile_profiler.disable()
+            ProfilingUtils._cprofile_profiler.dump_stats(os.environ["PROFILE_CPROFILE_FILE"])
+        if ProfilingUtils._pyinstrument_profiler is not None:
+            ProfilingUtils._pyinstrument_profiler.stop()
+            Path(os.environ["PROFILE_PYINSTRUMENT_FILE"]).write_text(
+                ProfilingUtils._pyinstrument_profiler.output_html(), encoding="utf-8"
+            )
+
+        report = ProfilingUtils.get_report()
+        output_file = os.environ.get("PROFILE_OUTPUT_FILE", None)
+        if output_file:
+            output_file = Path(output_file)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            with output_file.open("w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=4)
+        else:
+            print(f"stage_profile: {json.dumps(report, ensure_ascii=False)}")
+
+
+if ProfilingUtils.enabled:
+    ProfilingUtils.start_profilers()
+    atexit.register(ProfilingUtils.emit_report)
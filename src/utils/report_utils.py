@@ -42,6 +42,55 @@ class ReportUtils:
                         "support": int(support)
                     }
         return metrics_dict
+
+    @staticmethod
+    def get_test_report_text(training_log_path: Path) -> str:
+        """
+        Extracts the last final test report of a Flair training log, i.e. the timestamp line of the log record 
+        and the detailed results with the classification report, in the format of the classification report text files.
+
+        :param training_log_path: Path to the training.log file written by the Flair ModelTrainer.
+        :return: The text of the test report.
+        """
+
+        lines: List[str] = training_log_path.read_text(encoding='utf-8').splitlines()
+        timestamp_pattern = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} ")
+        start_indices: List[int] = [
+            index for index in range(len(lines) - 1) 
+            if timestamp_pattern.match(lines[index]) and not lines[index][24:].strip() and lines[index + 1] == "Results:"
+        ]
+        if not start_indices:
+            raise ValueError(f"No test report found in training log '{training_log_path}'.")
+        report_lines: List[str] = [lines[start_indices[-1]]]
+        for line in lines[start_indices[-1] + 1:]:
+            if timestamp_pattern.match(line):
+                break
+            report_lines.append(line)
+        return "\n".join(report_lines).rstrip()
+
+    @staticmethod
+    def write_test_report(metrics_dir: Path, 
+                          model_name: str, 
+                          sample_size: int, 
+                          fold: int, 
+                          training_log_path: Path) -> Path:
+        """
+        Writes the final test report of a Flair training log as classification report text file 
+        <metrics_dir>/<model_name>/<sample_size>-K<fold>.txt, readable by get_model_and_sample_size_and_fold_wise_metrics.
+
+        :param metrics_dir: Path to the root directory containing classification report text files.
+        :param model_name: The model name, i.e. the directory name of the model in metrics_dir.
+        :param sample_size: The sample size of the run.
+        :param fold: The fold number of the run.
+        :param training_log_path: Path to the training.log file written by the Flair ModelTrainer.
+        :return: Path to the written classification report text file.
+        """
+
+        report_file_path: Path = metrics_dir / model_name / f"{sample_size}-K{fold}.txt"
+        report_file_path.parent.mkdir(parents=True, exist_ok=True)
+        with (report_file_path.open('w', encoding='utf-8')) as file_writer:
+            file_writer.write(ReportUtils.get_test_report_text(training_log_path))
+        return report_file_path
     
     @staticmethod
     def get_model_and_sample_size_and_fold_wise_metrics(metrics_dir: Path) -> Dict[str, Dict[str, Dict[str, Dict]]]: